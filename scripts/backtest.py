@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+import sqlite3
+import argparse
+import json
+import time
+import sys
+from stock_storage import open_store, column_values
+from train_model import (StockPredictor, generate_trading_signals, NEURAL_MODELS,
+                         SIGNAL_THRESHOLD, SIGNAL_MIN_CONFIDENCE)
+
+# Price-level features become distances from the close, so one model can be
+# fitted across symbols trading at very different prices
+PRICE_FEATURES = ['Open', 'High', 'Low', 'SMA_20', 'SMA_50', 'BB_Upper', 'BB_Lower']
+RATIO_FEATURES = ['Price_Change', 'Volume_Change', 'High_Low_Ratio']
+
+def load_panels(store, symbols=None):
+    """Engineered features of every symbol as (symbols x dates) arrays aligned on date"""
+    symbols = list(symbols or store.symbols())
+    predictor = StockPredictor(model_type='xgboost')
+    frames = {}
+    for symbol in symbols:
+        stock_data = store.load(symbol)
+        historical_data = stock_data['historical_data']
+        dates = historical_data['Date'] if isinstance(historical_data, dict) else [r['Date'] for r in historical_data]
+        frame = predictor.feature_frame(stock_data)
+        frame.index = pd.to_datetime(column_values(dates) if isinstance(dates, np.ndarray) else dates)
+        frames[symbol] = frame
+
+    columns = PRICE_FEATURES + RATIO_FEATURES + ['Close', 'RSI', 'MACD', 'MACD_Signal']
+    wide = {c: pd.concat({s: f[c] for s, f in frames.items()}, axis=1).sort_index() for c in columns}
+    dates = wide['Close'].index
+    panels = {c: frame.to_numpy(dtype=np.float64).T for c, frame in wide.items()}
+    return symbols, dates, panels
+
+def relative_features(panels):
+    """(symbols, dates, features) array of scale-free features"""
+    close = panels['Close']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = [panels[c] / close - 1 for c in PRICE_FEATURES]
+        features += [panels[c] for c in RATIO_FEATURES]
+        features += [panels['RSI'] / 100, panels['MACD'] / close, panels['MACD_Signal'] / close]
+    features = np.stack(features, axis=-1)
+    features[~np.isfinite(features)] = np.nan
+    return features
+
+def forward_returns(close, horizon):
+    """close[t + horizon] / close[t] - 1, NaN where the future bar is missing"""
+    out = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1
+    return out
+
+def default_windows(num_dates, horizon=5):
+    """(train_window, test_window) for a history of `num_dates` bars
+
+    Two years of training and a quarter of testing when the history is
+    long enough (a 5-year store); otherwise half the history trains and
+    the rest is walked in about six steps, so a one-year dataset still
+    gets a backtest.
+    """
+    train_window = min(504, num_dates // 2)
+    test_window = min(63, max(2 * horizon, (num_dates - train_window) // 6))
+    return train_window, test_window
+
+def walk_forward_predictions(panels, model_type='xgboost', train_window=504, test_window=63, horizon=5,
+                             n_jobs=None):
+    """Predicted close `horizon` bars ahead for every symbol and date, NaN outside test windows
+
+    Each step fits one model on the previous train_window dates of every
+    symbol (only rows whose target is already known at the step start)
+    and predicts the next test_window dates, then rolls forward. Raises
+    ValueError when the history is too short for a single step.
+    """
+    if model_type in NEURAL_MODELS:
+        raise ValueError("walk-forward refits a model per step; use a tree model or --from-predictions")
+
+    close = panels['Close']
+    if close.shape[1] < train_window + test_window:
+        raise ValueError(f"{close.shape[1]} dates are fewer than train window {train_window} + "
+                         f"test window {test_window}; use smaller windows or a longer history")
+    features = relative_features(panels)
+    target = forward_returns(close, horizon)
+    valid = ~np.isnan(features).any(axis=-1)
+    num_dates = close.shape[1]
+    predicted = np.full(close.shape, np.nan)
+
+    steps = 0
+    for start in range(train_window, num_dates, test_window):
+        train = valid[:, start - train_window:start - horizon] & ~np.isnan(target[:, start - train_window:start - horizon])
+        if not train.any():
+            continue
+        X_train = features[:, start - train_window:start - horizon][train]
+        y_train = target[:, start - train_window:start - horizon][train]
+
+        predictor = StockPredictor(model_type=model_type, n_jobs=n_jobs)
+        model = predictor.build_model(X_train.shape[1:])
+        model.fit(X_train, y_train)
+
+        end = min(start + test_window, num_dates)
+        test = valid[:, start:end]
+        if test.any():
+            block = np.full(test.shape, np.nan)
+            block[test] = model.predict(features[:, start:end][test])
+            predicted[:, start:end] = close[:, start:end] * (1 + block)
+        steps += 1
+    if steps == 0:
+        raise ValueError(f"no walk-forward step had training rows; the first {train_window} dates "
+                         f"hold no complete features (indicators need about 50 bars of warm-up)")
+    return predicted, steps
+
+def load_stored_predictions(db_path, model_type, symbols=None):
+    """Closes and stored predictions from SQLite, as (symbols x dates) arrays"""
+    conn = sqlite3.connect(db_path)
+    prices = pd.read_sql_query('''
+        SELECT s.symbol, p.date, p.close_price FROM stock_prices p JOIN stocks s ON s.id = p.stock_id
+    ''', conn)
+    predictions = pd.read_sql_query('''
+        SELECT s.symbol, p.prediction_date AS date, p.predicted_price, p.confidence
+        FROM predictions p JOIN stocks s ON s.id = p.stock_id WHERE p.model_type = ?
+    ''', conn, params=(model_type,))
+    conn.close()
+
+    close = prices.pivot_table(index='date', columns='symbol', values='close_price', aggfunc='last')
+    if symbols:
+        close = close[[s for s in symbols if s in close.columns]]
+    close = close.sort_index()
+    align = lambda column: (predictions.pivot_table(index='date', columns='symbol', values=column, aggfunc='last')
+                            .reindex(index=close.index, columns=close.columns).to_numpy(dtype=np.float64).T)
+    return list(close.columns), close.index, close.to_numpy(dtype=np.float64).T, align('predicted_price'), align('confidence')
+
+def max_drawdown(equity):
+    return float(np.min(equity / np.maximum.accumulate(equity) - 1)) if len(equity) else 0.0
+
+def held_positions(position, horizon):
+    """Exposure on each date when every signal is held for `horizon` bars
+
+    Each signal commits 1/horizon of the symbol's capital, so a new
+    signal every bar keeps `horizon` overlapping tranches open and a
+    single signal is fully scored over the horizon it predicted.
+    """
+    running = np.cumsum(position, axis=1)
+    running[:, horizon:] -= running[:, :-horizon].copy()
+    return running / horizon
+
+def backtest(close, predicted, confidence, threshold=SIGNAL_THRESHOLD, min_confidence=SIGNAL_MIN_CONFIDENCE,
+             horizon=1):
+    """Trade every signal for `horizon` bars and score it, across all symbols at once
+
+    A BUY is long and a SELL short from the close the signal was made on
+    for the `horizon` bars it predicted, so a trade wins when the
+    `horizon`-bar return has the predicted sign. The portfolio splits
+    capital equally between the symbols holding a position on each
+    date. Returns (summary, per-symbol arrays).
+    """
+    signals, _, _ = generate_trading_signals(close, predicted, confidence, threshold, min_confidence)
+    position = np.where(signals == 'BUY', 1.0, np.where(signals == 'SELL', -1.0, 0.0))
+    position[np.isnan(predicted)] = 0.0
+
+    trade_return = forward_returns(close, horizon)
+    traded = (position != 0) & ~np.isnan(trade_return)
+    position[~traded] = 0.0
+    trade_pnl = position * np.nan_to_num(trade_return)
+
+    held = held_positions(position, horizon)
+    next_return = forward_returns(close, 1)
+    holding = (held != 0) & ~np.isnan(next_return)
+    pnl = np.where(holding, held * np.nan_to_num(next_return), 0.0)
+
+    open_positions = holding.sum(axis=0)
+    daily = pnl.sum(axis=0) / np.maximum(open_positions, 1)
+    # Dates with a prediction, plus those a position made earlier is still held on
+    active = (~np.isnan(predicted)).any(axis=0) | holding.any(axis=0)
+    daily = daily[active]
+    equity = np.cumprod(1 + daily)
+
+    trades = int(traded.sum())
+    changes = np.abs(np.diff(held, axis=1, prepend=0.0))[:, active]
+    summary = {
+        'dates': int(active.sum()),
+        'trades': trades,
+        'total_return': float(equity[-1] - 1) if len(equity) else 0.0,
+        'annualized_return': float(equity[-1] ** (252 / len(equity)) - 1) if len(equity) else 0.0,
+        'sharpe': float(np.sqrt(252) * daily.mean() / daily.std()) if len(daily) and daily.std() > 0 else 0.0,
+        'hit_rate': float((trade_pnl[traded] > 0).mean()) if trades else 0.0,
+        'max_drawdown': max_drawdown(equity),
+        # Fraction of the universe's capital that changes hands on an average date
+        'turnover': float(changes.sum(axis=0).mean() / close.shape[0]) if changes.size else 0.0,
+        'exposure': float(open_positions[active].mean() / close.shape[0]) if active.any() else 0.0,
+    }
+    per_symbol = {
+        'total_return': np.prod(1 + pnl, axis=1) - 1,
+        'trades': traded.sum(axis=1),
+        'hit_rate': np.where(traded.sum(axis=1) > 0,
+                             (trade_pnl > 0).sum(axis=1) / np.maximum(traded.sum(axis=1), 1), np.nan),
+    }
+    return summary, per_symbol
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of trading signals across the universe")
+    parser.add_argument('--data', default='stock_data.json', help="dataset path: a .json file or a columnar store directory")
+    parser.add_argument('--db', help="score predictions stored in this SQLite database instead of walking forward")
+    parser.add_argument('--symbols', nargs='+')
+    parser.add_argument('--model-type', default='xgboost')
+    parser.add_argument('--train-window', type=int,
+                        help="bars each walk-forward model is fitted on (default: 504, or half a shorter history)")
+    parser.add_argument('--test-window', type=int,
+                        help="bars predicted before refitting (default: 63, or less for a shorter history)")
+    parser.add_argument('--horizon', type=int, default=5,
+                        help="bars ahead the walk-forward models predict, and each position is held")
+    parser.add_argument('--threshold', type=float, default=SIGNAL_THRESHOLD, help="predicted move (%%) needed to trade")
+    parser.add_argument('--n-jobs', type=int, help="threads per model fit")
+    parser.add_argument('--output', help="write the summary and per-symbol results as JSON")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.db:
+        symbols, dates, close, predicted, confidence = load_stored_predictions(args.db, args.model_type, args.symbols)
+        print(f"Scoring stored {args.model_type} predictions for {len(symbols)} symbols over {len(dates)} dates")
+        # Stored predictions are for the next close
+        horizon = 1
+    else:
+        symbols, dates, panels = load_panels(open_store(args.data), args.symbols)
+        close = panels['Close']
+        train_window, test_window = default_windows(len(dates), args.horizon)
+        train_window, test_window = args.train_window or train_window, args.test_window or test_window
+        try:
+            predicted, steps = walk_forward_predictions(panels, args.model_type, train_window, test_window,
+                                                        args.horizon, args.n_jobs)
+        except ValueError as e:
+            print(f"✗ Cannot backtest: {e}")
+            sys.exit(1)
+        # Walk-forward predictions carry no confidence of their own, so every one may trade
+        confidence = np.full(close.shape, 100.0)
+        horizon = args.horizon
+        print(f"Walked {args.model_type} forward in {steps} steps of {train_window}/{test_window} bars "
+              f"over {len(symbols)} symbols and {len(dates)} dates")
+
+    if np.isnan(predicted).all():
+        print("✗ No predictions to score")
+        sys.exit(1)
+    summary, per_symbol = backtest(close, predicted, confidence, threshold=args.threshold, horizon=horizon)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"  Total return:      {summary['total_return']:.2%} ({summary['annualized_return']:.2%} annualized)")
+    print(f"  Sharpe ratio:      {summary['sharpe']:.2f}")
+    print(f"  Hit rate:          {summary['hit_rate']:.2%} over {summary['trades']:,} trades")
+    print(f"  Max drawdown:      {summary['max_drawdown']:.2%}")
+    print(f"  Turnover:          {summary['turnover']:.2%} of the universe per day, exposure {summary['exposure']:.2%}")
+    print(f"  Completed in {elapsed:.2f}s")
+
+    if args.output:
+        report = {'summary': summary, 'symbols': {
+            symbol: {key: column_values(values[[i]])[0] for key, values in per_symbol.items()}
+            for i, symbol in enumerate(symbols)}}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
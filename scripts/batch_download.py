@@ -0,0 +1,58 @@
+import pandas as pd
+
+def download_history_batch(symbols, period="5y", chunk_size=50, download=None, throttle=None):
+    """Download OHLCV history for many symbols with one request per chunk"""
+    if download is None:
+        import yfinance as yf
+        download = yf.download
+    histories = {}
+
+    for start in range(0, len(symbols), chunk_size):
+        chunk = list(symbols[start:start + chunk_size])
+        print(f"Downloading history for {len(chunk)} symbols ({start + 1}-{start + len(chunk)})...")
+
+        if throttle is not None:
+            throttle()
+
+        try:
+            wide = download(chunk, period=period, group_by='ticker', auto_adjust=True,
+                            threads=False, progress=False)
+        except Exception as e:
+            print(f"✗ Batch download failed for {chunk[0]}..{chunk[-1]}: {str(e)}")
+            continue
+
+        histories.update(split_wide_frame(wide, chunk))
+
+    return histories
+
+def split_wide_frame(wide, symbols):
+    """Split a ticker-grouped wide frame into one OHLCV frame per symbol"""
+    frames = {}
+    if wide is None or wide.empty:
+        return frames
+
+    if not isinstance(wide.columns, pd.MultiIndex):
+        # A single-ticker download comes back with flat columns
+        wide = pd.concat({symbols[0]: wide}, axis=1)
+
+    available = set(wide.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+
+        frame = wide[symbol]
+        valid = frame['Close'].notna().to_numpy()
+        if not valid.any():
+            continue
+
+        # Symbols with a shorter history are padded with leading NaN rows;
+        # a positional slice keeps the result a view of the batch frame
+        first = valid.argmax()
+        if valid[first:].all():
+            frame = frame.iloc[first:]
+        else:
+            frame = frame[valid]
+
+        frames[symbol] = frame
+
+    return frames
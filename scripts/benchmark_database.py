@@ -0,0 +1,113 @@
+import sqlite3
+import os
+import time
+import tempfile
+import argparse
+import contextlib
+import io
+from create_database import create_database, populate_database, bulk_load, create_indexes, drop_indexes
+from stock_storage import open_store, historical_records
+from fake_yfinance import synthetic_ohlcv
+from panel_indicators import OHLCVPanel, calculate_panel_indicators
+from feature_pipeline import TRAINING_COLUMNS, SCHEMA_VERSION
+
+def make_dataset(num_symbols, num_rows):
+    """Build a synthetic dataset with indicators in the fetcher's JSON layout"""
+    frames = {f"SYN{i:04d}.NS": synthetic_ohlcv(f"SYN{i:04d}.NS", periods=num_rows) for i in range(num_symbols)}
+    panel = OHLCVPanel.from_frames(frames)
+    indicators = calculate_panel_indicators(panel)
+    frames = panel.to_frames({column: indicators[column] for column in TRAINING_COLUMNS})
+
+    stock_data = {}
+    for symbol, hist in frames.items():
+        hist = hist.dropna()
+        records = []
+        for date, row in zip(hist.index.strftime('%Y-%m-%d'), hist.to_dict('records')):
+            row['Date'] = date
+            row['Volume'] = int(row['Volume'])
+            records.append(row)
+        stock_data[symbol] = {'symbol': symbol, 'name': symbol, 'sector': 'Unknown', 'industry': 'Unknown',
+                              'market_cap': 0, 'historical_data': records, 'schema_version': SCHEMA_VERSION}
+    return stock_data
+
+def legacy_load(conn, stock_data):
+    """The original loader: one execute per row into the index-free schema, committed at the end"""
+    cursor = conn.cursor()
+    drop_indexes(cursor, unique=True)  # the original schema had no indexes
+    for symbol, data in stock_data.items():
+        cursor.execute('''
+            INSERT OR REPLACE INTO stocks (symbol, name, sector, industry, market_cap, exchange)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (symbol, data['name'], data.get('sector'), data.get('industry'), data.get('market_cap'), 'NSE'))
+        stock_id = cursor.lastrowid
+        for price_data in historical_records(data['historical_data']):
+            cursor.execute('''
+                INSERT OR REPLACE INTO stock_prices
+                (stock_id, date, open_price, high_price, low_price, close_price, volume,
+                 sma_20, sma_50, rsi, macd, macd_signal, bollinger_upper, bollinger_lower)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (stock_id, price_data.get('Date'), price_data.get('Open'),
+                  price_data.get('High'), price_data.get('Low'), price_data.get('Close'),
+                  price_data.get('Volume'), price_data.get('SMA_20'), price_data.get('SMA_50'),
+                  price_data.get('RSI'), price_data.get('MACD'), price_data.get('MACD_Signal'),
+                  price_data.get('BB_Upper'), price_data.get('BB_Lower')))
+    conn.commit()
+
+def legacy_load_indexed(conn, stock_data):
+    """The original loader followed by building the indexes bulk_load leaves behind"""
+    legacy_load(conn, stock_data)
+    create_indexes(conn.cursor())
+    conn.commit()
+
+def timed(name, workdir, load):
+    """Create a fresh database, run `load(db_path)` and return elapsed seconds"""
+    db_path = os.path.join(workdir, f'{name}.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(db_path)
+        start = time.perf_counter()
+        load(db_path)
+        return time.perf_counter() - start
+
+def with_connection(load):
+    def run(db_path):
+        conn = sqlite3.connect(db_path)
+        load(conn)
+        conn.close()
+    return run
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bulk stock_prices loader against the original loader")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=1250, help="bars generated per symbol")
+    args = parser.parse_args()
+
+    stock_data = make_dataset(args.symbols, args.rows)
+    total_rows = sum(len(data['historical_data']) for data in stock_data.values())
+    print(f"Loading {total_rows:,} price rows for {args.symbols} symbols")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, 'stock_data.json')
+        store_path = os.path.join(workdir, 'stock_store')
+        open_store(json_path).save(stock_data)
+        open_store(store_path).save(stock_data)
+
+        stocks = lambda: ((symbol, lambda data=data: data) for symbol, data in stock_data.items())
+        # Every database is a file in workdir with SQLite's default pragmas,
+        # except where bulk_load sets its own
+        results = [
+            ('original loader', timed('legacy', workdir, with_connection(lambda conn: legacy_load(conn, stock_data)))),
+            ('original + indexes', timed('legacy_indexed', workdir,
+                                         with_connection(lambda conn: legacy_load_indexed(conn, stock_data)))),
+            ('bulk_load', timed('bulk', workdir, with_connection(lambda conn: bulk_load(conn, stocks())))),
+            ('populate from JSON', timed('json', workdir, lambda db: populate_database(json_path, db))),
+            ('populate from npy store', timed('npy', workdir, lambda db: populate_database(store_path, db))),
+        ]
+
+    # The baseline is the loader this replaced: one transaction, no indexes
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"  {name:<24} {elapsed:7.2f}s {total_rows / elapsed:12,.0f} rows/sec  ({baseline / elapsed:.2f}x)")
+
+    indexed, bulk = results[1][1], results[2][1]
+    print(f"bulk_load runs at {baseline / bulk:.2f}x the original loader, which builds no indexes; "
+          f"against the original loader plus the same indexes it runs at {indexed / bulk:.2f}x.")
@@ -0,0 +1,72 @@
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TRADING_DAYS = 252
+
+# Peak RSS is read after the imports and again after the run, so the
+# difference is what the run itself added
+CHILD_CODE = '''
+import sys, json, time, resource, contextlib, io, functools
+sys.path.insert(0, {scripts_dir!r})
+import fake_yfinance
+from comprehensive_stock_fetcher import ComprehensiveStockFetcher
+from fetch_stock_data import fetch_nse_bse_stocks
+imported_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    stock_data = {run}
+seconds = time.perf_counter() - start
+print(json.dumps({{'imported_kb': imported_kb, 'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'seconds': seconds, 'symbols': len(stock_data)}}))
+'''
+
+PIPELINES = {
+    # The 101-symbol universe with indicators computed in one vectorized pass
+    # (lean only applies to panel mode there)
+    'comprehensive_stock_fetcher_panel': (
+        "ComprehensiveStockFetcher(ticker_factory=fake_yfinance.make_ticker_factory(periods={rows}), "
+        "rate_limit=None, lean={lean}).fetch_all_stocks(max_workers=1, panel=True)"),
+    # 30 symbols, full history kept in every record
+    'fetch_stock_data': (
+        "fetch_nse_bse_stocks(lean={lean}, ticker_factory=fake_yfinance.make_ticker_factory(), "
+        "download_fn=functools.partial(fake_yfinance.fake_download, periods={rows}))"),
+}
+
+def run_child(pipeline, rows, lean):
+    code = CHILD_CODE.format(scripts_dir=SCRIPTS_DIR, run=PIPELINES[pipeline].format(rows=rows, lean=lean))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=SCRIPTS_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"{pipeline} (lean={lean}) failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS of the fetch pipelines with and without lean mode")
+    parser.add_argument('--years', type=float, default=5, help="years of daily bars per symbol")
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    rows = int(args.years * TRADING_DAYS)
+    print(f"Peak RSS per pipeline, {rows} synthetic bars per symbol, each run in a fresh process")
+    print(f"{'pipeline':<34} {'mode':<6} {'symbols':>7} {'imports (MB)':>12} {'peak (MB)':>10} {'run (MB)':>9} {'time (s)':>9}")
+
+    results = {}
+    for pipeline in args.pipelines:
+        for lean in (False, True):
+            stats = run_child(pipeline, rows, lean)
+            stats['run_kb'] = stats['peak_kb'] - stats['imported_kb']
+            results.setdefault(pipeline, {})['lean' if lean else 'full'] = stats
+            print(f"{pipeline:<34} {'lean' if lean else 'full':<6} {stats['symbols']:>7} "
+                  f"{stats['imported_kb'] / 1024:>12.1f} {stats['peak_kb'] / 1024:>10.1f} "
+                  f"{stats['run_kb'] / 1024:>9.1f} {stats['seconds']:>9.2f}")
+        full, lean = results[pipeline]['full'], results[pipeline]['lean']
+        if full['run_kb'] > 0:
+            print(f"{'':<34} lean: memory added by the run down {1 - lean['run_kb'] / full['run_kb']:.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,90 @@
+import sqlite3
+import os
+import time
+import random
+import tempfile
+import argparse
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from create_database import (create_database, configure_bulk_load, create_indexes, drop_indexes,
+                             get_price_range, get_latest_prices, PRICE_INSERT_SQL)
+
+BARS_PER_SYMBOL = 2500  # ~10 years of trading days
+
+def fill_prices(conn, num_rows):
+    """Insert `num_rows` synthetic bars spread over num_rows / BARS_PER_SYMBOL stocks"""
+    num_symbols = max(1, num_rows // BARS_PER_SYMBOL)
+    dates = pd.bdate_range(end='2024-12-31', periods=BARS_PER_SYMBOL).strftime('%Y-%m-%d').tolist()
+    rng = np.random.default_rng(0)
+
+    configure_bulk_load(conn)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    drop_indexes(cursor, unique=True)
+    for stock_id in range(1, num_symbols + 1):
+        cursor.execute('INSERT INTO stocks (id, symbol, name) VALUES (?, ?, ?)',
+                       (stock_id, f'SYN{stock_id:05d}.NS', f'Synthetic {stock_id}'))
+        close = (100 * np.exp(np.cumsum(rng.normal(0, 0.02, BARS_PER_SYMBOL)))).tolist()
+        volume = rng.integers(1_000, 1_000_000, BARS_PER_SYMBOL).tolist()
+        cursor.executemany(PRICE_INSERT_SQL, ((stock_id, d, c, c, c, c, v) + (None,) * 7
+                                              for d, c, v in zip(dates, close, volume)))
+    cursor.execute('COMMIT')
+    return num_symbols, dates
+
+def median_latency(query, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+def bench_size(workdir, num_rows, repeats):
+    db_path = os.path.join(workdir, f'prices_{num_rows}.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    num_symbols, dates = fill_prices(conn, num_rows)
+    cursor = conn.cursor()
+
+    def range_scan():
+        stock_id = random.randint(1, num_symbols)
+        start = random.randint(0, len(dates) - 253)
+        get_price_range(cursor, stock_id, dates[start], dates[start + 252])
+
+    def close_series():
+        stock_id = random.randint(1, num_symbols)
+        cursor.execute('SELECT date, close_price FROM stock_prices WHERE stock_id = ? AND date >= ?',
+                       (stock_id, dates[-252]))
+        cursor.fetchall()
+
+    results = {}
+    for indexed in (False, True):
+        if indexed:
+            create_indexes(cursor)
+        # Unindexed queries scan the whole table, so fewer repeats keep large sizes tractable;
+        # the unindexed latest-bar query scans once per stock and is skipped beyond ~500k rows
+        n = repeats if indexed else max(3, repeats // 10)
+        latest = None
+        if indexed or num_symbols * num_rows <= 100_000_000:
+            latest = median_latency(lambda: get_latest_prices(cursor), max(1, n // 10))
+        results[indexed] = (median_latency(range_scan, n), median_latency(close_series, n), latest)
+    conn.close()
+    os.remove(db_path)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark stock_prices query latency as the table grows")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help="table sizes in rows (e.g. 10000000 for tens of millions)")
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'indexes':>8} {'1y range (ms)':>14} {'1y closes (ms)':>15} {'latest/all (ms)':>16}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for num_rows in args.sizes:
+            for indexed, (range_ms, close_ms, latest_ms) in bench_size(workdir, num_rows, args.repeats).items():
+                latest = 'skipped' if latest_ms is None else f'{latest_ms:.2f}'
+                print(f"{num_rows:>12,} {'yes' if indexed else 'no':>8} {range_ms:>14.3f} {close_ms:>15.3f} {latest:>16}")
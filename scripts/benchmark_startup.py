@@ -0,0 +1,112 @@
+import subprocess
+import statistics
+import tempfile
+import argparse
+import json
+import sys
+import os
+import time
+import contextlib
+import io
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ['train_model', 'comprehensive_stock_fetcher', 'prediction_service', 'backtest',
+           'pandas', 'sklearn.preprocessing', 'sklearn.ensemble', 'xgboost', 'tensorflow']
+
+IMPORT_CODE = '''
+import sys, time, json
+sys.path.insert(0, {scripts_dir!r})
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'import': time.perf_counter() - start}}))
+'''
+
+# Everything a short-lived scoring job does before its first prediction
+PREDICT_CODE = '''
+import sys, time, json
+sys.path.insert(0, {scripts_dir!r})
+start = time.perf_counter()
+from model_registry import ModelRegistry
+from prediction_service import latest_input
+from stock_storage import open_store
+imported = time.perf_counter()
+predictor = ModelRegistry({models!r}).open({entry!r}, {model_type!r}, member={member!r})
+x, _ = latest_input(predictor, open_store({data!r}).load({symbol!r})['historical_data'])
+opened = time.perf_counter()
+predictor.predict(x[None])
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'open': opened - imported, 'first_predict': done - opened,
+                  'total': done - start}}))
+'''
+
+def run_child(code):
+    """Run code in a fresh interpreter; returns its JSON timings plus process wall time, or None"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=SCRIPTS_DIR)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        return None
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = wall
+    return timings
+
+def median_timings(code, repeats):
+    runs = [run_child(code) for _ in range(repeats)]
+    if any(run is None for run in runs):
+        return None
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+def build_registry(workdir, model_types):
+    """Train small models on synthetic data into a throwaway registry"""
+    from benchmark_database import make_dataset
+    from stock_storage import open_store
+    from train_model import train_model_zoo
+
+    stock_data = make_dataset(1, 750)
+    data_path = os.path.join(workdir, 'stock_store')
+    open_store(data_path).save(stock_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_model_zoo(stock_data, model_types=model_types, model_dir=os.path.join(workdir, 'models'))
+    return data_path, os.path.join(workdir, 'models'), next(iter(stock_data))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import time and time-to-first-prediction")
+    parser.add_argument('--model-types', nargs='+', default=['random_forest', 'xgboost'])
+    parser.add_argument('--models', help="existing model registry (default: train throwaway models)")
+    parser.add_argument('--data', help="dataset for --models")
+    parser.add_argument('--symbol', help="symbol for --models")
+    parser.add_argument('--pooled', action='store_true', help="predict --symbol with the pooled model in --models")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="write the results as JSON for tracking over time")
+    args = parser.parse_args()
+
+    results = {'imports': {}, 'first_prediction': {}}
+    print(f"{'import':<30} {'median (s)':>10}")
+    for module in MODULES:
+        timings = median_timings(IMPORT_CODE.format(scripts_dir=SCRIPTS_DIR, module=module), args.repeats)
+        results['imports'][module] = timings
+        print(f"{module:<30} {'not installed' if timings is None else format(timings['import'], '10.3f'):>10}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.models:
+            data, models, symbol = args.data, args.models, args.symbol
+        else:
+            data, models, symbol = build_registry(workdir, args.model_types)
+
+        print(f"\n{'first prediction':<16} {'import':>8} {'open':>8} {'predict':>8} {'total':>8} {'process':>8}")
+        for model_type in args.model_types:
+            entry, member = ('pooled', symbol) if args.models and args.pooled else (symbol, None)
+            code = PREDICT_CODE.format(scripts_dir=SCRIPTS_DIR, models=models, data=data, symbol=symbol,
+                                       entry=entry, member=member, model_type=model_type)
+            timings = median_timings(code, args.repeats)
+            results['first_prediction'][model_type] = timings
+            if timings is None:
+                print(f"{model_type:<16} failed")
+                continue
+            print(f"{model_type:<16} {timings['import']:>8.3f} {timings['open']:>8.3f} "
+                  f"{timings['first_predict']:>8.3f} {timings['total']:>8.3f} {timings['process']:>8.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
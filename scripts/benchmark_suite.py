@@ -0,0 +1,215 @@
+import numpy as np
+import statistics
+import tracemalloc
+import tempfile
+import platform
+import argparse
+import contextlib
+import json
+import time
+import io
+import os
+import sys
+from fake_yfinance import synthetic_ohlcv, make_ticker_factory
+from benchmark_database import make_dataset
+from comprehensive_stock_fetcher import ComprehensiveStockFetcher
+from create_database import create_database, populate_database
+from stock_storage import open_store
+from train_model import StockPredictor
+
+TRADING_DAYS = 252
+
+class Stage:
+    """A benchmarked stage: setup() builds its inputs once, run(inputs) is timed
+
+    run returns the number of units it processed (rows, windows, samples),
+    which becomes the throughput.
+    """
+    def __init__(self, name, unit, setup, run):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.run = run
+
+def symbols_for(count):
+    return [f"BENCH{i:04d}.NS" for i in range(count)]
+
+def make_stages(num_symbols, rows, model_type, workdir):
+    fetcher = ComprehensiveStockFetcher(ticker_factory=make_ticker_factory(periods=rows), rate_limit=None)
+    symbols = symbols_for(num_symbols)
+    raw = lambda: {symbol: synthetic_ohlcv(symbol, periods=rows) for symbol in symbols}
+
+    def fetch(_):
+        total = 0
+        for symbol in symbols:
+            data = fetcher.fetch_stock_data({'symbol': symbol})
+            total += rows if data else 0
+        return total
+
+    def indicators(frames):
+        for frame in frames.values():
+            fetcher.calculate_technical_indicators(frame.copy())
+        return num_symbols * rows
+
+    def serialize(frames):
+        for frame in frames.values():
+            fetcher.prepare_historical_data(frame)
+        return num_symbols * rows
+
+    def dataset_json():
+        path = os.path.join(workdir, 'bench_data.json')
+        stock_data = make_dataset(num_symbols, rows)
+        open_store(path).save(stock_data)
+        return path, sum(len(data['historical_data']) for data in stock_data.values())
+
+    def populate(inputs):
+        path, total = inputs
+        db_path = os.path.join(workdir, 'bench.db')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        create_database(db_path)
+        populate_database(path, db_path)
+        return total
+
+    def scaled():
+        predictor = StockPredictor(model_type='lstm')
+        return predictor, [predictor.scale_features(data) for data in make_dataset(num_symbols, rows).values()]
+
+    def sequences(inputs):
+        # The windows are a strided view, so also copy out one epoch of
+        # batches, which is what fitting actually pays for
+        predictor, arrays = inputs
+        total = 0
+        for X, y in arrays:
+            X_seq, y_seq = predictor.create_sequences(X, y)
+            batches = predictor.batch_generator(X_seq, y_seq)
+            for _ in range(int(np.ceil(len(X_seq) / predictor.batch_size))):
+                next(batches)
+            total += len(X_seq)
+        return total
+
+    def training_data():
+        predictor = StockPredictor(model_type=model_type, n_jobs=1)
+        stock_data = next(iter(make_dataset(1, rows).values()))
+        return predictor.prepare_data(stock_data)
+
+    def train(inputs):
+        X, y = inputs
+        StockPredictor(model_type=model_type, n_jobs=1).train(X, y)
+        return len(X)
+
+    return [
+        Stage('fetch_stock_data', 'rows', lambda: None, fetch),
+        Stage('calculate_technical_indicators', 'rows', raw, indicators),
+        Stage('prepare_historical_data', 'rows',
+              lambda: {symbol: fetcher.calculate_technical_indicators(frame) for symbol, frame in raw().items()},
+              serialize),
+        Stage('populate_database', 'rows', dataset_json, populate),
+        Stage('create_sequences', 'windows', scaled, sequences),
+        Stage(f'train_{model_type}', 'samples', training_data, train),
+    ]
+
+def measure(stage, repeats):
+    """Median wall time over `repeats` runs, plus peak traced memory of one extra run"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        inputs = stage.setup()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            units = stage.run(inputs)
+            timings.append(time.perf_counter() - start)
+
+        # Traced separately: tracemalloc slows allocation-heavy code down
+        tracemalloc.start()
+        stage.run(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {'seconds': seconds, 'min_seconds': min(timings), 'units': units, 'unit': stage.unit,
+            'throughput': units / seconds if seconds > 0 else 0.0, 'peak_mb': peak / 1024 / 1024}
+
+def environment():
+    import pandas as pd
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor() or platform.machine()}
+
+def compare(results, baseline, threshold, memory_threshold, min_delta=0.005):
+    """(stage, metric, baseline, current, ratio) for every stage slower or bigger than allowed
+
+    Time is compared on the best run, which is far less noisy than the
+    median, and differences under `min_delta` seconds are ignored.
+    """
+    regressions = []
+    for name, current in results['stages'].items():
+        previous = baseline['stages'].get(name)
+        if previous is None:
+            continue
+        before, after = previous['min_seconds'], current['min_seconds']
+        if after > before * (1 + threshold) and after - before > min_delta:
+            regressions.append((name, 'min_seconds', before, after, after / before))
+        if current['peak_mb'] > previous['peak_mb'] * (1 + memory_threshold) and current['peak_mb'] - previous['peak_mb'] > 1:
+            regressions.append((name, 'peak_mb', previous['peak_mb'], current['peak_mb'],
+                                current['peak_mb'] / max(previous['peak_mb'], 1e-9)))
+    return regressions
+
+def print_results(results, baseline=None):
+    print(f"{'stage':<32} {'median (s)':>10} {'best (s)':>9} {'throughput':>20} {'peak (MB)':>10} {'vs baseline':>12}")
+    for name, stats in results['stages'].items():
+        previous = (baseline or {}).get('stages', {}).get(name)
+        change = f"{stats['min_seconds'] / previous['min_seconds'] - 1:+.1%}" if previous else '-'
+        throughput = f"{stats['throughput']:,.0f} {stats['unit']}/s"
+        print(f"{name:<32} {stats['seconds']:>10.3f} {stats['min_seconds']:>9.3f} {throughput:>20} {stats['peak_mb']:>10.1f} {change:>12}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the fetch, serialization, DB-load and training hot paths")
+    parser.add_argument('--symbols', type=int, default=20, help="synthetic symbols")
+    parser.add_argument('--years', type=float, default=5, help="years of daily bars per symbol")
+    parser.add_argument('--model-type', default='random_forest', help="model trained by the train stage")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--stages', nargs='+', help="only run stages whose name starts with one of these")
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument('--memory-threshold', type=float, default=0.2, help="allowed peak memory growth vs the baseline")
+    parser.add_argument('--output', help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    rows = int(args.years * TRADING_DAYS)
+    config = {'symbols': args.symbols, 'rows': rows, 'model_type': args.model_type, 'repeats': args.repeats}
+    results = {'config': config, 'environment': environment(), 'stages': {}}
+    print(f"Benchmarking {args.symbols} synthetic symbols x {rows} bars ({args.years:g} years)")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in make_stages(args.symbols, rows, args.model_type, workdir):
+            if args.stages and not any(stage.name.startswith(prefix) for prefix in args.stages):
+                continue
+            try:
+                results['stages'][stage.name] = measure(stage, args.repeats)
+            except ImportError as e:
+                print(f"  skipping {stage.name}: {e}")
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print(f"⚠ Baseline {args.baseline} was recorded with {baseline['config']}; timings are not comparable")
+            baseline = None
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        for name, metric, before, after, ratio in regressions:
+            print(f"✗ {name}: {metric} {before:.3f} -> {after:.3f} ({ratio - 1:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✓ No stage regressed beyond {args.threshold:.0%} time / {args.memory_threshold:.0%} memory")
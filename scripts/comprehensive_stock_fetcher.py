@@ -1,16 +1,158 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
-import requests
-from bs4 import BeautifulSoup
 import time
+import random
+import threading
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from batch_download import download_history_batch
+from panel_indicators import OHLCVPanel, calculate_panel_indicators
+from stock_storage import open_store, historical_records, historical_columns
+from response_cache import ResponseCache, caching_ticker_factory
+from instrumentation import Instrumentation, DISABLED, payload_bytes, path_bytes
+from feature_pipeline import FeaturePipeline, BASE_COLUMNS, FULL_COLUMNS, LEAN_COLUMNS, SCHEMA_VERSION
 import warnings
 warnings.filterwarnings('ignore')
 
+# Columns kept per historical record, after 'Date'
+HISTORICAL_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'SMA_50', 'RSI',
+                      'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower']
+
+FULL_PIPELINE = FeaturePipeline(FULL_COLUMNS)
+LEAN_PIPELINE = FeaturePipeline(LEAN_COLUMNS, dtype=np.float32)
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all fetch workers"""
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens=1):
+        """Block until `tokens` requests may be issued"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+def retry_with_backoff(call, retries=3, base_delay=1.0, max_delay=30.0, on_retry=None):
+    """Call `call()` until it succeeds, at most 1 + `retries` times; returns (result, attempts)
+
+    Waits between attempts follow exponential backoff with full jitter (a
+    uniform draw up to base_delay * 2**attempt, capped at max_delay), so
+    workers throttled together do not retry in lockstep. The last error is
+    re-raised once the retries run out.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call(), attempt + 1
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if on_retry is not None:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+
+class FetchJournal:
+    """Append-only JSONL checkpoint of a fetch run, one line per finished symbol
+
+    Each line holds the symbol, 'ok' or 'failed', the attempts made and,
+    for successes, the stock record. Lines are flushed as they are written,
+    so a crashed run loses at most the symbol being written; a truncated
+    last line is ignored on load.
+    """
+    def __init__(self, path='fetch_journal.jsonl'):
+        self.path = path
+        self.file = None
+    
+    def load(self):
+        """Stock records of the symbols completed by earlier runs"""
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry['status'] == 'ok':
+                    completed[entry['symbol']] = entry['data']
+                else:
+                    completed.pop(entry['symbol'], None)
+        return completed
+    
+    def open(self, resume=False):
+        if resume and os.path.exists(self.path):
+            # Cut a line left half-written by a crash, so the next entry
+            # starts on a line of its own instead of extending it
+            with open(self.path, 'rb+') as f:
+                content = f.read()
+                if content and not content.endswith(b'\n'):
+                    f.truncate(content.rfind(b'\n') + 1)
+        self.file = open(self.path, 'a' if resume else 'w')
+    
+    def record(self, symbol, data=None, attempts=1, error=None):
+        entry = {'symbol': symbol, 'status': 'ok' if data else 'failed', 'attempts': attempts,
+                 'time': datetime.now().isoformat()}
+        if data:
+            entry['data'] = data
+        else:
+            entry['error'] = str(error) if error is not None else 'no data'
+        self.file.write(json.dumps(entry, default=str) + '\n')
+        self.file.flush()
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 class ComprehensiveStockFetcher:
-    def __init__(self):
+    def __init__(self, ticker_factory=None, download_fn=None, rate_limit=2.0, historical_orient='records',
+                 response_cache=None, instrumentation=None, lean=False):
+        # `ticker_factory` and `download_fn` are the per-symbol and batched
+        # data sources; swap in fake_yfinance stubs to run without network
+        # (download_history_batch falls back to yf.download itself)
+        if ticker_factory is None:
+            import yfinance as yf
+            ticker_factory = yf.Ticker
+        self.ticker_factory = ticker_factory
+        self.download_fn = download_fn
+        # Provider requests per second, shared across workers (None disables)
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        # With a ResponseCache, per-symbol history and info calls read through
+        # it, and the cached tickers throttle only requests that miss
+        self.response_cache = response_cache
+        if response_cache is not None:
+            self.ticker_factory = caching_ticker_factory(response_cache, self.ticker_factory, throttle=self.throttle)
+        self.fetch_timings = {}
+        # Per-stage timing spans; disabled unless an Instrumentation is passed
+        self.instrumentation = instrumentation or DISABLED
+        # Layout of 'historical_data': 'records' (list of rows) or 'columns'
+        self.historical_orient = historical_orient
+        # Panel mode computes only the consumed indicators, as float32, for
+        # the whole universe at once (see calculate_panel_indicators). The
+        # per-symbol path keeps one symbol's frame at a time, so it has no
+        # wide arrays to shrink and ignores `lean`
+        self.lean = lean
+        
         # Comprehensive list of NSE and BSE stocks
         self.nse_stocks = [
             # Large Cap Stocks
@@ -130,152 +272,132 @@ class ComprehensiveStockFetcher:
             {"symbol": "500034.BO", "name": "Bajaj Finance Ltd", "sector": "NBFC", "market_cap": "Large"},
         ]
         
-    def fetch_stock_data(self, symbol_info, period="5y"):
-        """Fetch comprehensive stock data for a single stock"""
+    def fetch_stock_data(self, symbol_info, period="5y", hist=None):
+        """Fetch comprehensive stock data for a single stock, reusing `hist` if already downloaded"""
         try:
             symbol = symbol_info["symbol"]
-            print(f"Fetching data for {symbol}...")
-            
-            # Create ticker object
-            ticker = yf.Ticker(symbol)
-            
-            # Get historical data
-            hist = ticker.history(period=period)
-            
-            if hist.empty:
-                print(f"No historical data found for {symbol}")
+            raw = self.fetch_raw_data(symbol_info, period=period, hist=hist)
+            if raw is None:
                 return None
-            
-            # Get stock info
-            try:
-                info = ticker.info
-            except:
-                info = {}
+            hist, info = raw
             
             # Calculate technical indicators
             hist = self.calculate_technical_indicators(hist)
             
-            # Prepare stock data
-            stock_data = {
-                'symbol': symbol,
-                'name': symbol_info.get('name', info.get('longName', symbol)),
-                'sector': symbol_info.get('sector', info.get('sector', 'Unknown')),
-                'industry': info.get('industry', 'Unknown'),
-                'market_cap_category': symbol_info.get('market_cap', 'Unknown'),
-                'market_cap': info.get('marketCap', 0),
-                'current_price': float(hist['Close'].iloc[-1]) if not hist.empty else 0,
-                'day_change': float(hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) if len(hist) > 1 else 0,
-                'day_change_percent': float(((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100) if len(hist) > 1 else 0,
-                'volume': int(hist['Volume'].iloc[-1]) if not hist.empty else 0,
-                'high_52w': float(hist['High'].max()),
-                'low_52w': float(hist['Low'].min()),
-                'pe_ratio': info.get('trailingPE', 0),
-                'pb_ratio': info.get('priceToBook', 0),
-                'dividend_yield': info.get('dividendYield', 0),
-                'beta': info.get('beta', 1.0),
-                'eps': info.get('trailingEps', 0),
-                'book_value': info.get('bookValue', 0),
-                'historical_data': self.prepare_historical_data(hist),
-                'technical_indicators': self.get_latest_technical_indicators(hist),
-                'last_updated': datetime.now().isoformat(),
-                'exchange': 'NSE' if '.NS' in symbol else 'BSE'
-            }
-            
-            return stock_data
+            return self.build_stock_data(symbol_info, hist, info)
             
         except Exception as e:
             print(f"Error fetching data for {symbol}: {str(e)}")
             return None
     
-    def calculate_technical_indicators(self, df):
-        """Calculate comprehensive technical indicators"""
-        # Simple Moving Averages
-        df['SMA_5'] = df['Close'].rolling(window=5).mean()
-        df['SMA_10'] = df['Close'].rolling(window=10).mean()
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        df['SMA_200'] = df['Close'].rolling(window=200).mean()
-        
-        # Exponential Moving Averages
-        df['EMA_12'] = df['Close'].ewm(span=12).mean()
-        df['EMA_26'] = df['Close'].ewm(span=26).mean()
-        
-        # RSI
-        df['RSI'] = self.calculate_rsi(df['Close'])
-        
-        # MACD
-        df['MACD'] = df['EMA_12'] - df['EMA_26']
-        df['MACD_Signal'] = df['MACD'].ewm(span=9).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
-        
-        # Bollinger Bands
-        df['BB_Middle'] = df['Close'].rolling(window=20).mean()
-        bb_std = df['Close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
-        df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
-        
-        # Stochastic Oscillator
-        df['Stoch_K'], df['Stoch_D'] = self.calculate_stochastic(df)
-        
-        # Average True Range (ATR)
-        df['ATR'] = self.calculate_atr(df)
-        
-        # Volume indicators
-        df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-        df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
-        
-        return df
+    def fetch_raw_data(self, symbol_info, period="5y", hist=None):
+        """Fetch OHLCV history and info for a single stock, without indicators"""
+        symbol = symbol_info["symbol"]
+        print(f"Fetching data for {symbol}...")
+        
+        # Create ticker object
+        ticker = self.ticker_factory(symbol)
+        
+        # Get historical data
+        if hist is None:
+            self.throttle_uncached()
+            with self.instrumentation.span('fetch.history', symbol) as span:
+                hist = ticker.history(period=period)
+                span.record(bytes_out=hist)
+        
+        if hist.empty:
+            print(f"No historical data found for {symbol}")
+            return None
+        
+        # Get stock info
+        try:
+            self.throttle_uncached()
+            with self.instrumentation.span('fetch.info', symbol):
+                info = ticker.info
+        except:
+            info = {}
+        
+        return hist, info
     
-    def calculate_rsi(self, prices, window=14):
-        """Calculate Relative Strength Index"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+    def build_stock_data(self, symbol_info, hist, info):
+        """Assemble the stock record from history with indicators and info"""
+        symbol = symbol_info["symbol"]
+        with self.instrumentation.span('serialize', symbol) as span:
+            historical_data = self.prepare_historical_data(hist)
+            span.record(bytes_in=hist)
+        return {
+            'symbol': symbol,
+            'name': symbol_info.get('name', info.get('longName', symbol)),
+            'sector': symbol_info.get('sector', info.get('sector', 'Unknown')),
+            'industry': info.get('industry', 'Unknown'),
+            'market_cap_category': symbol_info.get('market_cap', 'Unknown'),
+            'market_cap': info.get('marketCap', 0),
+            'current_price': float(hist['Close'].iloc[-1]) if not hist.empty else 0,
+            'day_change': float(hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) if len(hist) > 1 else 0,
+            'day_change_percent': float(((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100) if len(hist) > 1 else 0,
+            'volume': int(hist['Volume'].iloc[-1]) if not hist.empty else 0,
+            'high_52w': float(hist['High'].max()),
+            'low_52w': float(hist['Low'].min()),
+            'pe_ratio': info.get('trailingPE', 0),
+            'pb_ratio': info.get('priceToBook', 0),
+            'dividend_yield': info.get('dividendYield', 0),
+            'beta': info.get('beta', 1.0),
+            'eps': info.get('trailingEps', 0),
+            'book_value': info.get('bookValue', 0),
+            'historical_data': historical_data,
+            'technical_indicators': self.get_latest_technical_indicators(hist),
+            'last_updated': datetime.now().isoformat(),
+            'exchange': 'NSE' if '.NS' in symbol else 'BSE',
+            'schema_version': SCHEMA_VERSION,
+        }
     
-    def calculate_stochastic(self, df, k_window=14, d_window=3):
-        """Calculate Stochastic Oscillator"""
-        low_min = df['Low'].rolling(window=k_window).min()
-        high_max = df['High'].rolling(window=k_window).max()
-        k_percent = 100 * ((df['Close'] - low_min) / (high_max - low_min))
-        d_percent = k_percent.rolling(window=d_window).mean()
-        return k_percent, d_percent
+    def calculate_technical_indicators(self, df):
+        """Calculate comprehensive technical indicators"""
+        return FULL_PIPELINE.assign(df)
     
-    def calculate_atr(self, df, window=14):
-        """Calculate Average True Range"""
-        high_low = df['High'] - df['Low']
-        high_close = np.abs(df['High'] - df['Close'].shift())
-        low_close = np.abs(df['Low'] - df['Close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
-        return true_range.rolling(window).mean()
+    def calculate_lean_indicators(self, df):
+        """Calculate only LEAN_COLUMNS, stored as float32, into a new OHLCV frame
+        
+        Values match calculate_technical_indicators up to float32 rounding.
+        Intermediates (EMA_12/26, the band width, Volume_SMA) are released as
+        soon as they are used, columns nothing reads (SMA_5/10/200,
+        MACD_Histogram, Stoch_K/D) are skipped and provider extras such as
+        Dividends are dropped. OHLCV keeps its dtype, so prices stay exact.
+        """
+        return LEAN_PIPELINE.frame(df)
     
-    def prepare_historical_data(self, df):
-        """Prepare historical data for JSON serialization"""
-        df_clean = df.dropna()
-        records = []
-        
-        for index, row in df_clean.iterrows():
-            record = {
-                'Date': index.strftime('%Y-%m-%d'),
-                'Open': float(row['Open']),
-                'High': float(row['High']),
-                'Low': float(row['Low']),
-                'Close': float(row['Close']),
-                'Volume': int(row['Volume']),
-                'SMA_20': float(row['SMA_20']) if pd.notna(row['SMA_20']) else None,
-                'SMA_50': float(row['SMA_50']) if pd.notna(row['SMA_50']) else None,
-                'RSI': float(row['RSI']) if pd.notna(row['RSI']) else None,
-                'MACD': float(row['MACD']) if pd.notna(row['MACD']) else None,
-                'MACD_Signal': float(row['MACD_Signal']) if pd.notna(row['MACD_Signal']) else None,
-                'BB_Upper': float(row['BB_Upper']) if pd.notna(row['BB_Upper']) else None,
-                'BB_Lower': float(row['BB_Lower']) if pd.notna(row['BB_Lower']) else None,
-            }
-            records.append(record)
-        
-        return records[-252:]  # Return last 252 trading days (1 year)
+    def prepare_historical_data(self, df, window=252, orient=None):
+        """Prepare the last `window` complete rows for JSON serialization
+        
+        `orient='records'` returns a list of row dicts, `orient='columns'` a
+        compact dict of column lists; defaults to self.historical_orient.
+        """
+        orient = orient or self.historical_orient
+        
+        # Skip rows with any missing value (as dropna() would), but only scan
+        # as far back as needed to collect `window` complete rows
+        size = window
+        while True:
+            tail = df.iloc[-size:]
+            complete = tail.notna().all(axis=1).to_numpy()
+            if complete.sum() >= window or size >= len(df):
+                break
+            size *= 2
+        tail = tail.iloc[np.flatnonzero(complete)[-window:]]
+        
+        columns = {'Date': tail.index.strftime('%Y-%m-%d').tolist()}
+        for column in HISTORICAL_COLUMNS:
+            values = tail[column].to_numpy()
+            if column == 'Volume':
+                columns[column] = values.astype(np.int64).tolist()
+                continue
+            values = values.astype(np.float64)
+            nan = np.isnan(values)
+            columns[column] = np.where(nan, None, values).tolist() if nan.any() else values.tolist()
+        
+        if orient == 'columns':
+            return columns
+        return historical_records(columns)
     
     def get_latest_technical_indicators(self, df):
         """Get latest technical indicator values"""
@@ -296,44 +418,256 @@ class ComprehensiveStockFetcher:
             'atr': float(latest['ATR']) if pd.notna(latest['ATR']) else None,
         }
     
-    def fetch_all_stocks(self):
-        """Fetch data for all stocks"""
+    def throttle(self):
+        """Wait for a slot under the shared provider rate limit"""
+        if self.rate_limiter is not None:
+            with self.instrumentation.span('throttle'):
+                self.rate_limiter.acquire()
+    
+    def throttle_uncached(self):
+        """Throttle a ticker call, unless the response cache throttles its misses itself"""
+        if self.response_cache is None:
+            self.throttle()
+    
+    def calculate_panel_indicators(self, frames):
+        """Calculate technical indicators for many symbols in one vectorized pass
+        
+        With `lean` the frames match calculate_lean_indicators: OHLCV plus
+        LEAN_COLUMNS as float32.
+        """
+        panel = OHLCVPanel.from_frames(frames)
+        if self.lean:
+            indicators = calculate_panel_indicators(panel, LEAN_PIPELINE.outputs, LEAN_PIPELINE.dtype)
+            return panel.to_frames(indicators, columns=BASE_COLUMNS)
+        return panel.to_frames(calculate_panel_indicators(panel))
+    
+    def update_stock_data(self, symbol_info, existing):
+        """Append bars newer than the stored history to an existing stock record"""
+        symbol = symbol_info['symbol']
+        records = historical_records(existing.get('historical_data'))
+        if not records:
+            return self.fetch_stock_data(symbol_info)
+        
+        last_date = records[-1]['Date']
+        print(f"Updating data for {symbol} since {last_date}...")
+        
+        ticker = self.ticker_factory(symbol)
+        self.throttle_uncached()
+        start = (pd.Timestamp(last_date) + timedelta(days=1)).strftime('%Y-%m-%d')
+        with self.instrumentation.span('fetch.history', symbol) as span:
+            new_bars = ticker.history(start=start)
+            span.record(bytes_out=new_bars)
+        
+        if not new_bars.empty and new_bars.index.tz is not None:
+            new_bars = new_bars.tz_localize(None)
+        new_bars = new_bars[new_bars.index.strftime('%Y-%m-%d') > last_date]
+        
+        if new_bars.empty:
+            print(f"No new bars for {symbol}")
+            return existing
+        
+        # The stored window (252 bars) covers the longest indicator lookback
+        # (SMA_200), so indicators are recomputed over it plus the new bars only
+        columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        stored = pd.DataFrame(records, columns=['Date'] + columns)
+        stored.index = pd.to_datetime(stored.pop('Date'))
+        hist = pd.concat([stored, new_bars[columns]])
+        with self.instrumentation.span('indicators', symbol) as span:
+            hist = self.calculate_technical_indicators(hist)
+            span.record(bytes_out=hist)
+        
+        with self.instrumentation.span('serialize', symbol):
+            new_records = self.prepare_historical_data(hist.iloc[-len(new_bars):], orient='records')
+        records = (records + new_records)[-252:]
+        
+        stock_data = dict(existing)
+        stock_data.update({
+            'current_price': float(hist['Close'].iloc[-1]),
+            'day_change': float(hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) if len(hist) > 1 else 0,
+            'day_change_percent': float(((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100) if len(hist) > 1 else 0,
+            'volume': int(hist['Volume'].iloc[-1]),
+            'high_52w': max(existing.get('high_52w', 0), float(new_bars['High'].max())),
+            'low_52w': min(existing.get('low_52w', float('inf')), float(new_bars['Low'].min())),
+            'historical_data': historical_columns(records) if self.historical_orient == 'columns' else records,
+            'technical_indicators': self.get_latest_technical_indicators(hist),
+            'last_updated': datetime.now().isoformat(),
+            'schema_version': SCHEMA_VERSION,
+        })
+        return stock_data
+    
+    def load_stock_data(self, filename='comprehensive_stock_data.json'):
+        """Load a previously saved dataset (JSON file or columnar store), or an empty one"""
+        store = open_store(filename)
+        if not store.exists():
+            print(f"No existing dataset at {filename}, fetching full history")
+            return {}
+        return store.load_all()
+    
+    def fetch_symbol(self, stock_info, existing=None, hist=None, panel=False):
+        """Fetch one symbol, raising on provider errors so the caller can retry
+        
+        Returns the stock record, (hist, info) in panel mode, or None when
+        the provider has no history for the symbol.
+        """
+        if existing is not None:
+            return self.update_stock_data(stock_info, existing)
+        raw = self.fetch_raw_data(stock_info, hist=hist)
+        if raw is None or panel:
+            return raw
+        hist, info = raw
+        with self.instrumentation.span('indicators', stock_info['symbol']) as span:
+            span.record(bytes_in=hist)
+            hist = self.calculate_technical_indicators(hist)
+            span.record(bytes_out=hist)
+        return self.build_stock_data(stock_info, hist, info)
+    
+    def fetch_all_stocks(self, max_workers=1, batch_size=None, existing=None, panel=False,
+                         retries=3, backoff=1.0, journal=None, resume=False):
+        """Fetch data for all stocks using `max_workers` concurrent workers
+        
+        With `batch_size`, histories are downloaded `batch_size` symbols per
+        request up front; symbols missing from a batch fall back to a
+        single-symbol request. Symbols already present in `existing` are
+        updated incrementally with only the bars after their last stored date;
+        if that update fails, the existing record is kept unchanged.
+        With `panel`, indicators for all newly fetched symbols are computed
+        together in one vectorized pass after the downloads finish.
+        
+        A symbol whose fetch raises is retried up to `retries` times with
+        exponential backoff starting at `backoff` seconds. With a
+        FetchJournal each finished symbol is appended to it (in panel mode,
+        once its indicators are built), and `resume` first loads the
+        symbols an interrupted run already completed and skips them.
+        """
+        existing = existing or {}
         all_stocks = self.nse_stocks + self.bse_stocks
         stock_data = {}
+        self.fetch_timings = {}
+        self.fetch_failures = {}
+        
+        if journal is not None:
+            if resume:
+                stock_data = {symbol: data for symbol, data in journal.load().items()
+                              if symbol in {s['symbol'] for s in all_stocks}}
+                print(f"Resuming: {len(stock_data)} stocks already completed in {journal.path}")
+            journal.open(resume=resume)
+        pending = [s for s in all_stocks if s['symbol'] not in stock_data]
+        
+        print(f"Starting to fetch data for {len(pending)} stocks with {max_workers} worker(s)...")
+        run_start = time.perf_counter()
         
-        print(f"Starting to fetch data for {len(all_stocks)} stocks...")
+        histories = {}
+        if batch_size:
+            missing = [s['symbol'] for s in pending if s['symbol'] not in existing]
+            if self.response_cache is not None:
+                # Histories the cache can still answer are read per symbol through it
+                missing = [symbol for symbol in missing if not self.response_cache.fresh('history', symbol)]
+            with self.instrumentation.span('fetch.batch'):
+                histories = download_history_batch(missing, chunk_size=batch_size,
+                                                   download=self.download_fn, throttle=self.throttle)
+            if self.response_cache is not None:
+                for symbol, hist in histories.items():
+                    self.response_cache.store_history(symbol, hist)
         
-        for i, stock_info in enumerate(all_stocks):
+        def timed_fetch(stock_info):
+            symbol = stock_info['symbol']
+            def on_retry(attempt, error, delay):
+                print(f"↻ {symbol}: attempt {attempt} failed ({str(error)}), retrying in {delay:.1f}s")
+            
+            start = time.perf_counter()
             try:
-                data = self.fetch_stock_data(stock_info)
-                if data:
-                    stock_data[data['symbol']] = data
-                    print(f"✓ [{i+1}/{len(all_stocks)}] Successfully fetched {data['symbol']}")
-                else:
-                    print(f"✗ [{i+1}/{len(all_stocks)}] Failed to fetch {stock_info['symbol']}")
-                
-                # Add delay to avoid rate limiting
-                time.sleep(0.5)
-                
+                with self.instrumentation.profiling(), self.instrumentation.span('symbol', symbol):
+                    data, attempts = retry_with_backoff(
+                        lambda: self.fetch_symbol(stock_info, existing.get(symbol), histories.get(symbol), panel),
+                        retries=retries, base_delay=backoff, on_retry=on_retry)
+                return data, None, attempts, time.perf_counter() - start
             except Exception as e:
-                print(f"✗ [{i+1}/{len(all_stocks)}] Error with {stock_info['symbol']}: {str(e)}")
-                continue
+                return None, e, retries + 1, time.perf_counter() - start
         
-        return stock_data
+        def record(symbol, data=None, attempts=1, error=None):
+            if not data:
+                self.fetch_failures[symbol] = str(error) if error is not None else 'no data'
+                if symbol in existing:
+                    # A failed refresh keeps the stored record, so saving the
+                    # result cannot drop the symbol's history
+                    stock_data[symbol] = existing[symbol]
+            if journal is not None:
+                journal.record(symbol, data, attempts, error)
+        
+        raw_data = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(timed_fetch, stock_info): stock_info for stock_info in pending}
+                for i, future in enumerate(as_completed(futures)):
+                    symbol = futures[future]['symbol']
+                    data, error, attempts, elapsed = future.result()
+                    self.fetch_timings[symbol] = elapsed
+                    
+                    if error is not None:
+                        record(symbol, attempts=attempts, error=error)
+                        print(f"✗ [{i+1}/{len(pending)}] Error with {symbol} after {attempts} attempt(s): {str(error)}")
+                    elif isinstance(data, tuple):
+                        raw_data[symbol] = (data, attempts)
+                        print(f"✓ [{i+1}/{len(pending)}] Downloaded {symbol} ({elapsed:.2f}s)")
+                    elif data:
+                        stock_data[symbol] = data
+                        record(symbol, data, attempts)
+                        print(f"✓ [{i+1}/{len(pending)}] Successfully fetched {symbol} ({elapsed:.2f}s)")
+                    else:
+                        record(symbol, attempts=attempts)
+                        print(f"✗ [{i+1}/{len(pending)}] Failed to fetch {symbol} ({elapsed:.2f}s)")
+            
+            if raw_data:
+                print(f"Calculating indicators for {len(raw_data)} stocks in panel mode...")
+                with self.instrumentation.span('indicators.panel') as span:
+                    frames = self.calculate_panel_indicators({symbol: hist for symbol, ((hist, info), _) in raw_data.items()})
+                    span.record(bytes_out=sum(payload_bytes(frame) for frame in frames.values()) if span.enabled else None)
+                stock_infos = {s['symbol']: s for s in all_stocks}
+                for symbol, ((hist, info), attempts) in raw_data.items():
+                    try:
+                        stock_data[symbol] = self.build_stock_data(stock_infos[symbol], frames[symbol], info)
+                        record(symbol, stock_data[symbol], attempts)
+                    except Exception as e:
+                        record(symbol, attempts=attempts, error=e)
+                        print(f"✗ Error building data for {symbol}: {str(e)}")
+        finally:
+            if journal is not None:
+                journal.close()
+        
+        total_time = time.perf_counter() - run_start
+        if self.fetch_timings:
+            timings = sorted(self.fetch_timings.values())
+            print(f"✓ Fetched {len(stock_data)}/{len(all_stocks)} stocks in {total_time:.2f}s "
+                  f"(per-symbol median {timings[len(timings) // 2]:.2f}s, max {timings[-1]:.2f}s)")
+        if self.fetch_failures:
+            print(f"✗ {len(self.fetch_failures)} stocks failed: {', '.join(sorted(self.fetch_failures))}")
+            kept = [symbol for symbol in self.fetch_failures if symbol in existing]
+            if kept:
+                print(f"  kept the previously stored data for {len(kept)} of them")
+        if self.response_cache is not None:
+            counts = self.response_cache.stats()
+            print(f"✓ Response cache: {counts['hits']} hits, {counts['misses']} misses, "
+                  f"{counts['revalidated']} revalidated, {counts['updated']} updated, {counts['stale']} served stale")
+        
+        # Keep the universe order regardless of completion order
+        return {s['symbol']: stock_data[s['symbol']] for s in all_stocks if s['symbol'] in stock_data}
     
     def save_stock_data(self, stock_data, filename='comprehensive_stock_data.json'):
-        """Save stock data to JSON file"""
+        """Save stock data to a JSON file, or a columnar store if `filename` is a directory; returns success"""
         try:
-            with open(filename, 'w') as f:
-                json.dump(stock_data, f, indent=2, default=str)
+            with self.instrumentation.span('save') as span:
+                open_store(filename).save(stock_data)
+                span.record(bytes_out=path_bytes(filename) if span.enabled else None)
             print(f"✓ Stock data saved to {filename}")
             print(f"✓ Total stocks saved: {len(stock_data)}")
             
             # Save summary statistics
             self.save_summary_stats(stock_data)
+            return True
             
         except Exception as e:
             print(f"✗ Error saving stock data: {str(e)}")
+            return False
     
     def save_summary_stats(self, stock_data):
         """Save summary statistics"""
@@ -367,19 +701,65 @@ class ComprehensiveStockFetcher:
         print(f"  - Top Sectors: {dict(list(sorted(stats['sectors'].items(), key=lambda x: x[1], reverse=True))[:5])}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch NSE/BSE stock data")
+    parser.add_argument('--workers', type=int, default=4, help="number of concurrent fetch workers")
+    parser.add_argument('--rate-limit', type=float, default=2.0, help="max provider requests per second")
+    parser.add_argument('--batch-size', type=int, default=50, help="symbols per history download (0 = one request per symbol)")
+    parser.add_argument('--incremental', action='store_true', help="only fetch bars newer than the saved dataset")
+    parser.add_argument('--orient', choices=['records', 'columns'], default='records',
+                        help="layout of each stock's historical_data in the saved JSON")
+    parser.add_argument('--output', default='comprehensive_stock_data.json',
+                        help="dataset path: a .json file or a columnar store directory")
+    parser.add_argument('--panel', action='store_true', help="compute indicators for the whole universe in one vectorized pass")
+    parser.add_argument('--response-cache', default='response_cache.sqlite',
+                        help="SQLite cache of provider responses (inspect it with response_cache.py)")
+    parser.add_argument('--no-response-cache', action='store_true', help="always ask the provider")
+    parser.add_argument('--retries', type=int, default=3, help="retries per symbol after a failed fetch")
+    parser.add_argument('--backoff', type=float, default=1.0, help="base delay (s) of the exponential retry backoff")
+    parser.add_argument('--journal', default='fetch_journal.jsonl',
+                        help="checkpoint of completed symbols, removed once the dataset is saved")
+    parser.add_argument('--resume', action='store_true', help="skip symbols completed by an interrupted run")
+    parser.add_argument('--lean', action='store_true',
+                        help="with --panel, compute only the indicators that are saved, as float32, to cut peak memory")
+    parser.add_argument('--report', help="time every stage per symbol and write a JSON run report here")
+    parser.add_argument('--profile', action='store_true',
+                        help="also run cProfile over the main and worker threads and save <report>.prof")
+    args = parser.parse_args()
+    if args.lean and not args.panel:
+        parser.error("--lean only applies with --panel")
+    
     print("🚀 Starting Comprehensive Stock Data Fetching...")
     print("=" * 60)
     
-    fetcher = ComprehensiveStockFetcher()
+    response_cache = None if args.no_response_cache else ResponseCache(args.response_cache)
+    instrumentation = None
+    if args.report or args.profile:
+        instrumentation = Instrumentation(profile=args.profile)
+        instrumentation.start()
+    fetcher = ComprehensiveStockFetcher(rate_limit=args.rate_limit, historical_orient=args.orient,
+                                        response_cache=response_cache, instrumentation=instrumentation,
+                                        lean=args.lean)
     
     # Fetch all stock data
-    stock_data = fetcher.fetch_all_stocks()
+    existing = fetcher.load_stock_data(args.output) if args.incremental else None
+    journal = FetchJournal(args.journal)
+    stock_data = fetcher.fetch_all_stocks(max_workers=args.workers, batch_size=args.batch_size,
+                                          existing=existing, panel=args.panel, retries=args.retries,
+                                          backoff=args.backoff, journal=journal, resume=args.resume)
+    
+    # Save the data; the journal is only needed until the dataset is on disk
+    if fetcher.save_stock_data(stock_data, args.output):
+        journal.remove()
     
-    # Save the data
-    fetcher.save_stock_data(stock_data)
+    if instrumentation is not None:
+        instrumentation.stop()
+        instrumentation.print_summary()
+        report = args.report or 'fetch_report.json'
+        instrumentation.write_report(report)
+        print(f"✓ Run report saved to {report}")
     
     print("=" * 60)
     print("✅ Comprehensive stock data fetching completed!")
     print(f"📊 Successfully processed {len(stock_data)} stocks")
-    print("📁 Data saved to 'comprehensive_stock_data.json'")
+    print(f"📁 Data saved to '{args.output}'")
     print("📈 Summary statistics saved to 'stock_summary_stats.json'")
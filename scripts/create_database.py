@@ -1,10 +1,15 @@
 import sqlite3
 import json
+import argparse
 from datetime import datetime
+from stock_storage import open_store, column_values
+from feature_pipeline import SCHEMA_VERSION, source_columns
+from itertools import repeat
+from operator import itemgetter
 
-def create_database():
+def create_database(db_path='stock_data.db'):
     """Create SQLite database for stock data"""
-    conn = sqlite3.connect('stock_data.db')
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Create stocks table
@@ -44,6 +49,9 @@ def create_database():
         )
     ''')
     
+    migrate_stock_prices(cursor)
+    create_indexes(cursor)
+    
     # Create predictions table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS predictions (
@@ -79,55 +87,272 @@ def create_database():
     conn.close()
     print("Database created successfully!")
 
-def populate_database():
-    """Populate database with stock data"""
-    try:
-        with open('stock_data.json', 'r') as f:
-            stock_data = json.load(f)
-    except FileNotFoundError:
-        print("Error: stock_data.json not found. Please run fetch_stock_data.py first.")
+PRICE_INSERT_SQL = '''
+    INSERT INTO stock_prices 
+    (stock_id, date, open_price, high_price, low_price, close_price, volume,
+     sma_20, sma_50, rsi, macd, macd_signal, bollinger_upper, bollinger_lower)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Re-loading a (stock_id, date) that already exists updates it in place
+PRICE_UPSERT_SQL = PRICE_INSERT_SQL + '''
+    ON CONFLICT(stock_id, date) DO UPDATE SET
+        open_price = excluded.open_price, high_price = excluded.high_price,
+        low_price = excluded.low_price, close_price = excluded.close_price,
+        volume = excluded.volume, sma_20 = excluded.sma_20, sma_50 = excluded.sma_50,
+        rsi = excluded.rsi, macd = excluded.macd, macd_signal = excluded.macd_signal,
+        bollinger_upper = excluded.bollinger_upper, bollinger_lower = excluded.bollinger_lower
+'''
+
+def configure_bulk_load(conn):
+    """Set pragmas that favour one large write transaction"""
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA cache_size = -262144')  # 256 MB
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+def drop_indexes(cursor, unique=False):
+    """Drop the covering index so a bulk load does not maintain it row by row
+
+    The unique (stock_id, date) index stays: it is the constraint that
+    keeps duplicate bars out. `unique=True` also drops it, for benchmarks
+    reproducing the original index-free schema.
+    """
+    if unique:
+        cursor.execute('DROP INDEX IF EXISTS ux_stock_prices_stock_date')
+    cursor.execute('DROP INDEX IF EXISTS idx_stock_prices_stock_date_close')
+
+# One bar per stock per day; also serves range scans and latest-bar lookups
+UNIQUE_PRICE_INDEX = 'CREATE UNIQUE INDEX IF NOT EXISTS ux_stock_prices_stock_date ON stock_prices (stock_id, date)'
+
+def create_indexes(cursor):
+    """Create stock_prices indexes (run after bulk loads)"""
+    cursor.execute(UNIQUE_PRICE_INDEX)
+    # Covers close-price series and latest-close queries without touching the table
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_prices_stock_date_close
+        ON stock_prices (stock_id, date, close_price)
+    ''')
+
+def migrate_stock_prices(cursor):
+    """Build the unique (stock_id, date) index, first removing duplicate rows left by earlier loads
+
+    A no-op once the index exists, so opening a large database does not
+    rescan the table.
+    """
+    exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_stock_prices_stock_date'")
+    if exists.fetchone():
         return
+    cursor.execute('''
+        DELETE FROM stock_prices
+        WHERE id NOT IN (SELECT MAX(id) FROM stock_prices GROUP BY stock_id, date)
+    ''')
+    if cursor.rowcount > 0:
+        print(f"Removed {cursor.rowcount} duplicate price rows")
+    cursor.execute(UNIQUE_PRICE_INDEX)
+
+def upsert_stock(cursor, symbol, data):
+    """Insert or update a stock row and return its id"""
+    exchange = 'NSE' if '.NS' in symbol else 'BSE'
+    # ON CONFLICT keeps the existing id, unlike INSERT OR REPLACE which
+    # deletes the row and orphans its prices
+    cursor.execute('''
+        INSERT INTO stocks (symbol, name, sector, industry, market_cap, exchange)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol) DO UPDATE SET
+            name = excluded.name, sector = excluded.sector, industry = excluded.industry,
+            market_cap = excluded.market_cap, exchange = excluded.exchange
+    ''', (symbol, data['name'], data.get('sector'), data.get('industry'),
+          data.get('market_cap'), exchange))
+    cursor.execute('SELECT id FROM stocks WHERE symbol = ?', (symbol,))
+    return cursor.fetchone()[0]
+
+PRICE_FIELDS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'SMA_50',
+                'RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower']
+
+def price_rows(stock_id, historical_data):
+    """Build stock_prices parameter tuples for one stock"""
+    if isinstance(historical_data, dict):
+        # Column layout: zip whole columns instead of visiting each record
+        length = len(next(iter(historical_data.values()), []))
+        columns = [column_values(historical_data[field]) if field in historical_data else [None] * length
+                   for field in source_columns(historical_data, PRICE_FIELDS)]
+        return list(zip(repeat(stock_id, length), *columns))
     
-    conn = sqlite3.connect('stock_data.db')
+    # Schema 1 records name the bands Bollinger_*
+    fields = source_columns(historical_data[0], PRICE_FIELDS) if historical_data else PRICE_FIELDS
+    if historical_data and all(field in historical_data[0] for field in fields):
+        getter = itemgetter(*fields)
+        return [(stock_id,) + getter(price_data) for price_data in historical_data]
+    return [(stock_id,) + tuple(price_data.get(field) for field in fields)
+            for price_data in historical_data]
+
+def get_price_range(cursor, stock_id, start, end):
+    """Bars for one stock with start <= date <= end, oldest first"""
+    cursor.execute('''
+        SELECT date, open_price, high_price, low_price, close_price, volume
+        FROM stock_prices WHERE stock_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date
+    ''', (stock_id, start, end))
+    return cursor.fetchall()
+
+# stock_prices column holding each of PRICE_FIELDS
+PRICE_COLUMNS = ['date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'sma_20',
+                 'sma_50', 'rsi', 'macd', 'macd_signal', 'bollinger_upper', 'bollinger_lower']
+
+def get_price_page(cursor, stock_id, after=None, limit=10000, inclusive=False):
+    """Up to `limit` bars for one stock dated after `after`, oldest first, with every PRICE_FIELDS column
+
+    Keyset pagination: pass the last date of one page as `after` to get the
+    next. Each page is a seek on the (stock_id, date) index, so reading deep
+    into a long history costs no more than reading its start.
+    """
+    if after is None:
+        condition, params = '', (stock_id, limit)
+    else:
+        condition, params = f"AND date {'>=' if inclusive else '>'} ?", (stock_id, after, limit)
+    cursor.execute(f'''
+        SELECT {', '.join(PRICE_COLUMNS)}
+        FROM stock_prices WHERE stock_id = ? {condition}
+        ORDER BY date LIMIT ?
+    ''', params)
+    return cursor.fetchall()
+
+def get_latest_prices(cursor):
+    """Latest (symbol, date, close_price) for every stock"""
+    cursor.execute('''
+        SELECT s.symbol, p.date, p.close_price
+        FROM stocks s
+        CROSS JOIN stock_prices p  -- CROSS JOIN pins stocks as the outer loop: one seek per stock
+        WHERE p.stock_id = s.id
+            AND p.date = (SELECT MAX(date) FROM stock_prices WHERE stock_id = s.id)
+    ''')
+    return cursor.fetchall()
+
+def save_predictions(conn, model_type, prediction_date, symbols, predicted_prices, signals,
+                     confidences, target_prices, stop_losses):
+    """Insert one prediction row per symbol with a single executemany
+
+    Symbols missing from the stocks table are skipped and reported.
+    Returns the number of rows inserted; if the insert fails nothing is
+    written and the error is re-raised.
+    """
     cursor = conn.cursor()
+    cursor.execute('SELECT symbol, id FROM stocks')
+    stock_ids = dict(cursor.fetchall())
+    
+    columns = [column_values(values) if hasattr(values, 'dtype') else list(values)
+               for values in (predicted_prices, signals, confidences, target_prices, stop_losses)]
+    rows, unknown = [], []
+    for symbol, values in zip(symbols, zip(*columns)):
+        if symbol in stock_ids:
+            rows.append((stock_ids[symbol], model_type, prediction_date) + values)
+        else:
+            unknown.append(symbol)
+    if unknown:
+        print(f"✗ Skipping predictions for {len(unknown)} symbols not in stocks: {', '.join(unknown[:10])}")
+    
+    # One transaction whether or not the connection is in autocommit mode
+    cursor.execute('SAVEPOINT save_predictions')
+    try:
+        cursor.executemany('''
+            INSERT INTO predictions
+            (stock_id, model_type, prediction_date, predicted_price, signal, confidence, target_price, stop_loss)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    except Exception:
+        cursor.execute('ROLLBACK TO save_predictions')
+        cursor.execute('RELEASE save_predictions')
+        raise
+    cursor.execute('RELEASE save_predictions')
+    conn.commit()
+    return len(rows)
+
+def bulk_load(conn, stocks, batch_size=10000):
+    """Load (symbol, data) pairs in one transaction with batched executemany
     
-    for symbol, data in stock_data.items():
+    The connection is switched to autocommit mode to manage the transaction
+    itself and is handed back with its original isolation_level, with
+    nothing left open if the load fails.
+    """
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        return _bulk_load(conn, stocks, batch_size)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.isolation_level = previous_isolation
+
+def _bulk_load(conn, stocks, batch_size):
+    configure_bulk_load(conn)
+    cursor = conn.cursor()
+    total_rows = 0
+    
+    cursor.execute('BEGIN')
+    # Rows are always upserted against the unique (stock_id, date) index;
+    # an empty table defers only the covering index to the end of the load
+    migrate_stock_prices(cursor)
+    fresh = cursor.execute('SELECT 1 FROM stock_prices LIMIT 1').fetchone() is None
+    if fresh:
+        drop_indexes(cursor)
+    else:
+        create_indexes(cursor)
+    
+    for symbol, load in stocks:
+        # A savepoint per symbol keeps one bad stock from aborting the load
+        cursor.execute('SAVEPOINT symbol_load')
         try:
-            # Insert stock info
-            exchange = 'NSE' if '.NS' in symbol else 'BSE'
-            cursor.execute('''
-                INSERT OR REPLACE INTO stocks (symbol, name, sector, industry, market_cap, exchange)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (symbol, data['name'], data.get('sector'), data.get('industry'), 
-                  data.get('market_cap'), exchange))
+            data = load()
+            if data.get('schema_version', 1) > SCHEMA_VERSION:
+                raise ValueError(f"schema version {data['schema_version']} is newer than this loader "
+                                 f"({SCHEMA_VERSION})")
+            stock_id = upsert_stock(cursor, symbol, data)
             
-            stock_id = cursor.lastrowid
+            # Keep the last row per date so the unique index always builds
+            rows = list({row[1]: row for row in price_rows(stock_id, data['historical_data'])}.values())
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(PRICE_UPSERT_SQL, rows[start:start + batch_size])
             
-            # Insert historical prices
-            for price_data in data['historical_data']:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO stock_prices 
-                    (stock_id, date, open_price, high_price, low_price, close_price, volume,
-                     sma_20, sma_50, rsi, macd, macd_signal, bollinger_upper, bollinger_lower)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (stock_id, price_data.get('Date'), price_data.get('Open'),
-                      price_data.get('High'), price_data.get('Low'), price_data.get('Close'),
-                      price_data.get('Volume'), price_data.get('SMA_20'), price_data.get('SMA_50'),
-                      price_data.get('RSI'), price_data.get('MACD'), price_data.get('MACD_Signal'),
-                      price_data.get('Bollinger_Upper'), price_data.get('Bollinger_Lower')))
-            
-            print(f"✓ Inserted data for {symbol}")
+            cursor.execute('RELEASE symbol_load')
+            total_rows += len(rows)
+            print(f"✓ Inserted {len(rows)} rows for {symbol}")
             
         except Exception as e:
+            cursor.execute('ROLLBACK TO symbol_load')
+            cursor.execute('RELEASE symbol_load')
             print(f"✗ Error inserting data for {symbol}: {str(e)}")
     
-    conn.commit()
+    if fresh:
+        create_indexes(cursor)
+    cursor.execute('COMMIT')
+    return total_rows
+
+def populate_database(data_path='stock_data.json', db_path='stock_data.db', batch_size=10000):
+    """Bulk-load stock data from a JSON file or columnar store"""
+    store = open_store(data_path)
+    if not store.exists():
+        print(f"Error: {data_path} not found. Please run fetch_stock_data.py first.")
+        return 0
+    
+    conn = sqlite3.connect(db_path)
+    # Symbols are loaded one at a time, so a columnar store is never fully in memory
+    stocks = ((symbol, lambda symbol=symbol: store.load(symbol)) for symbol in store.symbols())
+    total_rows = bulk_load(conn, stocks, batch_size)
     conn.close()
-    print("Database populated successfully!")
+    print(f"Database populated successfully! ({total_rows} price rows)")
+    return total_rows
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and populate the stock database")
+    parser.add_argument('--data', default='stock_data.json', help="dataset path: a .json file or a columnar store directory")
+    parser.add_argument('--db', default='stock_data.db', help="SQLite database path")
+    args = parser.parse_args()
+    
     print("Creating database...")
-    create_database()
+    create_database(args.db)
     print("Populating database...")
-    populate_database()
+    populate_database(args.data, args.db)
     print("Database setup completed!")
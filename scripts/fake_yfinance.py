@@ -0,0 +1,70 @@
+import pandas as pd
+import numpy as np
+import time
+import zlib
+
+def synthetic_ohlcv(symbol, periods=1250, end=None, seed=None):
+    """Generate a deterministic random-walk OHLCV frame for a symbol"""
+    if seed is None:
+        seed = zlib.crc32(symbol.encode())
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or '2024-12-31').normalize()
+    index = pd.bdate_range(end=end, periods=periods, name='Date')
+
+    start_price = rng.uniform(50, 3000)
+    returns = rng.normal(0.0003, 0.018, periods)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.005, periods))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, periods)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, periods)))
+    volume = rng.integers(100_000, 10_000_000, periods)
+
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+    }, index=index)
+
+class FakeTicker:
+    """Offline stand-in for yf.Ticker backed by synthetic data"""
+    def __init__(self, symbol, latency=0.0, fail_symbols=(), periods=1250):
+        self.symbol = symbol
+        self.latency = latency
+        self.fail_symbols = set(fail_symbols)
+        self.periods = periods
+
+    def history(self, period="5y", start=None, end=None):
+        time.sleep(self.latency)
+        if self.symbol in self.fail_symbols:
+            raise ConnectionError(f"Simulated failure for {self.symbol}")
+        hist = synthetic_ohlcv(self.symbol, periods=self.periods)
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        if end is not None:
+            hist = hist[hist.index < pd.Timestamp(end)]
+        return hist
+
+    @property
+    def info(self):
+        time.sleep(self.latency)
+        return {
+            'longName': self.symbol,
+            'sector': 'Unknown',
+            'industry': 'Unknown',
+            'marketCap': 0,
+        }
+
+def make_ticker_factory(latency=0.0, fail_symbols=(), periods=1250):
+    """Build a ticker factory usable in place of yf.Ticker"""
+    def factory(symbol):
+        return FakeTicker(symbol, latency=latency, fail_symbols=fail_symbols, periods=periods)
+    return factory
+
+def fake_download(tickers, period="5y", group_by='ticker', periods=1250, **kwargs):
+    """Offline stand-in for yf.download returning a ticker-grouped wide frame"""
+    if isinstance(tickers, str):
+        tickers = tickers.split()
+    frames = {symbol: synthetic_ohlcv(symbol, periods=periods) for symbol in tickers}
+    return pd.concat(frames, axis=1)
@@ -0,0 +1,109 @@
+import numpy as np
+import hashlib
+import pickle
+import shutil
+import json
+import os
+
+CACHE_VERSION = 1
+
+def data_fingerprint(historical_data):
+    """Content hash of a stock's historical data, in either stored layout"""
+    digest = hashlib.sha256()
+    if isinstance(historical_data, dict):
+        for column in sorted(historical_data):
+            values = historical_data[column]
+            digest.update(column.encode())
+            if isinstance(values, np.ndarray):
+                digest.update(values.dtype.str.encode())
+                digest.update(np.ascontiguousarray(values).tobytes())
+            else:
+                digest.update(json.dumps(list(values), default=str).encode())
+    else:
+        digest.update(json.dumps(historical_data, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+class FeatureCache:
+    """Content-addressed on-disk cache of scaled feature matrices
+
+    An entry is keyed by symbol, data fingerprint, feature list, target and
+    sequence length, so any change to the inputs is simply a miss. Entries
+    are directories holding X.npy, y.npy (loaded memory-mapped) and the
+    fitted scalers; the least recently used ones are evicted once the cache
+    grows past max_bytes.
+    """
+    def __init__(self, directory='feature_cache', max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, symbol, historical_data, features, target_column, sequence_length):
+        parts = [CACHE_VERSION, symbol, data_fingerprint(historical_data), list(features),
+                 target_column, sequence_length]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return (X, y, scaler, feature_scaler) or None"""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, 'scalers.pkl'), 'rb') as f:
+                scalers = pickle.load(f)
+            X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='r')
+            y = np.load(os.path.join(entry, 'y.npy'), mmap_mode='r')
+        except (FileNotFoundError, EOFError, ValueError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(entry)  # mark as recently used
+        self.hits += 1
+        return X, y, scalers['scaler'], scalers['feature_scaler']
+
+    def put(self, key, X, y, scaler, feature_scaler):
+        entry = self._entry(key)
+        staging = f"{entry}.tmp{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        np.save(os.path.join(staging, 'X.npy'), X)
+        np.save(os.path.join(staging, 'y.npy'), y)
+        with open(os.path.join(staging, 'scalers.pkl'), 'wb') as f:
+            pickle.dump({'scaler': scaler, 'feature_scaler': feature_scaler}, f)
+
+        # Publish atomically; a concurrent writer of the same key wrote the same content
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """(mtime, bytes, path) of every entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if '.tmp' in name or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        entries = self.entries()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries)}
+
+    def report(self):
+        stats = self.stats()
+        print(f"Feature cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB) in {self.directory}")
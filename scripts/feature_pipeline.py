@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import operator
+
+# Version of the column names and layout the fetchers emit, stored with
+# each stock record. 1 was fetch_stock_data.py's original output:
+# Bollinger_Upper/Bollinger_Lower and no Date column.
+SCHEMA_VERSION = 2
+
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Schema 1 names still found in older datasets and requests
+LEGACY_ALIASES = {'Bollinger_Upper': 'BB_Upper', 'Bollinger_Lower': 'BB_Lower'}
+
+def rsi(prices, window=14):
+    """Relative Strength Index over simple rolling means of gains and losses"""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def stochastic_k(high, low, close, window=14):
+    low_min = low.rolling(window=window).min()
+    high_max = high.rolling(window=window).max()
+    return 100 * ((close - low_min) / (high_max - low_min))
+
+def atr(high, low, close, window=14):
+    """Average True Range"""
+    high_low = high - low
+    high_close = np.abs(high - close.shift())
+    low_close = np.abs(low - close.shift())
+    true_range = np.max(pd.concat([high_low, high_close, low_close], axis=1), axis=1)
+    return true_range.rolling(window).mean()
+
+class Indicator:
+    """A node of the indicator graph: primitive `op` applied to the columns named by `inputs`
+
+    Each op is implemented once per engine (PANDAS_OPS below, numpy panels
+    in panel_indicators, per-bar state in streaming_indicators) and
+    `params` holds its windows, so every engine computes the same graph.
+    """
+    __slots__ = ('name', 'inputs', 'op', 'params')
+
+    def __init__(self, name, inputs, op, **params):
+        self.name = name
+        self.inputs = inputs
+        self.op = op
+        self.params = params
+
+PANDAS_OPS = {
+    'sma': lambda series, window: series.rolling(window=window).mean(),
+    'ema': lambda series, span: series.ewm(span=span).mean(),
+    'std': lambda series, window, scale=1: series.rolling(window=window).std() * scale,
+    'rsi': rsi,
+    'stoch_k': stochastic_k,
+    'atr': atr,
+    'add': operator.add,
+    'sub': operator.sub,
+    'div': operator.truediv,
+    'identity': lambda series: series,
+}
+
+INDICATORS = {indicator.name: indicator for indicator in [
+    Indicator('SMA_5', ['Close'], 'sma', window=5),
+    Indicator('SMA_10', ['Close'], 'sma', window=10),
+    Indicator('SMA_20', ['Close'], 'sma', window=20),
+    Indicator('SMA_50', ['Close'], 'sma', window=50),
+    Indicator('SMA_200', ['Close'], 'sma', window=200),
+    Indicator('EMA_12', ['Close'], 'ema', span=12),
+    Indicator('EMA_26', ['Close'], 'ema', span=26),
+    Indicator('RSI', ['Close'], 'rsi', window=14),
+    Indicator('MACD', ['EMA_12', 'EMA_26'], 'sub'),
+    Indicator('MACD_Signal', ['MACD'], 'ema', span=9),
+    Indicator('MACD_Histogram', ['MACD', 'MACD_Signal'], 'sub'),
+    Indicator('BB_Middle', ['SMA_20'], 'identity'),
+    Indicator('BB_Width', ['Close'], 'std', window=20, scale=2),
+    Indicator('BB_Upper', ['BB_Middle', 'BB_Width'], 'add'),
+    Indicator('BB_Lower', ['BB_Middle', 'BB_Width'], 'sub'),
+    Indicator('Stoch_K', ['High', 'Low', 'Close'], 'stoch_k', window=14),
+    Indicator('Stoch_D', ['Stoch_K'], 'sma', window=3),
+    Indicator('ATR', ['High', 'Low', 'Close'], 'atr', window=14),
+    Indicator('Volume_SMA', ['Volume'], 'sma', window=20),
+    Indicator('Volume_Ratio', ['Volume', 'Volume_SMA'], 'div'),
+]}
+
+# Everything ComprehensiveStockFetcher computes in full mode
+FULL_COLUMNS = ['SMA_5', 'SMA_10', 'SMA_20', 'SMA_50', 'SMA_200', 'EMA_12', 'EMA_26', 'RSI', 'MACD',
+                'MACD_Signal', 'MACD_Histogram', 'BB_Middle', 'BB_Upper', 'BB_Lower', 'Stoch_K', 'Stoch_D',
+                'ATR', 'Volume_SMA', 'Volume_Ratio']
+# Indicators the fetcher saves or reports (prepare_historical_data, get_latest_technical_indicators)
+LEAN_COLUMNS = ['SMA_20', 'SMA_50', 'RSI', 'MACD', 'MACD_Signal', 'BB_Middle', 'BB_Upper', 'BB_Lower',
+                'ATR', 'Volume_Ratio']
+# Indicators stored per bar for training and the stock_prices table
+TRAINING_COLUMNS = ['SMA_20', 'SMA_50', 'RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower']
+
+def resolve(outputs):
+    """Indicators needed for `outputs`, ordered so each comes after its inputs"""
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done or name in BASE_COLUMNS:
+            return
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        if name in visiting:
+            raise ValueError(f"Indicator dependency cycle through {name}")
+        visiting.add(name)
+        for dependency in INDICATORS[name].inputs:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in outputs:
+        visit(name)
+    return order
+
+class FeaturePipeline:
+    """Computes `outputs` from OHLCV through the indicator graph
+
+    Each indicator in the dependency closure is computed exactly once,
+    so MACD and MACD_Signal share the EMAs and the Bollinger bands share
+    SMA_20. Intermediates that are not outputs are released after their
+    last use. With `dtype` (e.g. np.float32) the outputs are cast to it;
+    the computation itself stays float64.
+    """
+    def __init__(self, outputs, dtype=None):
+        self.outputs = list(outputs)
+        self.dtype = dtype
+        self.order = resolve(self.outputs)
+        self.last_use = {}
+        for position, name in enumerate(self.order):
+            for dependency in INDICATORS[name].inputs:
+                self.last_use[dependency] = position
+
+    def compute(self, df):
+        """Output columns as a dict of Series"""
+        return self.evaluate(df, PANDAS_OPS)
+
+    def evaluate(self, columns, ops):
+        """Outputs computed from the OHLCV in `columns` with the `ops` implementations
+
+        `columns` maps column names to whatever the ops work on: Series
+        for PANDAS_OPS, (symbols x time) arrays for the panel ops.
+        """
+        values = {column: columns[column] for column in BASE_COLUMNS if column in columns}
+        for position, name in enumerate(self.order):
+            indicator = INDICATORS[name]
+            values[name] = ops[indicator.op](*(values[column] for column in indicator.inputs), **indicator.params)
+            for dependency in indicator.inputs:
+                if self.last_use[dependency] == position and dependency not in self.outputs \
+                        and dependency not in BASE_COLUMNS:
+                    del values[dependency]
+        outputs = {name: values[name] for name in self.outputs}
+        if self.dtype is not None:
+            outputs = {name: output.astype(self.dtype) for name, output in outputs.items()}
+        return outputs
+
+    def assign(self, df):
+        """Add the outputs to `df` in place and return it"""
+        for name, series in self.compute(df).items():
+            df[name] = series
+        return df
+
+    def frame(self, df):
+        """A new frame holding only OHLCV and the outputs"""
+        out = df[BASE_COLUMNS].copy()
+        for name, series in self.compute(df).items():
+            out[name] = series
+        return out
+
+def source_columns(available, columns):
+    """The name each of `columns` is stored under in `available`, falling back to its legacy alias"""
+    legacy = {canonical: alias for alias, canonical in LEGACY_ALIASES.items()}
+    return [legacy[column] if column not in available and legacy.get(column) in available else column
+            for column in columns]
+
+def canonical_frame(df):
+    """Rename legacy columns of `df` to their canonical names"""
+    renames = {alias: canonical for alias, canonical in LEGACY_ALIASES.items()
+               if alias in df.columns and canonical not in df.columns}
+    return df.rename(columns=renames) if renames else df
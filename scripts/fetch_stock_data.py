@@ -1,13 +1,30 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import argparse
+from batch_download import download_history_batch
+from stock_storage import open_store, column_values
+from feature_pipeline import FeaturePipeline, TRAINING_COLUMNS, SCHEMA_VERSION
 
-def fetch_nse_bse_stocks():
+# The indicators the trainer and the DB loader read
+PIPELINE = FeaturePipeline(TRAINING_COLUMNS)
+LEAN_PIPELINE = FeaturePipeline(TRAINING_COLUMNS, dtype=np.float32)
+
+def fetch_nse_bse_stocks(lean=False, ticker_factory=None, download_fn=None):
     """
     Fetch stock data for popular NSE and BSE stocks
+    
+    With `lean`, indicators are stored as float32, only OHLCV and
+    TRAINING_COLUMNS are kept and historical_data is saved column-oriented
+    instead of as one dict per row. Symbols missing from the batched
+    download, or with no prices in it, are requested on their own.
+    `ticker_factory` and `download_fn` replace yf.Ticker and
+    yf.download, e.g. with the fake_yfinance stand-ins.
     """
+    if ticker_factory is None:
+        import yfinance as yf
+        ticker_factory = yf.Ticker
     # Popular NSE stocks
     nse_stocks = [
         "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "HINDUNILVR.NS",
@@ -27,24 +44,30 @@ def fetch_nse_bse_stocks():
     
     print(f"Fetching data for {len(all_stocks)} stocks...")
     
+    # Fetch 5 years of data for the whole list in a few batched requests
+    histories = download_history_batch(all_stocks, period="5y", download=download_fn)
+    
     for symbol in all_stocks:
         try:
-            print(f"Fetching data for {symbol}...")
-            
-            # Fetch 5 years of data
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period="5y")
+            # Popped so each raw frame is released once its record is built
+            hist = histories.pop(symbol, None)
+            ticker = ticker_factory(symbol)
+            if hist is None or hist.empty:
+                hist = ticker.history(period="5y")
             
             if not hist.empty:
                 # Calculate technical indicators
-                hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
-                hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-                hist['RSI'] = calculate_rsi(hist['Close'])
-                hist['MACD'], hist['MACD_Signal'] = calculate_macd(hist['Close'])
-                hist['Bollinger_Upper'], hist['Bollinger_Lower'] = calculate_bollinger_bands(hist['Close'])
+                dates = hist.index.strftime('%Y-%m-%d').tolist()
+                if lean:
+                    hist = LEAN_PIPELINE.frame(hist)
+                    historical_data = {'Date': dates}
+                    historical_data.update({column: column_values(hist[column].to_numpy()) for column in hist.columns})
+                else:
+                    hist = PIPELINE.assign(hist)
+                    historical_data = [{'Date': date, **record} for date, record in zip(dates, hist.to_dict('records'))]
                 
                 # Get stock info
-                info = stock.info
+                info = ticker.info
                 
                 stock_data[symbol] = {
                     'symbol': symbol,
@@ -53,56 +76,33 @@ def fetch_nse_bse_stocks():
                     'industry': info.get('industry', 'Unknown'),
                     'market_cap': info.get('marketCap', 0),
                     'current_price': hist['Close'].iloc[-1],
-                    'historical_data': hist.to_dict('records'),
-                    'last_updated': datetime.now().isoformat()
+                    'historical_data': historical_data,
+                    'last_updated': datetime.now().isoformat(),
+                    'schema_version': SCHEMA_VERSION,
                 }
                 
                 print(f"✓ Successfully fetched data for {symbol}")
             else:
                 print(f"✗ No data available for {symbol}")
                 
-        except Exception as e: 
-                print(f"✗ No data available for {symbol}")
-                
         except Exception as e:
             print(f"✗ Error fetching data for {symbol}: {str(e)}")
             continue
     
     return stock_data
 
-def calculate_rsi(prices, window=14):
-    """Calculate Relative Strength Index"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(prices, fast=12, slow=26, signal=9):
-    """Calculate MACD indicator"""
-    ema_fast = prices.ewm(span=fast).mean()
-    ema_slow = prices.ewm(span=slow).mean()
-    macd = ema_fast - ema_slow
-    macd_signal = macd.ewm(span=signal).mean()
-    return macd, macd_signal
-
-def calculate_bollinger_bands(prices, window=20, num_std=2):
-    """Calculate Bollinger Bands"""
-    sma = prices.rolling(window=window).mean()
-    std = prices.rolling(window=window).std()
-    upper_band = sma + (std * num_std)
-    lower_band = sma - (std * num_std)
-    return upper_band, lower_band
-
 def save_stock_data(stock_data, filename='stock_data.json'):
-    """Save stock data to JSON file"""
-    with open(filename, 'w') as f:
-        json.dump(stock_data, f, indent=2, default=str)
+    """Save stock data to a JSON file, or a columnar store if `filename` is a directory"""
+    open_store(filename).save(stock_data)
     print(f"Stock data saved to {filename}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch 5 years of NSE/BSE stock data")
+    parser.add_argument('--lean', action='store_true',
+                        help="keep only the columns training reads, with float32 indicators, to cut peak memory")
+    args = parser.parse_args()
+    
     print("Starting stock data collection for NSE and BSE...")
-    stock_data = fetch_nse_bse_stocks()
+    stock_data = fetch_nse_bse_stocks(lean=args.lean)
     save_stock_data(stock_data)
     print(f"Data collection completed. Fetched data for {len(stock_data)} stocks.")
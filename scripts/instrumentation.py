@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+import contextlib
+import threading
+import cProfile
+import pstats
+import json
+import time
+import io
+import os
+from datetime import datetime
+
+def payload_bytes(value):
+    """In-memory size of a frame, array or buffer; None for anything else"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    return None
+
+def path_bytes(path):
+    """Size of a file, or of every file under a directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+class Span:
+    """One timed stage; `record(bytes_in=..., bytes_out=...)` attaches payload sizes"""
+    __slots__ = ('recorder', 'name', 'symbol', 'start', 'bytes_in', 'bytes_out')
+    enabled = True
+
+    def __init__(self, recorder, name, symbol):
+        self.recorder = recorder
+        self.name = name
+        self.symbol = symbol
+        self.bytes_in = None
+        self.bytes_out = None
+
+    def record(self, bytes_in=None, bytes_out=None):
+        """Attach sizes, given as byte counts or as frames/arrays to measure"""
+        if bytes_in is not None:
+            self.bytes_in = bytes_in if isinstance(bytes_in, int) else payload_bytes(bytes_in)
+        if bytes_out is not None:
+            self.bytes_out = bytes_out if isinstance(bytes_out, int) else payload_bytes(bytes_out)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.add(self.name, self.symbol, time.perf_counter() - self.start,
+                          self.bytes_in, self.bytes_out, failed=exc_type is not None)
+        return False
+
+class NullSpan:
+    """Shared no-op span handed out while instrumentation is disabled"""
+    enabled = False
+
+    def record(self, bytes_in=None, bytes_out=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Instrumentation:
+    """Named, per-symbol timing spans aggregated into a run report
+
+        with instrumentation.span('indicators', symbol) as span:
+            df = calculate_technical_indicators(df)
+            span.record(bytes_out=df)
+
+    Spans may be opened from any thread. Every sample is kept, so the
+    report can give count, p50/p95/max and bytes in/out per stage plus
+    the time each symbol spent in each stage. When disabled, span()
+    returns one shared no-op object and nothing is timed or stored.
+    With `profile`, start()/stop() also run cProfile over the calling
+    thread, and work wrapped in profiling() on other threads is profiled
+    per thread and merged into the report.
+    """
+    def __init__(self, enabled=True, profile=False):
+        self.enabled = enabled
+        self.profiler = cProfile.Profile() if enabled and profile else None
+        self.thread_profilers = []
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.wall_start = None
+        self.wall_time = None
+
+    def span(self, name, symbol=None):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, symbol)
+
+    def add(self, name, symbol, seconds, bytes_in=None, bytes_out=None, failed=False):
+        with self.lock:
+            self.samples.setdefault(name, []).append((symbol, seconds, bytes_in, bytes_out, failed))
+
+    @contextlib.contextmanager
+    def profiling(self):
+        """Profile the calling thread for the block; cProfile only sees the thread that enabled it"""
+        if self.profiler is None:
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows a single active profiler, which already sees every thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self.lock:
+                self.thread_profilers.append(profiler)
+
+    def start(self):
+        self.started_at = datetime.now().isoformat()
+        self.wall_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.wall_start is not None:
+            self.wall_time = time.perf_counter() - self.wall_start
+
+    def stage_stats(self, name):
+        samples = self.samples.get(name, [])
+        seconds = np.array([s[1] for s in samples])
+        bytes_in = [s[2] for s in samples if s[2] is not None]
+        bytes_out = [s[3] for s in samples if s[3] is not None]
+        return {
+            'count': len(samples),
+            'failed': sum(1 for s in samples if s[4]),
+            'total': float(seconds.sum()),
+            'mean': float(seconds.mean()) if len(seconds) else 0.0,
+            'p50': float(np.percentile(seconds, 50)) if len(seconds) else 0.0,
+            'p95': float(np.percentile(seconds, 95)) if len(seconds) else 0.0,
+            'max': float(seconds.max()) if len(seconds) else 0.0,
+            'bytes_in': int(sum(bytes_in)) if bytes_in else None,
+            'bytes_out': int(sum(bytes_out)) if bytes_out else None,
+        }
+
+    def merged_profile(self):
+        """pstats.Stats over the start()/stop() profile plus every per-thread one"""
+        if self.profiler is None:
+            return None
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        with self.lock:
+            thread_profilers = list(self.thread_profilers)
+        for profiler in thread_profilers:
+            stats.add(profiler)
+        return stats
+
+    def profile_stats(self, limit=30):
+        """The `limit` functions with the most cumulative time, as dicts"""
+        if self.profiler is None:
+            return []
+        stats = self.merged_profile()
+        rows = []
+        for (filename, line, function), (calls, _, own, cumulative, _) in stats.stats.items():
+            rows.append({'function': f"{os.path.basename(filename)}:{line}({function})", 'calls': calls,
+                         'own': own, 'cumulative': cumulative})
+        rows.sort(key=lambda row: row['cumulative'], reverse=True)
+        return rows[:limit]
+
+    def report(self):
+        with self.lock:
+            names = list(self.samples)
+            symbols = {}
+            for name, samples in self.samples.items():
+                for symbol, seconds, _, _, _ in samples:
+                    if symbol is not None:
+                        stages = symbols.setdefault(symbol, {})
+                        stages[name] = stages.get(name, 0.0) + seconds
+        return {
+            'started_at': self.started_at,
+            'wall_time': self.wall_time,
+            'stages': {name: self.stage_stats(name) for name in names},
+            'symbols': symbols,
+            'profile': self.profile_stats(),
+        }
+
+    def write_report(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        if self.profiler is not None:
+            # Raw profile alongside, for snakeviz / pstats
+            self.merged_profile().dump_stats(os.path.splitext(filename)[0] + '.prof')
+
+    def print_summary(self):
+        report = self.report()
+        print(f"{'stage':<24} {'count':>6} {'total (s)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'max (ms)':>9} "
+              f"{'in (MB)':>8} {'out (MB)':>8}")
+        for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['total']):
+            size = lambda n: f"{n / 1024 / 1024:.1f}" if n is not None else '-'
+            print(f"{name:<24} {stats['count']:>6} {stats['total']:>10.2f} {stats['p50'] * 1000:>9.1f} "
+                  f"{stats['p95'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f} {size(stats['bytes_in']):>8} "
+                  f"{size(stats['bytes_out']):>8}")
+        if report['wall_time'] is not None:
+            print(f"Wall time {report['wall_time']:.2f}s")
+        for row in report['profile'][:10]:
+            print(f"  {row['cumulative']:>8.3f}s {row['calls']:>8} {row['function']}")
+
+# Shared disabled instance, so instrumented code never needs a None check
+DISABLED = Instrumentation(enabled=False)
@@ -0,0 +1,98 @@
+import http.client
+import threading
+import argparse
+import json
+import time
+from urllib.parse import urlparse
+from stock_storage import open_store, historical_records
+
+def make_payloads(store, symbols, model_type, rows):
+    """One request body per symbol holding its latest `rows` bars"""
+    payloads = []
+    for symbol in symbols:
+        records = historical_records(store.load(symbol)['historical_data'])[-rows:]
+        payloads.append(json.dumps({'symbol': symbol, 'model_type': model_type,
+                                    'historical_data': records}, default=str).encode())
+    return payloads
+
+def run_load(url, payloads, total_requests, concurrency):
+    """Send total_requests POSTs from `concurrency` keep-alive clients; returns (latencies, errors, elapsed)"""
+    target = urlparse(url)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            body = payloads[i % len(payloads)]
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                data = response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port)
+                ok, data = False, str(e).encode()
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(data[:200])
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+def fetch_stats(url):
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port)
+    conn.request('GET', '/stats')
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test prediction_service.py")
+    parser.add_argument('--url', default='http://127.0.0.1:8500')
+    parser.add_argument('--data', default='stock_data.json', help="dataset the request bars are taken from")
+    parser.add_argument('--symbols', nargs='+', help="symbols to request (default: every symbol in the dataset)")
+    parser.add_argument('--model-type', default='lstm')
+    parser.add_argument('--rows', type=int, default=120, help="bars sent per request")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    store = open_store(args.data)
+    payloads = make_payloads(store, args.symbols or store.symbols(), args.model_type, args.rows)
+
+    # Warm up so model loading is not counted as request latency
+    run_load(args.url, payloads, len(payloads), 1)
+    latencies, errors, elapsed = run_load(args.url, payloads, args.requests, args.concurrency)
+
+    print(f"{len(latencies):,} ok, {len(errors):,} failed in {elapsed:.2f}s with {args.concurrency} clients")
+    if errors:
+        print(f"  first error: {errors[0]!r}")
+    if latencies:
+        latencies.sort()
+        print(f"  throughput: {len(latencies) / elapsed:,.0f} requests/sec")
+        print(f"  latency: p50 {percentile(latencies, 50) * 1000:.2f} ms, p90 {percentile(latencies, 90) * 1000:.2f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    stats = fetch_stats(args.url)
+    print(f"  server: {stats['batching']['mean_batch_size']:.1f} predictions per model call, "
+          f"{stats['models']['loaded']} models loaded")
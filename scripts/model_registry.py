@@ -0,0 +1,209 @@
+import threading
+import copy
+import pickle
+import json
+import os
+from datetime import datetime
+
+REGISTRY_VERSION = 1
+
+# Native format per model type; joblib files are memory-mapped on load
+MODEL_FORMATS = {
+    'lstm': 'keras',
+    'gru': 'keras',
+    'transformer': 'keras',
+    'random_forest': 'joblib',
+    'xgboost': 'ubj',
+}
+
+# Formats written by earlier versions of StockPredictor.save_model
+LEGACY_FORMATS = {'lstm': 'h5', 'gru': 'h5', 'transformer': 'h5', 'random_forest': 'pkl', 'xgboost': 'pkl'}
+
+def model_filename(path, model_type):
+    """The model file for `path`, preferring the native format over a legacy one"""
+    native = f"{path}.{MODEL_FORMATS[model_type]}"
+    legacy = f"{path}.{LEGACY_FORMATS[model_type]}"
+    return legacy if not os.path.exists(native) and os.path.exists(legacy) else native
+
+def save_native(model, model_type, path):
+    """Save `model` in its native format at `path` plus extension; returns the file name"""
+    filename = f"{path}.{MODEL_FORMATS[model_type]}"
+    if filename.endswith('.keras'):
+        model.save(filename)
+    elif filename.endswith('.ubj'):
+        model.save_model(filename)
+    else:
+        import joblib
+        # Uncompressed, so the tree arrays can be memory-mapped back
+        joblib.dump(model, filename)
+    return filename
+
+def load_native(model_type, filename):
+    """Load a model written by save_native (or a legacy .h5/.pkl file)"""
+    extension = os.path.splitext(filename)[1]
+    if extension in ('.keras', '.h5'):
+        import tensorflow as tf
+        return tf.keras.models.load_model(filename)
+    if extension == '.ubj':
+        import xgboost as xgb
+        model = xgb.XGBRegressor()
+        model.load_model(filename)
+        return model
+    if extension == '.pkl':
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+    import joblib
+    return joblib.load(filename, mmap_mode='r')
+
+def save_scalers(predictor, filename):
+    with open(filename, 'wb') as f:
+        pickle.dump({'scaler': predictor.scaler, 'feature_scaler': predictor.feature_scaler}, f)
+
+def load_scalers(predictor, filename):
+    with open(filename, 'rb') as f:
+        scalers = pickle.load(f)
+    predictor.scaler = scalers['scaler']
+    predictor.feature_scaler = scalers['feature_scaler']
+
+def save_symbol_scalers(symbol_scalers, filename):
+    """Save a pooled model's {symbol: {'scaler', 'feature_scaler', 'symbol_id'}}"""
+    with open(filename, 'wb') as f:
+        pickle.dump(symbol_scalers, f)
+
+def load_symbol_scalers(filename):
+    """A pooled model's {symbol: {'scaler', 'feature_scaler', 'symbol_id'}}"""
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+def member_view(predictor, symbol_scalers, symbol):
+    """A copy of a pooled `predictor` that shares its model but scales and tags like `symbol`"""
+    if symbol not in symbol_scalers:
+        raise ValueError(f"{symbol} is not one of the {len(symbol_scalers)} symbols the pooled model was trained on")
+    view = copy.copy(predictor)
+    view.scaler = symbol_scalers[symbol]['scaler']
+    view.feature_scaler = symbol_scalers[symbol]['feature_scaler']
+    view.symbol_id = symbol_scalers[symbol]['symbol_id']
+    return view
+
+class LazyModel:
+    """Stands in for a saved model and loads it on first attribute access"""
+    def __init__(self, model_type, filename):
+        self.model_type = model_type
+        self.filename = filename
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_native(self.model_type, self.filename)
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+class ModelRegistry:
+    """Trained models stored as <root>/<symbol>/<model_type>/
+
+    Each entry holds the model in its native format, the fitted scalers
+    and meta.json with the feature list, metrics and save time. meta.json
+    is written last, so an entry without it is incomplete and ignored.
+
+    A pooled entry (one model trained on many symbols) instead holds every
+    member symbol's fitted scalers and symbol ID, and is opened for one
+    member at a time.
+    """
+    def __init__(self, root='models'):
+        self.root = root
+
+    def entry(self, symbol, model_type):
+        return os.path.join(self.root, symbol, model_type)
+
+    def save(self, symbol, predictor, metrics=None, symbol_scalers=None):
+        """Save `predictor` as the entry for `symbol`; pass `symbol_scalers` for a pooled model"""
+        from train_model import FEATURES
+        from feature_pipeline import SCHEMA_VERSION
+        directory = self.entry(symbol, predictor.model_type)
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        filename = save_native(predictor.model, predictor.model_type, os.path.join(directory, 'model'))
+        if symbol_scalers is None:
+            save_scalers(predictor, os.path.join(directory, 'scalers.pkl'))
+        else:
+            save_symbol_scalers(symbol_scalers, os.path.join(directory, 'symbol_scalers.pkl'))
+        meta = {
+            'registry_version': REGISTRY_VERSION,
+            'symbol': symbol,
+            'model_type': predictor.model_type,
+            'model_file': os.path.basename(filename),
+            'features': FEATURES,
+            'schema_version': SCHEMA_VERSION,
+            'sequence_length': predictor.sequence_length,
+            'metrics': metrics or {},
+            'saved_at': datetime.now().isoformat(),
+        }
+        if symbol_scalers is not None:
+            meta['pooled'] = True
+            meta['members'] = sorted(symbol_scalers)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        return directory
+
+    def metadata(self, symbol, model_type):
+        with open(os.path.join(self.entry(symbol, model_type), 'meta.json'), 'r') as f:
+            return json.load(f)
+
+    def entries(self):
+        """(symbol, model_type) of every complete entry"""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for model_type in sorted(os.listdir(symbol_dir)):
+                if os.path.exists(os.path.join(symbol_dir, model_type, 'meta.json')):
+                    entries.append((symbol, model_type))
+        return entries
+
+    def open(self, symbol, model_type, lazy=True, member=None):
+        """A StockPredictor for a saved entry; the model itself loads on first use unless lazy=False
+
+        A pooled entry needs the `member` symbol whose scalers and symbol
+        ID to predict with.
+        """
+        if self.metadata(symbol, model_type).get('pooled'):
+            if member is None:
+                raise ValueError(f"{symbol}/{model_type} is a pooled model; open it for one of its symbols")
+            return member_view(*self.open_pooled(symbol, model_type, lazy=lazy), member)
+        predictor = self._open_model(symbol, model_type, lazy)
+        load_scalers(predictor, os.path.join(self.entry(symbol, model_type), 'scalers.pkl'))
+        return predictor
+
+    def open_pooled(self, symbol, model_type, lazy=True):
+        """A pooled entry's shared predictor, without scalers, and every member's scalers
+
+        member_view(predictor, symbol_scalers, member) gives one member's
+        predictor, so serving many members keeps a single model loaded.
+        """
+        predictor = self._open_model(symbol, model_type, lazy)
+        return predictor, load_symbol_scalers(os.path.join(self.entry(symbol, model_type), 'symbol_scalers.pkl'))
+
+    def _open_model(self, symbol, model_type, lazy):
+        from train_model import StockPredictor
+        meta = self.metadata(symbol, model_type)
+        predictor = StockPredictor(model_type=model_type)
+        predictor.sequence_length = meta['sequence_length']
+        predictor.model = LazyModel(model_type, os.path.join(self.entry(symbol, model_type), meta['model_file']))
+        if not lazy:
+            predictor.model = predictor.model.load()
+        return predictor
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from feature_pipeline import FeaturePipeline, BASE_COLUMNS, FULL_COLUMNS
+
+OHLCV_COLUMNS = BASE_COLUMNS
+
+class OHLCVPanel:
+    """OHLCV for many symbols stacked into aligned (symbols x time) arrays
+
+    Histories are right-aligned on their latest bar and left-padded with NaN,
+    so every rolling window runs over a symbol's own consecutive bars exactly
+    as the per-symbol pandas code does. `mask` marks the real (unpadded) bars.
+    """
+    def __init__(self, symbols, frames, mask, arrays):
+        self.symbols = symbols
+        self.frames = frames
+        self.mask = mask
+        self.arrays = arrays
+
+    @classmethod
+    def from_frames(cls, frames, columns=OHLCV_COLUMNS):
+        symbols = list(frames)
+        length = max((len(frames[s]) for s in symbols), default=0)
+        mask = np.zeros((len(symbols), length), dtype=bool)
+        arrays = {c: np.full((len(symbols), length), np.nan) for c in columns}
+
+        for row, symbol in enumerate(symbols):
+            frame = frames[symbol]
+            start = length - len(frame)
+            mask[row, start:] = True
+            for column in columns:
+                arrays[column][row, start:] = frame[column].to_numpy(dtype=np.float64)
+
+        return cls(symbols, {s: frames[s] for s in symbols}, mask, arrays)
+
+    def to_frames(self, indicators, columns=None):
+        """Attach indicator arrays back onto each symbol's original frame (only `columns` of it, if given)"""
+        frames = {}
+        for row, symbol in enumerate(self.symbols):
+            frame = self.frames[symbol] if columns is None else self.frames[symbol][columns]
+            start = self.mask.shape[1] - len(frame)
+            attached = pd.DataFrame({name: values[row, start:] for name, values in indicators.items()},
+                                    index=frame.index)
+            frames[symbol] = pd.concat([frame, attached], axis=1)
+        return frames
+
+def rolling_mean(x, window):
+    """Row-wise rolling mean; NaN unless the full window is valid"""
+    valid = ~np.isnan(x)
+    sums = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums = np.concatenate([np.zeros((x.shape[0], 1)), sums], axis=1)
+    counts = np.concatenate([np.zeros((x.shape[0], 1), dtype=counts.dtype), counts], axis=1)
+
+    out = np.full(x.shape, np.nan)
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    out[:, window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return out
+
+def rolling_std(x, window):
+    """Row-wise rolling sample standard deviation (ddof=1)"""
+    # Centre each row first so the sum-of-squares form does not cancel badly
+    centred = x - np.nanmean(x, axis=1, keepdims=True)
+    mean = rolling_mean(centred, window)
+    mean_sq = rolling_mean(centred * centred, window)
+    variance = (mean_sq - mean * mean) * window / (window - 1)
+    return np.sqrt(np.clip(variance, 0.0, None))
+
+def rolling_min(x, window):
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(x, window, axis=1).min(axis=-1)
+    return out
+
+def rolling_max(x, window):
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(x, window, axis=1).max(axis=-1)
+    return out
+
+def ewm_mean(x, span):
+    """Row-wise pandas ewm(span=span).mean() (adjust=True), vectorized across symbols"""
+    decay = 1.0 - 2.0 / (span + 1.0)
+    valid = ~np.isnan(x)
+    values = np.where(valid, x, 0.0)
+    numerator = np.zeros(x.shape[0])
+    denominator = np.zeros(x.shape[0])
+    out = np.empty(x.shape)
+    for t in range(x.shape[1]):
+        numerator = numerator * decay + values[:, t]
+        denominator = denominator * decay + valid[:, t]
+        out[:, t] = numerator / np.where(denominator > 0, denominator, np.nan)
+    return out
+
+def shift(x, periods=1):
+    out = np.full(x.shape, np.nan)
+    out[:, periods:] = x[:, :-periods]
+    return out
+
+def rsi(close, window, mask):
+    """Row-wise feature_pipeline.rsi: a bar without a previous close counts as zero gain and loss"""
+    delta = close - shift(close)
+    gain = np.where(mask, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(mask, np.where(delta < 0, -delta, 0.0), np.nan)
+    rs = rolling_mean(gain, window) / rolling_mean(loss, window)
+    return 100 - (100 / (1 + rs))
+
+def stochastic_k(high, low, close, window):
+    low_min = rolling_min(low, window)
+    high_max = rolling_max(high, window)
+    return 100 * ((close - low_min) / (high_max - low_min))
+
+def atr(high, low, close, window, mask):
+    """Row-wise feature_pipeline.atr"""
+    prev_close = shift(close)
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return rolling_mean(np.where(mask, true_range, np.nan), window)
+
+def panel_ops(mask):
+    """feature_pipeline's indicator primitives over (symbols x time) arrays with real bars `mask`"""
+    return {
+        'sma': rolling_mean,
+        'ema': ewm_mean,
+        'std': lambda x, window, scale=1: rolling_std(x, window) * scale,
+        'rsi': lambda close, window: rsi(close, window, mask),
+        'stoch_k': stochastic_k,
+        'atr': lambda high, low, close, window: atr(high, low, close, window, mask),
+        'add': np.add,
+        'sub': np.subtract,
+        'div': np.divide,
+        'identity': lambda x: x,
+    }
+
+def calculate_panel_indicators(panel, columns=FULL_COLUMNS, dtype=None):
+    """Compute `columns` of the indicator graph for the whole panel
+
+    Goes through the same FeaturePipeline as the per-symbol code, so the
+    columns, windows and dependency order are shared; only the primitive
+    ops are the vectorized versions above.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return FeaturePipeline(columns, dtype).evaluate(panel.arrays, panel_ops(panel.mask))
@@ -0,0 +1,212 @@
+import numpy as np
+import threading
+import queue
+import json
+import time
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from train_model import NEURAL_MODELS
+from model_registry import ModelRegistry, member_view
+
+class ModelCache:
+    """LRU cache of loaded StockPredictors keyed by (symbol, model_type)
+
+    A pooled entry is loaded and cached once, with every member's scalers;
+    get() hands each member a view sharing that one model.
+    """
+    def __init__(self, model_dir='models', capacity=32):
+        self.registry = ModelRegistry(model_dir)
+        self.capacity = capacity
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol, model_type, member=None):
+        """The registry entry's predictor; `member` picks a symbol's scalers in a pooled entry"""
+        if member is None:
+            return self.load((symbol, model_type), lambda: self.registry.open(symbol, model_type, lazy=False))
+        predictor, symbol_scalers = self.load((symbol, model_type),
+                                              lambda: self.registry.open_pooled(symbol, model_type, lazy=False))
+        return member_view(predictor, symbol_scalers, member)
+
+    def load(self, key, open_entry):
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                self.hits += 1
+                return self.models[key]
+            self.misses += 1
+            # One lock per key, so concurrent first requests load the model once
+            key_lock = self.loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                with self.lock:
+                    if key in self.models:
+                        return self.models[key]
+                loaded = open_entry()
+                with self.lock:
+                    self.models[key] = loaded
+                    while len(self.models) > self.capacity:
+                        self.models.popitem(last=False)
+                return loaded
+            finally:
+                # Also when the load raised, so a later request retries it
+                with self.lock:
+                    if self.loading.get(key) is key_lock:
+                        del self.loading[key]
+
+    def stats(self):
+        with self.lock:
+            return {'loaded': len(self.models), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses}
+
+class MicroBatcher:
+    """Coalesce concurrent predictions for the same model into one predict call
+
+    Requests are queued; a single worker thread takes the first one, keeps
+    collecting for up to max_wait seconds (or max_batch requests), then
+    runs one model call per key over the stacked, already scaled inputs.
+    Each result is inverse-transformed with its own request's target
+    scaler, so members of a pooled model share a batch. Model calls are
+    serialized on that thread, which Keras needs anyway.
+    """
+    def __init__(self, max_batch=64, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.predictions = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, key, predictor, x):
+        future = Future()
+        self.requests.put((key, predictor, x, future))
+        return future
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = OrderedDict()
+            for request in self._collect():
+                groups.setdefault(request[0], []).append(request)
+
+            for requests in groups.values():
+                try:
+                    scaled = requests[0][1].predict_scaled(np.stack([x for _, _, x, _ in requests]))
+                    # One inverse transform per distinct target scaler in the batch
+                    by_scaler = OrderedDict()
+                    for index, (_, predictor, _, _) in enumerate(requests):
+                        by_scaler.setdefault(id(predictor.scaler), (predictor.scaler, []))[1].append(index)
+                    predictions = np.empty(len(requests))
+                    for scaler, indices in by_scaler.values():
+                        predictions[indices] = scaler.inverse_transform(scaled[indices].reshape(-1, 1)).flatten()
+                except Exception as e:
+                    for _, _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, _, _, future), prediction in zip(requests, predictions):
+                    future.set_result(float(prediction))
+                self.batches += 1
+                self.predictions += len(requests)
+
+    def stats(self):
+        return {'batches': self.batches, 'predictions': self.predictions,
+                'mean_batch_size': self.predictions / self.batches if self.batches else 0.0}
+
+def latest_input(predictor, historical_data):
+    """Scale recent bars with the model's fitted scaler; returns (model input, current close)"""
+    X, y = predictor.build_features({'historical_data': historical_data})
+    needed = predictor.sequence_length if predictor.model_type in NEURAL_MODELS else 1
+    if len(X) < needed:
+        raise ValueError(f"need at least {needed} complete bars after feature engineering, got {len(X)}")
+    X_scaled = predictor.feature_scaler.transform(X)
+    if predictor.symbol_id is not None:
+        X_scaled = np.hstack([X_scaled, np.full((len(X_scaled), 1), predictor.symbol_id)])
+    x = X_scaled[-predictor.sequence_length:] if predictor.model_type in NEURAL_MODELS else X_scaled[-1]
+    return x, float(y[-1])
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """POST /predict {"symbol", "model_type", "historical_data"[, "pooled"]}; GET /stats
+
+    With "pooled": true the symbol is predicted by the pooled model,
+    scaled and tagged the way it was during pooled training.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            return self.send_json(404, {'error': f'unknown path {self.path}'})
+        self.send_json(200, {'models': self.server.models.stats(), 'batching': self.server.batcher.stats()})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            return self.send_json(404, {'error': f'unknown path {self.path}'})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            symbol, model_type = request['symbol'], request.get('model_type', 'lstm')
+            entry, member = ('pooled', symbol) if request.get('pooled') else (symbol, None)
+            predictor = self.server.models.get(entry, model_type, member)
+            x, current_price = latest_input(predictor, request['historical_data'])
+            predicted_price = self.server.batcher.submit((entry, model_type), predictor, x).result(timeout=30)
+        except FileNotFoundError:
+            return self.send_json(404, {'error': f'no saved {model_type} model for {entry}'})
+        except (KeyError, ValueError) as e:
+            return self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            return self.send_json(500, {'error': str(e)})
+
+        self.send_json(200, {'symbol': symbol, 'model_type': model_type,
+                             'current_price': current_price, 'predicted_price': predicted_price})
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the service's own latency
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 resets bursts of new clients
+
+def make_server(host='127.0.0.1', port=8500, model_dir='models', cache_size=32, max_batch=64, max_wait=0.002):
+    server = PredictionServer((host, port), PredictionHandler)
+    server.models = ModelCache(model_dir, capacity=cache_size)
+    server.batcher = MicroBatcher(max_batch=max_batch, max_wait=max_wait)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve predictions from saved StockPredictor models")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8500)
+    parser.add_argument('--models', default='models', help="model registry written by train_model.py")
+    parser.add_argument('--cache-size', type=int, default=32, help="models kept loaded (LRU)")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="how long a batch waits to fill")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.models, args.cache_size, args.max_batch, args.max_wait_ms / 1000)
+    print(f"Serving predictions on http://{args.host}:{args.port} from {args.models}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
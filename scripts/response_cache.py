@@ -0,0 +1,313 @@
+import pandas as pd
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import pickle
+import argparse
+import json
+import time
+
+CACHE_VERSION = 1
+
+# How long a cached response is served without asking the provider again.
+# Company info changes rarely; only the latest bar of a history can change
+# (it is still forming during the session), so history only revalidates its tail.
+DEFAULT_TTLS = {
+    'info': 7 * 24 * 3600,
+    'history': 3600,
+}
+
+def content_hash(value):
+    """Stable hash of an info dict or an OHLCV frame"""
+    if isinstance(value, pd.DataFrame):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        digest.update(','.join(map(str, value.columns)).encode())
+        return digest.hexdigest()
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed cache of provider responses, keyed by endpoint and symbol
+
+    Every entry keeps the response, its content hash, when it was first
+    fetched and when it was last validated. Once an entry is older than
+    its endpoint's TTL the next request revalidates it: the provider is
+    asked again, and if the content hash is unchanged only validated_at
+    moves, otherwise the entry is replaced. For history only the bars
+    from the last cached date onwards are requested; earlier bars are
+    closed and never fetched again. If revalidation fails, the stale
+    entry is served rather than the error.
+    """
+    def __init__(self, path='response_cache.sqlite', ttls=None, stale_if_error=True):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stale_if_error = stale_if_error
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                content_hash TEXT NOT NULL,
+                period TEXT,
+                first_date TEXT,
+                last_date TEXT,
+                fetched_at REAL NOT NULL,
+                validated_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (endpoint, symbol)
+            )
+        ''')
+        self.conn.commit()
+        self.counts = {'hits': 0, 'misses': 0, 'revalidated': 0, 'updated': 0, 'stale': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def _load(self, endpoint, symbol):
+        """(value, content_hash, period, fetched_at, validated_at) or None"""
+        with self.lock:
+            row = self.conn.execute('''
+                SELECT body, content_hash, period, fetched_at, validated_at FROM responses
+                WHERE endpoint = ? AND symbol = ? AND version = ?
+            ''', (endpoint, symbol, CACHE_VERSION)).fetchone()
+        if row is None:
+            return None
+        return (pickle.loads(row[0]),) + tuple(row[1:])
+
+    def _store(self, endpoint, symbol, value, period=None, fetched_at=None):
+        now = time.time()
+        first_date = last_date = None
+        if isinstance(value, pd.DataFrame) and not value.empty:
+            first_date, last_date = str(value.index[0].date()), str(value.index[-1].date())
+        with self.lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO responses (endpoint, symbol, version, body, content_hash, period,
+                                                  first_date, last_date, fetched_at, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (endpoint, symbol, CACHE_VERSION, pickle.dumps(value), content_hash(value), period,
+                  first_date, last_date, fetched_at or now, now))
+            self.conn.commit()
+
+    def _touch(self, endpoint, symbol, validated=False):
+        with self.lock:
+            if validated:
+                self.conn.execute('UPDATE responses SET validated_at = ?, hits = hits + 1 '
+                                  'WHERE endpoint = ? AND symbol = ?', (time.time(), endpoint, symbol))
+            else:
+                self.conn.execute('UPDATE responses SET hits = hits + 1 WHERE endpoint = ? AND symbol = ?',
+                                  (endpoint, symbol))
+            self.conn.commit()
+
+    def _count(self, outcome):
+        # Requests for different symbols run on concurrent fetch workers
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def _fresh(self, endpoint, validated_at):
+        return time.time() - validated_at < self.ttls[endpoint]
+
+    def fresh(self, endpoint, symbol):
+        """Whether a request for `symbol` would be answered without asking the provider"""
+        cached = self._load(endpoint, symbol)
+        return cached is not None and self._fresh(endpoint, cached[4])
+
+    def store_history(self, symbol, hist, period="5y"):
+        """Cache a history fetched outside the cache, e.g. by a batched download"""
+        if not hist.empty:
+            self._store('history', symbol, hist, period=period)
+
+    def info(self, symbol, fetch):
+        """Company info for `symbol`, calling fetch() only on a miss or an expired entry"""
+        cached = self._load('info', symbol)
+        if cached is not None and self._fresh('info', cached[4]):
+            self._count('hits')
+            self._touch('info', symbol)
+            return cached[0]
+
+        try:
+            info = fetch()
+        except Exception:
+            if cached is None or not self.stale_if_error:
+                raise
+            self._count('stale')
+            return cached[0]
+
+        if cached is None:
+            self._count('misses')
+            self._store('info', symbol, info)
+        elif content_hash(info) == cached[1]:
+            self._count('revalidated')
+            self._touch('info', symbol, validated=True)
+        else:
+            self._count('updated')
+            self._store('info', symbol, info, fetched_at=cached[3])
+        return info
+
+    def history(self, symbol, fetch, period="5y", start=None, end=None):
+        """OHLCV history for `symbol`; fetch(period=, start=) calls the provider
+
+        A cached history answers any request it covers: the same period,
+        or a start date on or after its first bar. Other requests go to the
+        provider; a period response then replaces the entry.
+        """
+        cached = self._load('history', symbol)
+        if cached is None or not self._covers(cached, period, start):
+            hist = fetch(period=period, start=start)
+            self._count('misses')
+            if start is None and not hist.empty:
+                self._store('history', symbol, hist, period=period)
+            return self._slice(hist, start, end)
+
+        hist, _, cached_period, fetched_at, validated_at = cached
+        if self._fresh('history', validated_at):
+            self._count('hits')
+            self._touch('history', symbol)
+            return self._slice(hist, start, end)
+
+        # Revalidate from the last cached bar: it may have been captured
+        # mid-session, every bar before it is final
+        last = hist.index[-1]
+        try:
+            tail = fetch(start=last.strftime('%Y-%m-%d'))
+        except Exception:
+            if not self.stale_if_error:
+                raise
+            self._count('stale')
+            return self._slice(hist, start, end)
+
+        tail = tail.loc[tail.index >= last, hist.columns.intersection(tail.columns)]
+        if tail.empty or content_hash(tail) == content_hash(hist.loc[hist.index >= last, tail.columns]):
+            self._count('revalidated')
+            self._touch('history', symbol, validated=True)
+            return self._slice(hist, start, end)
+
+        # The provider's period window slides forward, so keep as many bars as before
+        updated = pd.concat([hist[hist.index < last], tail]).iloc[-len(hist):]
+        self._count('updated')
+        self._store('history', symbol, updated, period=cached_period, fetched_at=fetched_at)
+        return self._slice(updated, start, end)
+
+    def _covers(self, cached, period, start):
+        hist, cached_period = cached[0], cached[2]
+        if start is not None:
+            return not hist.empty and pd.Timestamp(start) >= naive_index(hist)[0].normalize()
+        return cached_period == period
+
+    def _slice(self, hist, start, end):
+        index = naive_index(hist)
+        keep = np.ones(len(hist), dtype=bool)
+        if start is not None:
+            keep &= index >= pd.Timestamp(start)
+        if end is not None:
+            keep &= index < pd.Timestamp(end)
+        return hist[keep].copy()
+
+    def entries(self, symbol=None):
+        query = '''
+            SELECT endpoint, symbol, length(body), content_hash, first_date, last_date, fetched_at, validated_at, hits
+            FROM responses
+        '''
+        params = ()
+        if symbol:
+            query += ' WHERE symbol = ?'
+            params = (symbol,)
+        with self.lock:
+            rows = self.conn.execute(query + ' ORDER BY symbol, endpoint', params).fetchall()
+        columns = ['endpoint', 'symbol', 'bytes', 'content_hash', 'first_date', 'last_date', 'fetched_at',
+                   'validated_at', 'hits']
+        return [dict(zip(columns, row)) for row in rows]
+
+    def purge(self, symbol=None, expired_only=False):
+        """Delete entries (for one symbol, or only those past their TTL); returns how many"""
+        deleted = 0
+        now = time.time()
+        with self.lock:
+            for endpoint, ttl in self.ttls.items():
+                query, params = 'DELETE FROM responses WHERE endpoint = ?', [endpoint]
+                if symbol:
+                    query += ' AND symbol = ?'
+                    params.append(symbol)
+                if expired_only:
+                    query += ' AND validated_at < ?'
+                    params.append(now - ttl)
+                deleted += self.conn.execute(query, params).rowcount
+            self.conn.commit()
+        return deleted
+
+    def stats(self):
+        return dict(self.counts)
+
+class CachingTicker:
+    """Wraps a yf.Ticker-like object so history() and info go through a ResponseCache
+
+    `throttle`, if given, is called before each request that actually
+    reaches the provider, so cache hits do not use up the rate limit.
+    """
+    def __init__(self, ticker, symbol, cache, throttle=None):
+        self.ticker = ticker
+        self.symbol = symbol
+        self.cache = cache
+        self.throttle = throttle or (lambda: None)
+
+    def history(self, period="5y", start=None, end=None):
+        def fetch(period=period, start=None):
+            self.throttle()
+            return self.ticker.history(start=start) if start is not None else self.ticker.history(period=period)
+        return self.cache.history(self.symbol, fetch, period=period, start=start, end=end)
+
+    @property
+    def info(self):
+        def fetch():
+            self.throttle()
+            return self.ticker.info
+        return self.cache.info(self.symbol, fetch)
+
+    def __getattr__(self, name):
+        return getattr(self.ticker, name)
+
+def caching_ticker_factory(cache, ticker_factory, throttle=None):
+    """Build a ticker factory whose tickers read through `cache`"""
+    def factory(symbol):
+        return CachingTicker(ticker_factory(symbol), symbol, cache, throttle)
+    return factory
+
+def naive_index(hist):
+    """The frame's index without its timezone, for comparing with plain dates"""
+    return hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+
+def format_age(seconds):
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit}"
+    return f"{seconds:.0f}s"
+
+def print_entries(cache, symbol=None):
+    now = time.time()
+    entries = cache.entries(symbol)
+    print(f"{'symbol':<16} {'endpoint':<8} {'bars':>23} {'size':>9} {'age':>7} {'checked':>7} {'expires':>8} {'hits':>5}")
+    for entry in entries:
+        expires = entry['validated_at'] + cache.ttls.get(entry['endpoint'], 0) - now
+        bars = f"{entry['first_date']}..{entry['last_date']}" if entry['first_date'] else ''
+        print(f"{entry['symbol']:<16} {entry['endpoint']:<8} {bars:>23} {entry['bytes'] / 1024:>7.1f}KB "
+              f"{format_age(now - entry['fetched_at']):>7} {format_age(now - entry['validated_at']):>7} "
+              f"{format_age(expires) if expires > 0 else 'expired':>8} {entry['hits']:>5}")
+    print(f"{len(entries)} entries, {sum(e['bytes'] for e in entries) / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or maintain the provider response cache")
+    parser.add_argument('--cache', default='response_cache.sqlite')
+    parser.add_argument('--symbol', help="only show (or purge) this symbol")
+    parser.add_argument('--purge', action='store_true', help="delete entries instead of listing them")
+    parser.add_argument('--expired', action='store_true', help="with --purge, only delete entries past their TTL")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache)
+    if args.purge:
+        print(f"✓ Deleted {cache.purge(args.symbol, expired_only=args.expired)} entries from {args.cache}")
+    else:
+        print_entries(cache, args.symbol)
+    cache.close()
@@ -0,0 +1,310 @@
+import numpy as np
+import threading
+import sqlite3
+import argparse
+import queue
+import time
+import resource
+from contextlib import closing
+from create_database import PRICE_FIELDS, get_price_page
+from train_model import StockPredictor, FEATURES
+
+# Marks the end of one pass over the table in the chunk stream
+END_OF_PASS = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+def prefetch(produce, depth=4):
+    """Iterate the generator function `produce` on a background thread, up to `depth` items ahead
+
+    Items are handed over through a bounded queue, so the producer works
+    while the consumer is busy but never runs more than `depth` items
+    ahead. An exception in the producer is re-raised in the consumer;
+    closing the returned generator stops the producer.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run():
+        generator = produce()
+        try:
+            for item in generator:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Closed here so the producer's resources (an SQLite connection)
+            # are released on the thread that created them
+            generator.close()
+
+    thread = threading.Thread(target=run, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+class SQLiteWindows:
+    """Pooled training windows streamed out of the stock_prices table
+
+    The out-of-core counterpart of train_model.PooledWindows: the same
+    features, per-symbol scalers, symbol-ID column and chronological
+    split, but no symbol's history is ever held in memory. prepare()
+    makes one pass over the table to fit the scalers and count each
+    symbol's windows; batches() then reads it again once per epoch, a
+    keyset-paginated page of `chunk_rows` bars at a time, on a background
+    thread that stays `prefetch` chunks ahead of training.
+    """
+    def __init__(self, db_path, symbols=None, batch_size=32, chunk_rows=5000, prefetch=4,
+                 shuffle_buffer=8192):
+        self.db_path = db_path
+        self.requested = list(symbols) if symbols else None
+        self.batch_size = batch_size
+        self.chunk_rows = chunk_rows
+        self.prefetch = prefetch
+        # Windows are drawn at random from this many buffered ones, which
+        # mixes symbols within a batch; the buffer holds references, not copies
+        self.shuffle_buffer = max(shuffle_buffer, batch_size)
+        self.predictor = StockPredictor(batch_size=batch_size)
+        self.sequence_length = self.predictor.sequence_length
+        self.plans = {}
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    @property
+    def sample_shape(self):
+        return (self.sequence_length, len(FEATURES) + 1)
+
+    def _features(self, rows):
+        """(X, y, positions) for the bars in `rows` that have every feature
+
+        Exactly StockPredictor.build_features on these rows; `positions`
+        are the kept rows' offsets in `rows`. The first row never has a
+        Price_Change, so it is dropped and only serves as the previous bar.
+        """
+        values = np.array([row[1:] for row in rows], dtype=float)
+        df = self.predictor.feature_frame({'historical_data': dict(zip(PRICE_FIELDS[1:], values.T))}).dropna()
+        return df[FEATURES].values, df['Close'].values, df.index.to_numpy()
+
+    def _pages(self, cursor, stock_id, after=None, inclusive=False):
+        """Yield (rows, X, y, positions) per page of one stock's bars, each page led by the previous page's last bar"""
+        previous = None
+        while True:
+            page = get_price_page(cursor, stock_id, after, self.chunk_rows, inclusive)
+            if not page:
+                return
+            rows = [previous] + page if previous is not None else page
+            yield (rows,) + self._features(rows)
+            previous, after, inclusive = page[-1], page[-1][0], False
+
+    def prepare(self, test_fraction=0.2, validation_fraction=0.2):
+        """Fit every symbol's scalers and plan its split, in one streaming pass over the table"""
+        from sklearn.preprocessing import MinMaxScaler
+
+        with closing(self.connect()) as conn:
+            cursor = conn.cursor()
+            stocks = dict(cursor.execute('SELECT symbol, id FROM stocks ORDER BY symbol').fetchall())
+            symbols = self.requested or list(stocks)
+            self.plans = {}
+            for index, symbol in enumerate(symbols):
+                if symbol not in stocks:
+                    print(f"✗ Skipping {symbol}: not in {self.db_path}")
+                    continue
+                feature_scaler, scaler = MinMaxScaler(), MinMaxScaler()
+                # Date of the bar before each usable bar, where a read starting at that bar must begin
+                previous_dates = []
+                for rows, X, y, positions in self._pages(cursor, stocks[symbol]):
+                    if len(X):
+                        feature_scaler.partial_fit(X)
+                        scaler.partial_fit(y.reshape(-1, 1))
+                        previous_dates.extend(rows[position - 1][0] for position in positions)
+
+                windows = len(previous_dates) - self.sequence_length
+                if windows <= 0:
+                    print(f"✗ Skipping {symbol}: not enough history")
+                    continue
+                # Same chronological split as PooledWindows.split
+                test_idx = int((1 - test_fraction) * windows)
+                val_idx = int(np.ceil(test_idx * (1 - validation_fraction)))
+                self.plans[symbol] = {
+                    'stock_id': stocks[symbol],
+                    'symbol_id': index / max(1, len(symbols) - 1),
+                    'feature_scaler': feature_scaler,
+                    'scaler': scaler,
+                    # part -> (first window, end window, date the read starts at)
+                    'parts': {
+                        'train': (0, val_idx, None),
+                        'validation': (val_idx, test_idx, previous_dates[val_idx] if val_idx else None),
+                        'test': (test_idx, windows, previous_dates[test_idx] if test_idx else None),
+                    },
+                }
+        return self
+
+    def count(self, part):
+        return sum(plan['parts'][part][1] - plan['parts'][part][0] for plan in self.plans.values())
+
+    def steps(self, part):
+        return max(1, int(np.ceil(self.count(part) / self.batch_size)))
+
+    def _symbol_windows(self, cursor, plan, part):
+        """Yield (windows, targets) chunks holding one symbol's windows of `part`, in order
+
+        The last sequence_length scaled rows of each page are carried into
+        the next, so windows spanning a page boundary are not lost. Reading
+        starts at the part's first window and stops after its last target.
+        """
+        first, end, start = plan['parts'][part]
+        length = self.sequence_length
+        next_row, tail = first, None
+        for _, X, y, _ in self._pages(cursor, plan['stock_id'], start, inclusive=True):
+            if not len(X):
+                continue
+            X = np.hstack([plan['feature_scaler'].transform(X), np.full((len(X), 1), plan['symbol_id'])])
+            y = plan['scaler'].transform(y.reshape(-1, 1)).flatten()
+            if tail is not None:
+                X, y = np.vstack([tail, X]), np.concatenate([np.zeros(len(tail)), y])
+            # Window j of this page is the symbol's window base + j
+            base = next_row - (len(tail) if tail is not None else 0)
+            windows, targets = self.predictor.create_sequences(X, y)
+            lo, hi = max(first - base, 0), min(end - base, len(windows))
+            if hi > lo:
+                yield windows[lo:hi], targets[lo:hi]
+            next_row = base + len(X)
+            if next_row >= end + length:
+                return
+            tail = X[-length:].copy()
+
+    def _produce(self, part, shuffle, seed, passes=None):
+        """The chunk stream behind batches(): window chunks with END_OF_PASS after each pass"""
+        rng = np.random.default_rng(seed)
+        with closing(self.connect()) as conn:
+            cursor = conn.cursor()
+            completed = 0
+            while passes is None or completed < passes:
+                order = list(self.plans)
+                if shuffle:
+                    rng.shuffle(order)
+                for symbol in order:
+                    yield from self._symbol_windows(cursor, self.plans[symbol], part)
+                yield END_OF_PASS
+                completed += 1
+
+    def _gather(self, chunks, pairs):
+        """Copy the windows addressed by (chunk, window) `pairs` into one batch"""
+        X = np.empty((len(pairs),) + self.sample_shape)
+        y = np.empty(len(pairs))
+        for number in np.unique(pairs[:, 0]):
+            selected = pairs[:, 0] == number
+            rows = pairs[selected, 1]
+            X[selected] = chunks[number][0][rows]
+            y[selected] = chunks[number][1][rows]
+        return X, y
+
+    def batches(self, part='train', shuffle=True, seed=42, passes=None):
+        """Yield (X, y) batches of `part`, re-reading the table for every pass (endless by default)
+
+        Each pass yields steps(part) batches, the last one possibly short,
+        so it lines up with an epoch of model.fit(steps_per_epoch=...).
+        """
+        if not self.count(part):
+            return
+        rng = np.random.default_rng(seed)
+        buffer_size = self.shuffle_buffer if shuffle else self.batch_size
+        chunks, pending, number = {}, np.empty((0, 2), dtype=np.int64), 0
+
+        stream = prefetch(lambda: self._produce(part, shuffle, seed, passes), self.prefetch)
+        try:
+            for chunk in stream:
+                if chunk is END_OF_PASS:
+                    if shuffle:
+                        rng.shuffle(pending)
+                    for start in range(0, len(pending), self.batch_size):
+                        yield self._gather(chunks, pending[start:start + self.batch_size])
+                    chunks, pending = {}, pending[:0]
+                    continue
+
+                chunks[number] = chunk
+                pending = np.concatenate([pending, np.column_stack([np.full(len(chunk[1]), number),
+                                                                    np.arange(len(chunk[1]))])])
+                number += 1
+                while len(pending) >= buffer_size:
+                    if shuffle:
+                        picked = rng.choice(len(pending), self.batch_size, replace=False)
+                    else:
+                        picked = np.arange(self.batch_size)
+                    batch, pending = pending[picked], np.delete(pending, picked, axis=0)
+                    yield self._gather(chunks, batch)
+                # Release chunks the buffer no longer points into
+                live = set(np.unique(pending[:, 0]).tolist())
+                for stale in [key for key in chunks if key not in live]:
+                    del chunks[stale]
+        finally:
+            stream.close()
+
+    def symbol_arrays(self, symbol, part):
+        """One symbol's windows of `part` as (X, y) arrays, e.g. to evaluate on its test windows"""
+        with closing(self.connect()) as conn:
+            chunks = list(self._symbol_windows(conn.cursor(), self.plans[symbol], part))
+        if not chunks:
+            return np.empty((0,) + self.sample_shape), np.empty(0)
+        return np.concatenate([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+    def symbol_scalers(self):
+        """Each symbol's fitted scalers and ID, in the format PooledWindows.symbol_scalers returns"""
+        return {symbol: {'scaler': plan['scaler'], 'feature_scaler': plan['feature_scaler'],
+                         'symbol_id': plan['symbol_id']}
+                for symbol, plan in self.plans.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream training windows out of stock_prices and report throughput")
+    parser.add_argument('--db', default='stock_data.db')
+    parser.add_argument('--symbol', nargs='+', help="symbols to stream (default: every stock in the database)")
+    parser.add_argument('--part', choices=['train', 'validation', 'test'], default='train')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--chunk-rows', type=int, default=5000, help="bars read per query")
+    parser.add_argument('--prefetch', type=int, default=4, help="chunks prepared ahead of the consumer")
+    parser.add_argument('--passes', type=int, default=1, help="passes (epochs) over the part")
+    args = parser.parse_args()
+
+    windows = SQLiteWindows(args.db, args.symbol, batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+                            prefetch=args.prefetch)
+    start = time.perf_counter()
+    windows.prepare()
+    prepared = time.perf_counter() - start
+    print(f"✓ Planned {len(windows.plans)} symbols in {prepared:.2f}s: {windows.count('train'):,} train, "
+          f"{windows.count('validation'):,} validation, {windows.count('test'):,} test windows")
+
+    start = time.perf_counter()
+    batches = samples = 0
+    for X, y in windows.batches(args.part, passes=args.passes):
+        batches += 1
+        samples += len(X)
+    elapsed = time.perf_counter() - start
+    expected = windows.steps(args.part) * args.passes
+    print(f"{'✓' if batches == expected else '✗'} Streamed {batches:,} batches ({samples:,} windows) "
+          f"in {elapsed:.2f}s, {samples / elapsed if elapsed > 0 else 0:,.0f} windows/sec")
+    print(f"Peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
@@ -0,0 +1,146 @@
+import numpy as np
+import json
+import os
+
+FORMAT_VERSION = 1
+
+# Typed on-disk columns of the columnar store; anything else is float32
+COLUMN_DTYPES = {'Date': 'datetime64[D]', 'Volume': np.int64}
+
+def historical_records(historical_data):
+    """Return historical data as a list of row dicts, whichever layout it is stored in"""
+    if isinstance(historical_data, dict):
+        columns = {key: column_values(values) for key, values in historical_data.items()}
+        keys = list(columns)
+        return [dict(zip(keys, row)) for row in zip(*columns.values())]
+    return list(historical_data or [])
+
+def historical_columns(records):
+    """Convert a list of row dicts into the column-oriented layout"""
+    if not records:
+        return {}
+    return {key: [record.get(key) for record in records] for key in records[0]}
+
+def column_values(values):
+    """Convert a column (list or numpy array) to plain Python values, NaN as None"""
+    if not isinstance(values, np.ndarray):
+        return list(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]').astype(str).tolist()
+    if np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+        nan = np.isnan(values)
+        return np.where(nan, None, values).tolist() if nan.any() else values.tolist()
+    return values.tolist()
+
+class JsonStockStore:
+    """The original single-file JSON dataset"""
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _load_file(self):
+        if self._data is None:
+            with open(self.path, 'r') as f:
+                self._data = json.load(f)
+        return self._data
+
+    def symbols(self):
+        return list(self._load_file())
+
+    def load(self, symbol, start=None, end=None):
+        """Load one stock, optionally restricted to dates in [start, end]"""
+        stock_data = dict(self._load_file()[symbol])
+        if start is not None or end is not None:
+            records = [r for r in historical_records(stock_data['historical_data'])
+                       if (start is None or r['Date'] >= start) and (end is None or r['Date'] <= end)]
+            stock_data['historical_data'] = records
+        return stock_data
+
+    def load_all(self):
+        return dict(self._load_file())
+
+    def save(self, stock_data):
+        with open(self.path, 'w') as f:
+            json.dump(stock_data, f, indent=2, default=str)
+        self._data = None
+
+class NumpyStockStore:
+    """Columnar store: one directory per symbol with a typed .npy file per column
+
+    Columns are opened memory-mapped, so loading a symbol or a date range
+    touches only that symbol's files and copies nothing up front.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, 'manifest.json'))
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.path, symbol)
+
+    def symbols(self):
+        with open(os.path.join(self.path, 'manifest.json'), 'r') as f:
+            return json.load(f)['symbols']
+
+    def load(self, symbol, start=None, end=None):
+        """Load one stock with memory-mapped columns, optionally restricted to [start, end]"""
+        directory = self._symbol_dir(symbol)
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            stock_data = json.load(f)
+
+        columns = {}
+        for column in stock_data.pop('columns'):
+            columns[column] = np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r')
+
+        if (start is not None or end is not None) and 'Date' in columns:
+            dates = columns['Date']
+            lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+            hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+            columns = {column: values[lo:hi] for column, values in columns.items()}
+
+        stock_data['historical_data'] = columns
+        return stock_data
+
+    def load_all(self):
+        return {symbol: self.load(symbol) for symbol in self.symbols()}
+
+    def save(self, stock_data):
+        os.makedirs(self.path, exist_ok=True)
+        for symbol, data in stock_data.items():
+            self.save_symbol(symbol, data)
+        with open(os.path.join(self.path, 'manifest.json'), 'w') as f:
+            json.dump({'format_version': FORMAT_VERSION, 'symbols': list(stock_data)}, f, indent=2)
+
+    def save_symbol(self, symbol, data):
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        historical_data = data.get('historical_data') or {}
+        if not isinstance(historical_data, dict):
+            historical_data = historical_columns(historical_data)
+
+        for column, values in historical_data.items():
+            dtype = COLUMN_DTYPES.get(column, np.float32)
+            if isinstance(values, np.ndarray):
+                array = values.astype(dtype)
+            elif dtype == np.float32:
+                array = np.array([np.nan if v is None else v for v in values], dtype=dtype)
+            else:
+                array = np.array(values, dtype=dtype)
+            np.save(os.path.join(directory, f'{column}.npy'), array)
+
+        meta = {key: value for key, value in data.items() if key != 'historical_data'}
+        meta['columns'] = list(historical_data)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+
+def open_store(path):
+    """Open the dataset at `path`: a .json file or a columnar store directory"""
+    if path.endswith('.json'):
+        return JsonStockStore(path)
+    return NumpyStockStore(path)
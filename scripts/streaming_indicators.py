@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+import json
+import math
+import operator
+from feature_pipeline import INDICATORS, BASE_COLUMNS, FULL_COLUMNS, resolve
+
+def _is_nan(value):
+    return value is None or math.isnan(value)
+
+def _divide(numerator, denominator):
+    """Divide with numpy semantics (x/0 -> inf, 0/0 -> nan) instead of raising"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+def _to_json(value):
+    return None if _is_nan(value) else float(value)
+
+def _from_json(value):
+    return float('nan') if value is None else value
+
+class RollingWindow:
+    """Fixed-size window with running sums, matching pandas rolling(window)"""
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nan_count = 0
+        self.updates = 0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if _is_nan(old):
+                self.nan_count -= 1
+            else:
+                self.total -= old
+                self.total_sq -= old * old
+        self.values.append(value)
+        if _is_nan(value):
+            self.nan_count += 1
+        else:
+            self.total += value
+            self.total_sq += value * value
+
+        # Re-sum periodically so add/subtract rounding error cannot accumulate
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resum()
+
+    def _resum(self):
+        valid = [v for v in self.values if not _is_nan(v)]
+        self.total = math.fsum(valid)
+        self.total_sq = math.fsum(v * v for v in valid)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def mean(self):
+        return self.total / self.window if self.ready else float('nan')
+
+    def std(self):
+        """Sample standard deviation (ddof=1), as pandas rolling().std()"""
+        if not self.ready or self.window < 2:
+            return float('nan')
+        variance = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def snapshot(self):
+        return {'window': self.window, 'values': [_to_json(v) for v in self.values]}
+
+    @classmethod
+    def restore(cls, state):
+        rolling = cls(state['window'])
+        for value in state['values']:
+            rolling.update(_from_json(value))
+        return rolling
+
+class RollingExtreme:
+    """Rolling min or max over a monotonic deque, matching pandas rolling(window).min()/max()"""
+    def __init__(self, window, mode='min'):
+        self.window = window
+        self.mode = mode
+        self.candidates = deque()  # (position, value), monotonic in value
+        self.nan_positions = deque()
+        self.position = -1
+
+    def update(self, value):
+        self.position += 1
+        expired = self.position - self.window
+        while self.candidates and self.candidates[0][0] <= expired:
+            self.candidates.popleft()
+        while self.nan_positions and self.nan_positions[0] <= expired:
+            self.nan_positions.popleft()
+
+        if _is_nan(value):
+            self.nan_positions.append(self.position)
+            return
+        if self.mode == 'min':
+            while self.candidates and self.candidates[-1][1] >= value:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] <= value:
+                self.candidates.pop()
+        self.candidates.append((self.position, value))
+
+    def value(self):
+        if self.position + 1 < self.window or self.nan_positions or not self.candidates:
+            return float('nan')
+        return self.candidates[0][1]
+
+    def snapshot(self):
+        return {
+            'window': self.window,
+            'mode': self.mode,
+            'position': self.position,
+            'candidates': [list(c) for c in self.candidates],
+            'nan_positions': list(self.nan_positions),
+        }
+
+    @classmethod
+    def restore(cls, state):
+        extreme = cls(state['window'], state['mode'])
+        extreme.position = state['position']
+        extreme.candidates = deque(tuple(c) for c in state['candidates'])
+        extreme.nan_positions = deque(state['nan_positions'])
+        return extreme
+
+class ExponentialMean:
+    """Exponentially weighted mean matching pandas ewm(span=span).mean() (adjust=True)"""
+    def __init__(self, span):
+        self.span = span
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.numerator = 0.0
+        self.denominator = 0.0
+
+    def update(self, value):
+        self.numerator *= self.decay
+        self.denominator *= self.decay
+        if not _is_nan(value):
+            self.numerator += value
+            self.denominator += 1.0
+
+    def value(self):
+        return self.numerator / self.denominator if self.denominator > 0 else float('nan')
+
+    def snapshot(self):
+        return {'span': self.span, 'numerator': self.numerator, 'denominator': self.denominator}
+
+    @classmethod
+    def restore(cls, state):
+        ema = cls(state['span'])
+        ema.numerator = state['numerator']
+        ema.denominator = state['denominator']
+        return ema
+
+class RollingMeanNode:
+    """'sma' op"""
+    def __init__(self, window):
+        self.rolling = RollingWindow(window)
+
+    def update(self, value):
+        self.rolling.update(value)
+        return self.rolling.mean()
+
+    def snapshot(self):
+        return {'rolling': self.rolling.snapshot()}
+
+    def load(self, state):
+        self.rolling = RollingWindow.restore(state['rolling'])
+
+class RollingStdNode(RollingMeanNode):
+    """'std' op: sample standard deviation times `scale`"""
+    def __init__(self, window, scale=1):
+        super().__init__(window)
+        self.scale = scale
+
+    def update(self, value):
+        self.rolling.update(value)
+        return self.rolling.std() * self.scale
+
+class ExponentialMeanNode:
+    """'ema' op"""
+    def __init__(self, span):
+        self.ema = ExponentialMean(span)
+
+    def update(self, value):
+        self.ema.update(value)
+        return self.ema.value()
+
+    def snapshot(self):
+        return {'ema': self.ema.snapshot()}
+
+    def load(self, state):
+        self.ema = ExponentialMean.restore(state['ema'])
+
+class RSINode:
+    """'rsi' op: the first bar has no delta and counts as zero gain and loss"""
+    def __init__(self, window):
+        self.gain = RollingWindow(window)
+        self.loss = RollingWindow(window)
+        self.prev = None
+
+    def update(self, close):
+        delta = float('nan') if self.prev is None else close - self.prev
+        self.gain.update(delta if delta > 0 else 0.0)
+        self.loss.update(-delta if delta < 0 else 0.0)
+        self.prev = close
+        rs = _divide(self.gain.mean(), self.loss.mean())
+        return 100 - _divide(100, 1 + rs)
+
+    def snapshot(self):
+        return {'gain': self.gain.snapshot(), 'loss': self.loss.snapshot(), 'prev': self.prev}
+
+    def load(self, state):
+        self.gain = RollingWindow.restore(state['gain'])
+        self.loss = RollingWindow.restore(state['loss'])
+        self.prev = state['prev']
+
+class StochasticKNode:
+    """'stoch_k' op"""
+    def __init__(self, window):
+        self.low_min = RollingExtreme(window, 'min')
+        self.high_max = RollingExtreme(window, 'max')
+
+    def update(self, high, low, close):
+        self.low_min.update(low)
+        self.high_max.update(high)
+        low_min = self.low_min.value()
+        return 100 * _divide(close - low_min, self.high_max.value() - low_min)
+
+    def snapshot(self):
+        return {'low_min': self.low_min.snapshot(), 'high_max': self.high_max.snapshot()}
+
+    def load(self, state):
+        self.low_min = RollingExtreme.restore(state['low_min'])
+        self.high_max = RollingExtreme.restore(state['high_max'])
+
+class ATRNode:
+    """'atr' op"""
+    def __init__(self, window):
+        self.true_range = RollingWindow(window)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        ranges = [high - low]
+        if self.prev_close is not None:
+            ranges += [abs(high - self.prev_close), abs(low - self.prev_close)]
+        valid_ranges = [r for r in ranges if not _is_nan(r)]
+        self.true_range.update(max(valid_ranges) if valid_ranges else float('nan'))
+        self.prev_close = close
+        return self.true_range.mean()
+
+    def snapshot(self):
+        return {'rolling': self.true_range.snapshot(), 'prev': self.prev_close}
+
+    def load(self, state):
+        self.true_range = RollingWindow.restore(state['rolling'])
+        self.prev_close = state['prev']
+
+class StatelessNode:
+    """Arithmetic ops, which keep no state between bars"""
+    def __init__(self, function):
+        self.update = function
+
+    def snapshot(self):
+        return {}
+
+    def load(self, state):
+        pass
+
+# feature_pipeline's indicator primitives as per-bar state machines
+STREAMING_OPS = {
+    'sma': RollingMeanNode,
+    'ema': ExponentialMeanNode,
+    'std': RollingStdNode,
+    'rsi': RSINode,
+    'stoch_k': StochasticKNode,
+    'atr': ATRNode,
+    'add': lambda: StatelessNode(operator.add),
+    'sub': lambda: StatelessNode(operator.sub),
+    'div': lambda: StatelessNode(_divide),
+    'identity': lambda: StatelessNode(lambda value: value),
+}
+
+class StreamingIndicatorEngine:
+    """Per-symbol indicator state updated in O(1) per bar
+
+    Walks feature_pipeline's indicator graph with one stateful node per
+    indicator, so it produces the same `outputs` (FULL_COLUMNS, as
+    ComprehensiveStockFetcher.calculate_technical_indicators, by default)
+    with the same windows while holding only O(window) state. New (e.g.
+    intraday) bars can be folded in without recomputing the history.
+    """
+
+    def __init__(self, outputs=FULL_COLUMNS):
+        self.outputs = list(outputs)
+        self.order = resolve(self.outputs)
+        self.nodes = {}
+        for name in self.order:
+            indicator = INDICATORS[name]
+            self.nodes[name] = STREAMING_OPS[indicator.op](**indicator.params)
+        self.last_date = None
+
+    def update(self, bar, date=None):
+        """Fold one OHLCV bar into the state and return the latest indicator values"""
+        values = {column: float(bar[column]) for column in BASE_COLUMNS if column in bar}
+        for name in self.order:
+            values[name] = self.nodes[name].update(*(values[column] for column in INDICATORS[name].inputs))
+        if date is not None:
+            self.last_date = str(date)
+        return {name: values[name] for name in self.outputs}
+
+    def update_frame(self, df):
+        """Fold every row of an OHLCV frame and return the indicator columns"""
+        rows = []
+        for date, bar in zip(df.index, df[BASE_COLUMNS].to_dict('records')):
+            rows.append(self.update(bar, date=date))
+        return pd.DataFrame(rows, index=df.index, columns=self.outputs)
+
+    def snapshot(self):
+        """Serialize the full state to a JSON-compatible dict"""
+        return {
+            'outputs': self.outputs,
+            'nodes': {name: node.snapshot() for name, node in self.nodes.items()},
+            'last_date': self.last_date,
+        }
+
+    @classmethod
+    def restore(cls, state):
+        """Rebuild an engine from a snapshot()"""
+        engine = cls(state['outputs'])
+        for name, node in engine.nodes.items():
+            node.load(state['nodes'].get(name, {}))
+        engine.last_date = state['last_date']
+        return engine
+
+def save_engine_states(engines, filename='indicator_state.json'):
+    """Save per-symbol engine snapshots to a JSON file"""
+    with open(filename, 'w') as f:
+        json.dump({symbol: engine.snapshot() for symbol, engine in engines.items()}, f)
+    print(f"✓ Indicator state for {len(engines)} symbols saved to {filename}")
+
+def load_engine_states(filename='indicator_state.json'):
+    """Load per-symbol engines saved by save_engine_states"""
+    try:
+        with open(filename, 'r') as f:
+            states = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {symbol: StreamingIndicatorEngine.restore(state) for symbol, state in states.items()}
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from backtest import backtest, held_positions, load_panels, walk_forward_predictions, max_drawdown
+from benchmark_database import make_dataset
+from stock_storage import open_store
+from train_model import StockPredictor, generate_trading_signals, STOP_LOSS_FACTORS
+
+def test_vectorized_signals_match_the_scalar_rule():
+    rng = np.random.default_rng(0)
+    current = rng.uniform(50, 150, (4, 50))
+    predicted = current * (1 + rng.uniform(-0.05, 0.05, current.shape))
+    confidence = rng.choice([50.0, 75.0, 75.5, 90.0], current.shape)
+    signals, targets, stop_losses = generate_trading_signals(current, predicted, confidence)
+
+    predictor = StockPredictor(model_type='xgboost')
+    expected = np.vectorize(predictor.generate_trading_signal)(current, predicted, confidence)
+    np.testing.assert_array_equal(signals, expected)
+    assert set(np.unique(signals)) == {'BUY', 'SELL', 'HOLD'}
+    np.testing.assert_array_equal(targets, predicted)
+    factors = np.vectorize(STOP_LOSS_FACTORS.get)(signals)
+    np.testing.assert_allclose(stop_losses, current * factors)
+
+def test_missing_prediction_is_a_hold():
+    signals, _, _ = generate_trading_signals(np.array([100.0, 100.0]), np.array([np.nan, 110.0]),
+                                             np.array([90.0, 90.0]))
+    assert signals.tolist() == ['HOLD', 'BUY']
+
+def test_backtest_scores_a_hand_worked_example():
+    close = np.array([[100.0, 110.0, 99.0, 99.0]])
+    predicted = np.array([[120.0, 90.0, np.nan, np.nan]])
+    summary, per_symbol = backtest(close, predicted, np.full(close.shape, 90.0))
+    # Long 100 -> 110, then short 110 -> 99: +10% twice
+    assert summary['trades'] == 2
+    assert summary['hit_rate'] == 1.0
+    assert summary['dates'] == 2
+    assert summary['total_return'] == pytest.approx(0.21)
+    assert summary['max_drawdown'] == 0.0
+    assert per_symbol['total_return'][0] == pytest.approx(0.21)
+
+def test_capital_is_split_between_open_positions():
+    close = np.array([[100.0, 110.0], [100.0, 90.0], [100.0, 100.0]])
+    predicted = np.array([[105.0, np.nan], [105.0, np.nan], [100.0, np.nan]])
+    summary, per_symbol = backtest(close, predicted, np.full(close.shape, 90.0))
+    # +10% and -10% on half the capital each; the HOLD symbol takes no share
+    assert summary['total_return'] == pytest.approx(0.0)
+    assert summary['exposure'] == pytest.approx(2 / 3)
+    assert per_symbol['trades'].tolist() == [1, 1, 0]
+    assert np.isnan(per_symbol['hit_rate'][2])
+
+def test_positions_are_held_for_the_horizon():
+    position = np.array([[1.0, 0, 0, 0, -1.0, 0, 0]])
+    np.testing.assert_allclose(held_positions(position, 3), [[1 / 3, 1 / 3, 1 / 3, 0, -1 / 3, -1 / 3, -1 / 3]])
+    close = np.array([[100.0, 101.0, 102.0, 103.0, 104.0]])
+    predicted = np.array([[110.0, np.nan, np.nan, np.nan, np.nan]])
+    summary, _ = backtest(close, predicted, np.full(close.shape, 90.0), horizon=3)
+    # A single tranche of 1/3 of the capital rides the three bars it predicted
+    assert summary['trades'] == 1
+    assert summary['dates'] == 3
+    assert summary['total_return'] == pytest.approx(np.prod(1 + (close[0, 1:4] / close[0, :3] - 1) / 3) - 1)
+
+def test_max_drawdown():
+    assert max_drawdown(np.array([1.0, 1.2, 0.9, 1.3])) == pytest.approx(0.9 / 1.2 - 1)
+    assert max_drawdown(np.array([])) == 0.0
+
+@pytest.fixture(scope='module')
+def panels(tmp_path_factory):
+    store = open_store(str(tmp_path_factory.mktemp('backtest') / 'store'))
+    store.save(make_dataset(3, 400))
+    return load_panels(store)
+
+def test_walk_forward_never_looks_ahead(panels):
+    symbols, dates, panels = panels
+    predicted, steps = walk_forward_predictions(panels, train_window=150, test_window=40, horizon=5)
+    assert predicted.shape == (len(symbols), len(dates))
+    assert steps == int(np.ceil((len(dates) - 150) / 40))
+    assert np.isnan(predicted[:, :150]).all()
+    assert not np.isnan(predicted[:, 150:]).all()
+
+    # Rewriting the future must leave every earlier prediction unchanged
+    cut = 230
+    future = {column: values.copy() for column, values in panels.items()}
+    for values in future.values():
+        values[:, cut:] *= 1.5
+    changed, _ = walk_forward_predictions(future, train_window=150, test_window=40, horizon=5)
+    np.testing.assert_array_equal(changed[:, :cut], predicted[:, :cut])
+    assert not np.allclose(changed[:, cut:], predicted[:, cut:], equal_nan=True)
+
+def test_walk_forward_rejects_short_histories(panels):
+    _, dates, panels = panels
+    with pytest.raises(ValueError, match='fewer than'):
+        walk_forward_predictions(panels, train_window=len(dates), test_window=10)
+    with pytest.raises(ValueError, match='walk-forward'):
+        walk_forward_predictions(panels, model_type='lstm')
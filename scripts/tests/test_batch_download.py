@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from batch_download import download_history_batch, split_wide_frame
+from fake_yfinance import fake_download, synthetic_ohlcv
+
+SYMBOLS = ['AAA.NS', 'BBB.NS', 'CCC.BO']
+
+def test_single_ticker_flat_columns():
+    flat = synthetic_ohlcv('AAA.NS', periods=50)
+    frames = split_wide_frame(flat, ['AAA.NS'])
+    assert list(frames) == ['AAA.NS']
+    pd.testing.assert_frame_equal(frames['AAA.NS'], flat)
+
+def test_multi_ticker_columns_split_per_symbol():
+    wide = fake_download(SYMBOLS, periods=50)
+    frames = split_wide_frame(wide, SYMBOLS)
+    assert list(frames) == SYMBOLS
+    for symbol in SYMBOLS:
+        pd.testing.assert_frame_equal(frames[symbol], synthetic_ohlcv(symbol, periods=50))
+
+def test_missing_and_empty_symbols_are_left_out():
+    # yf.download pads with NaN, so every column comes back as float
+    wide = fake_download(['AAA.NS', 'BBB.NS'], periods=50).astype(float)
+    wide.loc[:, ('BBB.NS', slice(None))] = np.nan
+    assert list(split_wide_frame(wide, SYMBOLS)) == ['AAA.NS']
+    assert split_wide_frame(pd.DataFrame(), SYMBOLS) == {}
+
+def test_shorter_history_drops_its_leading_padding():
+    wide = fake_download(SYMBOLS, periods=50).astype(float)
+    wide.loc[wide.index[:10], ('CCC.BO', slice(None))] = np.nan
+    frames = split_wide_frame(wide, SYMBOLS)
+    assert len(frames['CCC.BO']) == 40
+    assert frames['CCC.BO'].index[0] == wide.index[10]
+    assert len(frames['AAA.NS']) == 50
+
+def test_download_chunks_and_skips_failed_batches():
+    calls = []
+    def download(tickers, **kwargs):
+        calls.append(list(tickers))
+        if 'CCC.BO' in tickers:
+            raise ConnectionError("batch failed")
+        return fake_download(tickers, periods=50, **kwargs)
+    histories = download_history_batch(SYMBOLS + ['DDD.NS'], chunk_size=2, download=download)
+    assert calls == [['AAA.NS', 'BBB.NS'], ['CCC.BO', 'DDD.NS']]
+    assert list(histories) == ['AAA.NS', 'BBB.NS']
+
+def test_single_symbol_chunk_with_flat_columns():
+    download = lambda tickers, **kwargs: synthetic_ohlcv(tickers[0], periods=50)
+    histories = download_history_batch(SYMBOLS, chunk_size=1, download=download)
+    assert list(histories) == SYMBOLS
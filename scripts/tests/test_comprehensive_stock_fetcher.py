@@ -0,0 +1,243 @@
+import contextlib
+import io
+import json
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from comprehensive_stock_fetcher import (ComprehensiveStockFetcher, FetchJournal, TokenBucket, HISTORICAL_COLUMNS,
+                                         retry_with_backoff)
+from fake_yfinance import make_ticker_factory, synthetic_ohlcv
+from instrumentation import Instrumentation
+
+SYMBOLS = ['AAA.NS', 'BBB.NS', 'CCC.BO']
+MANY_SYMBOLS = [f'S{i:02d}.NS' for i in range(8)]
+
+def make_fetcher(symbols=SYMBOLS, **kwargs):
+    fetcher = ComprehensiveStockFetcher(ticker_factory=kwargs.pop('ticker_factory', make_ticker_factory(periods=400)),
+                                        rate_limit=kwargs.pop('rate_limit', None), **kwargs)
+    fetcher.nse_stocks = [{'symbol': symbol, 'name': symbol, 'sector': 'Unknown'} for symbol in symbols]
+    fetcher.bse_stocks = []
+    return fetcher
+
+def recording_factory(calls, **kwargs):
+    """make_ticker_factory, appending the time of every history request to `calls`"""
+    factory = make_ticker_factory(**kwargs)
+    def make(symbol):
+        ticker = factory(symbol)
+        history = ticker.history
+        def timed_history(*args, **kwargs):
+            calls.append(time.monotonic())
+            return history(*args, **kwargs)
+        ticker.history = timed_history
+        return ticker
+    return make
+
+def truncated_factory(drop, **kwargs):
+    """make_ticker_factory without the last `drop` bars, as the provider looked `drop` bars ago"""
+    factory = make_ticker_factory(**kwargs)
+    def make(symbol):
+        ticker = factory(symbol)
+        history = ticker.history
+        ticker.history = lambda *args, **kwargs: history(*args, **kwargs).iloc[:-drop]
+        return ticker
+    return make
+
+def fetch(fetcher, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fetcher.fetch_all_stocks(**kwargs)
+
+def assert_same_records(expected, actual):
+    assert list(actual) == list(expected)
+    for symbol, data in expected.items():
+        pd.testing.assert_frame_equal(pd.DataFrame(actual[symbol]['historical_data']),
+                                      pd.DataFrame(data['historical_data']))
+        assert actual[symbol]['technical_indicators'] == pytest.approx(data['technical_indicators'])
+        static = {key for key in data if key not in ('historical_data', 'technical_indicators', 'last_updated')}
+        assert {key: actual[symbol][key] for key in static} == {key: data[key] for key in static}
+
+def test_concurrent_fetch_matches_sequential():
+    sequential = fetch(make_fetcher(MANY_SYMBOLS), max_workers=1)
+    concurrent = fetch(make_fetcher(MANY_SYMBOLS), max_workers=4)
+    assert list(concurrent) == MANY_SYMBOLS
+    assert_same_records(sequential, concurrent)
+
+def test_workers_overlap_provider_latency():
+    fetcher = make_fetcher(MANY_SYMBOLS, ticker_factory=make_ticker_factory(latency=0.1, periods=400))
+    start = time.perf_counter()
+    fetch(fetcher, max_workers=4)
+    # One worker waits 8 x (history + info) x 100ms = 1.6s, four about 0.4s
+    assert time.perf_counter() - start < 1.2
+    assert len(fetcher.fetch_timings) == len(MANY_SYMBOLS)
+
+def test_failing_symbol_does_not_stop_the_others():
+    fetcher = make_fetcher(ticker_factory=make_ticker_factory(fail_symbols={'BBB.NS'}, periods=400))
+    stock_data = fetch(fetcher, max_workers=3, retries=1, backoff=0)
+    assert list(stock_data) == ['AAA.NS', 'CCC.BO']
+    assert set(fetcher.fetch_timings) == set(SYMBOLS)
+    assert 'Simulated failure' in fetcher.fetch_failures['BBB.NS']
+
+def iterrows_records(df, window=252):
+    """The original row-by-row export, as the reference for prepare_historical_data"""
+    records = []
+    for index, row in df.dropna().iterrows():
+        record = {'Date': index.strftime('%Y-%m-%d'), 'Volume': int(row['Volume'])}
+        record.update({column: float(row[column]) for column in HISTORICAL_COLUMNS if column != 'Volume'})
+        records.append(record)
+    return records[-window:]
+
+@pytest.fixture(scope='module')
+def indicator_frame():
+    fetcher = make_fetcher()
+    df = fetcher.calculate_technical_indicators(synthetic_ohlcv('AAA.NS', periods=600))
+    # A gap inside the last year, which the export must skip as dropna() did
+    df.iloc[-40:-35, df.columns.get_loc('RSI')] = np.nan
+    return fetcher, df
+
+@pytest.mark.parametrize('window', [252, 20, 1000])
+def test_historical_records_match_the_iterrows_export(indicator_frame, window):
+    fetcher, df = indicator_frame
+    records = fetcher.prepare_historical_data(df, window=window, orient='records')
+    assert records == iterrows_records(df, window)
+    assert all(type(record['Volume']) is int and type(record['Close']) is float for record in records)
+
+def test_historical_columns_hold_the_same_values(indicator_frame):
+    fetcher, df = indicator_frame
+    columns = fetcher.prepare_historical_data(df, orient='columns')
+    records = fetcher.prepare_historical_data(df, orient='records')
+    assert list(columns) == ['Date'] + HISTORICAL_COLUMNS
+    assert pd.DataFrame(columns).to_dict('records') == records
+    json.dumps(columns)
+
+def test_retries_run_out_and_reraise_the_last_error():
+    attempts, retried = [], []
+    def call():
+        attempts.append(len(attempts) + 1)
+        raise ConnectionError(f"attempt {len(attempts)}")
+    with pytest.raises(ConnectionError, match='attempt 3'):
+        retry_with_backoff(call, retries=2, base_delay=0,
+                           on_retry=lambda attempt, error, delay: retried.append((attempt, str(error), delay)))
+    assert attempts == [1, 2, 3]
+    assert retried == [(1, 'attempt 1', 0), (2, 'attempt 2', 0)]
+
+def test_retry_returns_the_attempts_it_took():
+    outcomes = iter([ConnectionError(), ConnectionError(), 'ok'])
+    def call():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    assert retry_with_backoff(call, retries=3, base_delay=0) == ('ok', 3)
+
+def test_exhausted_symbol_is_journaled_as_failed(tmp_path):
+    journal = FetchJournal(str(tmp_path / 'journal.jsonl'))
+    fetcher = make_fetcher(ticker_factory=make_ticker_factory(fail_symbols={'BBB.NS'}, periods=400))
+    fetch(fetcher, retries=2, backoff=0, journal=journal)
+    with open(journal.path) as f:
+        entries = {entry['symbol']: entry for entry in map(json.loads, f)}
+    assert entries['BBB.NS']['status'] == 'failed'
+    assert entries['BBB.NS']['attempts'] == 3
+    assert 'Simulated failure' in entries['BBB.NS']['error']
+    assert set(journal.load()) == {'AAA.NS', 'CCC.BO'}
+
+def test_resume_skips_symbols_in_a_partial_journal(tmp_path):
+    journal = FetchJournal(str(tmp_path / 'journal.jsonl'))
+    complete = fetch(make_fetcher(), journal=journal)
+    # A run that crashed while writing its second symbol
+    with open(journal.path) as f:
+        lines = f.readlines()
+    with open(journal.path, 'w') as f:
+        f.write(lines[0] + lines[1][:len(lines[1]) // 2])
+    first = json.loads(lines[0])['symbol']
+
+    calls = []
+    resumed = fetch(make_fetcher(ticker_factory=recording_factory(calls, periods=400)), journal=journal, resume=True)
+    assert len(calls) == len(SYMBOLS) - 1
+    assert list(resumed)[0] == first
+    assert_same_records(complete, {symbol: resumed[symbol] for symbol in complete})
+    assert set(journal.load()) == set(SYMBOLS)
+
+def test_rate_limit_bounds_requests_across_workers():
+    rate, calls = 40.0, []
+    fetcher = make_fetcher(MANY_SYMBOLS, ticker_factory=recording_factory(calls, periods=400), rate_limit=rate)
+    fetch(fetcher, max_workers=4)
+    calls.sort()
+    assert len(calls) == len(MANY_SYMBOLS)
+    # Info requests take tokens too, so histories alone can only be further apart
+    for i in range(len(calls)):
+        for j in range(i + 1, len(calls)):
+            assert calls[j] - calls[i] >= (j - i) / rate - 0.005
+
+def test_token_bucket_allows_its_burst_then_its_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.02
+    for _ in range(10):
+        bucket.acquire()
+    assert time.monotonic() - start >= 10 / 50 - 0.005
+
+def test_panel_mode_matches_per_symbol_indicators():
+    per_symbol = fetch(make_fetcher())
+    panel = fetch(make_fetcher(), panel=True)
+    assert list(panel) == SYMBOLS
+    assert_same_records(per_symbol, panel)
+
+def test_lean_applies_to_panel_mode_only():
+    per_symbol = fetch(make_fetcher())
+    assert_same_records(per_symbol, fetch(make_fetcher(lean=True)))
+    lean_panel = fetch(make_fetcher(lean=True), panel=True)
+    for symbol, data in per_symbol.items():
+        # Lean skips SMA_200, so it keeps earlier bars; indicators are float32
+        expected = pd.DataFrame(data['historical_data']).set_index('Date')
+        lean = pd.DataFrame(lean_panel[symbol]['historical_data']).set_index('Date')
+        pd.testing.assert_frame_equal(lean.loc[expected.index], expected, rtol=1e-5)
+
+def test_lean_panel_frames_hold_only_lean_columns():
+    fetcher = make_fetcher(lean=True)
+    frames = {symbol: fetcher.ticker_factory(symbol).history() for symbol in SYMBOLS}
+    for symbol, frame in fetcher.calculate_panel_indicators(frames).items():
+        expected = fetcher.calculate_lean_indicators(frames[symbol])
+        assert list(frame.columns) == list(expected.columns)
+        assert (frame.dtypes == expected.dtypes).all()
+
+def test_incremental_refresh_appends_new_bars():
+    # Long enough that the stored 252 bars cover the SMA_200 lookback
+    existing = fetch(make_fetcher(ticker_factory=truncated_factory(5, periods=600)))
+    updated = fetch(make_fetcher(ticker_factory=make_ticker_factory(periods=600)), existing=existing)
+    fresh = fetch(make_fetcher(ticker_factory=make_ticker_factory(periods=600)))
+    for symbol in SYMBOLS:
+        new, full = pd.DataFrame(updated[symbol]['historical_data']), pd.DataFrame(fresh[symbol]['historical_data'])
+        assert len(new) == 252
+        assert new['Date'].iloc[-1] == full['Date'].iloc[-1]
+        assert new['Date'].iloc[-6] == pd.DataFrame(existing[symbol]['historical_data'])['Date'].iloc[-1]
+        # Indicators are recomputed over the stored window, so the EMAs differ from
+        # a full-history fetch only by their truncated tail weight
+        pd.testing.assert_frame_equal(new, full, rtol=1e-6)
+        assert updated[symbol]['current_price'] == fresh[symbol]['current_price']
+        assert updated[symbol]['technical_indicators'] == pytest.approx(fresh[symbol]['technical_indicators'], rel=1e-6)
+
+def test_incremental_refresh_without_new_bars_keeps_the_record():
+    existing = fetch(make_fetcher())
+    assert fetch(make_fetcher(), existing=existing) == existing
+
+def test_failed_incremental_refresh_keeps_the_stored_record():
+    existing = fetch(make_fetcher(ticker_factory=truncated_factory(5, periods=400)))
+    fetcher = make_fetcher(ticker_factory=make_ticker_factory(fail_symbols={'BBB.NS'}, periods=400))
+    updated = fetch(fetcher, existing=existing, retries=0)
+    assert list(updated) == SYMBOLS
+    assert updated['BBB.NS'] == existing['BBB.NS']
+    assert updated['AAA.NS'] != existing['AAA.NS']
+    assert list(fetcher.fetch_failures) == ['BBB.NS']
+
+def test_profile_covers_worker_threads(tmp_path):
+    instrumentation = Instrumentation(profile=True)
+    instrumentation.start()
+    fetch(make_fetcher(MANY_SYMBOLS, instrumentation=instrumentation), max_workers=4)
+    instrumentation.stop()
+    functions = [row['function'] for row in instrumentation.profile_stats(limit=None)]
+    assert any('(fetch_symbol)' in function for function in functions)
+    assert any('(calculate_technical_indicators)' in function for function in functions)
+    instrumentation.write_report(tmp_path / 'report.json')
+    assert (tmp_path / 'report.prof').stat().st_size > 0
@@ -0,0 +1,94 @@
+import sqlite3
+import numpy as np
+import pytest
+from create_database import create_database, save_predictions, bulk_load, migrate_stock_prices
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / 'stock_data.db')
+    create_database(path)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO stocks (symbol, name) VALUES ('A.NS', 'A'), ('B.NS', 'B')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def predictions(conn):
+    return conn.execute('SELECT s.symbol, p.predicted_price, p.signal FROM predictions p '
+                        'JOIN stocks s ON s.id = p.stock_id ORDER BY s.symbol').fetchall()
+
+def test_save_predictions_skips_unknown_symbols(conn):
+    saved = save_predictions(conn, 'xgboost', '2024-01-01', ['A.NS', 'Z.NS', 'B.NS'], np.array([1.0, 2.0, 3.0]),
+                             ['BUY', 'HOLD', 'SELL'], np.full(3, 80.0), np.ones(3), np.ones(3))
+    assert saved == 2
+    assert predictions(conn) == [('A.NS', 1.0, 'BUY'), ('B.NS', 3.0, 'SELL')]
+    assert conn.execute('SELECT COUNT(*) FROM predictions WHERE stock_id IS NULL').fetchone()[0] == 0
+
+def test_failed_save_predictions_rolls_back_and_leaves_no_transaction(conn):
+    with pytest.raises(sqlite3.IntegrityError):
+        save_predictions(conn, 'xgboost', '2024-01-01', ['A.NS', 'B.NS'], np.array([1.0, np.nan]),
+                         ['BUY', 'SELL'], np.full(2, 80.0), np.ones(2), np.ones(2))
+    assert not conn.in_transaction
+    assert predictions(conn) == []
+
+def unique_index_exists(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ux_stock_prices_stock_date'").fetchone() is not None
+
+def test_bulk_load_keeps_the_unique_index_and_upserts(tmp_path):
+    from benchmark_database import make_dataset
+    path = str(tmp_path / 'stock_data.db')
+    create_database(path)
+    stock_data = make_dataset(2, 120)
+    stocks = lambda: ((symbol, lambda data=data: data) for symbol, data in stock_data.items())
+
+    conn = sqlite3.connect(path)
+    first = bulk_load(conn, stocks())
+    again = bulk_load(conn, stocks())
+    assert first == again > 0
+    assert unique_index_exists(conn)
+    assert conn.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0] == first
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute('INSERT INTO stock_prices (stock_id, date, open_price, high_price, low_price, close_price, '
+                     'volume) SELECT stock_id, date, 1, 1, 1, 1, 1 FROM stock_prices LIMIT 1')
+    conn.close()
+
+def test_legacy_duplicates_are_removed_once(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    create_database(path)
+    conn = sqlite3.connect(path)
+    conn.execute('DROP INDEX ux_stock_prices_stock_date')
+    conn.executemany('INSERT INTO stock_prices (stock_id, date, open_price, high_price, low_price, close_price, '
+                     'volume) VALUES (1, ?, ?, 1, 1, 1, 1)', [('2024-01-01', 1.0), ('2024-01-01', 2.0)])
+    conn.commit()
+    conn.close()
+
+    create_database(path)
+    conn = sqlite3.connect(path)
+    assert unique_index_exists(conn)
+    assert conn.execute('SELECT open_price FROM stock_prices').fetchall() == [(2.0,)]
+    conn.close()
+
+def test_migration_skips_the_scan_once_indexed(tmp_path):
+    path = str(tmp_path / 'stock_data.db')
+    create_database(path)
+    conn = sqlite3.connect(path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    migrate_stock_prices(conn.cursor())
+    assert not any('DELETE' in statement for statement in statements)
+    conn.close()
+
+def test_bulk_load_restores_the_isolation_level(tmp_path):
+    path = str(tmp_path / 'stock_data.db')
+    create_database(path)
+    conn = sqlite3.connect(path, isolation_level='IMMEDIATE')
+    bulk_load(conn, iter([]))
+    assert conn.isolation_level == 'IMMEDIATE'
+
+    def broken():
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        bulk_load(conn, iter([('X.NS', broken)]))
+    assert conn.isolation_level == 'IMMEDIATE'
+    assert not conn.in_transaction
+    conn.close()
@@ -0,0 +1,89 @@
+import copy
+import os
+import time
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+from benchmark_database import make_dataset
+from feature_cache import FeatureCache
+from train_model import FEATURES, StockPredictor
+
+@pytest.fixture(scope='module')
+def stock():
+    return next(iter(make_dataset(1, 120).values()))
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeatureCache(str(tmp_path / 'features'))
+
+def put(cache, key, rows=100):
+    X = np.arange(rows * 4, dtype=np.float64).reshape(rows, 4)
+    cache.put(key, X, X[:, 0].copy(), MinMaxScaler().fit(X[:, :1]), MinMaxScaler().fit(X))
+    return X
+
+def set_mtime(cache, key, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(os.path.join(cache.directory, key), (stamp, stamp))
+
+def test_key_changes_with_data_and_schema(cache, stock):
+    key = lambda data=stock['historical_data'], features=FEATURES, target='Close', length=60: \
+        cache.key(stock['symbol'], data, features, target, length)
+    assert key() == key(copy.deepcopy(stock['historical_data']))
+
+    changed = copy.deepcopy(stock['historical_data'])
+    changed[-1]['Close'] += 0.01
+    assert key(changed) != key()
+    assert key(stock['historical_data'][:-1]) != key()
+    assert key(features=FEATURES[:-1]) != key()
+    assert key(target='Open') != key()
+    assert key(length=30) != key()
+    assert cache.key('OTHER.NS', stock['historical_data'], FEATURES, 'Close', 60) != key()
+
+def test_key_covers_the_column_layout(cache):
+    columns = {'Date': ['2024-01-01', '2024-01-02'], 'Close': np.array([1.0, 2.0])}
+    key = lambda data: cache.key('A.NS', data, FEATURES, 'Close', 60)
+    assert key(columns) == key({'Close': np.array([1.0, 2.0]), 'Date': ['2024-01-01', '2024-01-02']})
+    assert key(columns) != key(dict(columns, Close=np.array([1.0, 2.5])))
+    assert key(columns) != key(dict(columns, Close=np.array([1.0, 2.0], dtype=np.float32)))
+
+def test_entries_load_memory_mapped(cache):
+    X = put(cache, 'a')
+    X_cached, y_cached, scaler, feature_scaler = cache.get('a')
+    assert isinstance(X_cached, np.memmap) and isinstance(y_cached, np.memmap)
+    np.testing.assert_array_equal(X_cached, X)
+    np.testing.assert_array_equal(y_cached, X[:, 0])
+    np.testing.assert_array_equal(feature_scaler.data_max_, X.max(axis=0))
+    assert cache.get('missing') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_truncated_entry_is_a_miss(cache):
+    put(cache, 'a')
+    open(os.path.join(cache.directory, 'a', 'scalers.pkl'), 'wb').close()
+    assert cache.get('a') is None
+
+def test_least_recently_used_entries_are_evicted(cache):
+    put(cache, 'a')
+    entry_bytes = cache.stats()['bytes']
+    cache.max_bytes = int(entry_bytes * 2.5)
+    set_mtime(cache, 'a', 30)
+    put(cache, 'b')
+    set_mtime(cache, 'b', 20)
+    assert cache.get('a') is not None  # now more recently used than b
+    put(cache, 'c')
+    assert sorted(os.listdir(cache.directory)) == ['a', 'c']
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+def test_predictor_reuses_cached_features_until_the_data_changes(cache, stock):
+    first = StockPredictor(model_type='random_forest', feature_cache=cache)
+    X, y = first.scale_features(stock)
+    second = StockPredictor(model_type='random_forest', feature_cache=cache)
+    X_cached, y_cached = second.scale_features(stock)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(X_cached, X)
+    np.testing.assert_array_equal(y_cached, y)
+    np.testing.assert_array_equal(second.feature_scaler.data_max_, first.feature_scaler.data_max_)
+
+    changed = copy.deepcopy(stock)
+    changed['historical_data'][-1]['Close'] *= 1.1
+    StockPredictor(model_type='random_forest', feature_cache=cache).scale_features(changed)
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,49 @@
+import contextlib
+import functools
+import io
+import numpy as np
+from fake_yfinance import fake_download, make_ticker_factory
+from fetch_stock_data import fetch_nse_bse_stocks
+
+def recording_factory(calls, **kwargs):
+    """make_ticker_factory, appending the symbol of every history request to `calls`"""
+    factory = make_ticker_factory(**kwargs)
+    def make(symbol):
+        ticker = factory(symbol)
+        history = ticker.history
+        def recorded_history(*args, **kwargs):
+            calls.append(symbol)
+            return history(*args, **kwargs)
+        ticker.history = recorded_history
+        return ticker
+    return make
+
+def fetch(**kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fetch_nse_bse_stocks(**kwargs)
+
+def test_batched_symbols_need_no_single_requests():
+    calls = []
+    stock_data = fetch(ticker_factory=recording_factory(calls, periods=300),
+                       download_fn=functools.partial(fake_download, periods=300))
+    assert len(stock_data) == 30
+    assert calls == []
+
+def test_symbols_missing_from_the_batch_fall_back_to_single_requests():
+    def download(tickers, **kwargs):
+        wide = fake_download([t for t in tickers if t != 'TCS.NS'], periods=300).astype(float)
+        wide.loc[:, ('INFY.NS', slice(None))] = np.nan
+        return wide
+    calls = []
+    stock_data = fetch(ticker_factory=recording_factory(calls, periods=300), download_fn=download)
+    assert sorted(calls) == ['INFY.NS', 'TCS.NS']
+    assert len(stock_data) == 30
+    assert len(stock_data['TCS.NS']['historical_data']) == 300
+
+def test_symbol_without_any_history_is_skipped():
+    calls = []
+    stock_data = fetch(ticker_factory=recording_factory(calls, fail_symbols={'TCS.NS'}, periods=300),
+                       download_fn=lambda tickers, **kwargs: fake_download(
+                           [t for t in tickers if t != 'TCS.NS'], periods=300))
+    assert calls == ['TCS.NS']
+    assert 'TCS.NS' not in stock_data and len(stock_data) == 29
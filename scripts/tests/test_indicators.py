@@ -0,0 +1,155 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from fake_yfinance import synthetic_ohlcv
+from feature_pipeline import (FeaturePipeline, FULL_COLUMNS, LEAN_COLUMNS, BASE_COLUMNS, PANDAS_OPS, INDICATORS,
+                              resolve, source_columns, canonical_frame)
+from panel_indicators import OHLCVPanel, calculate_panel_indicators
+from streaming_indicators import StreamingIndicatorEngine
+
+SYMBOLS = ['AAA.NS', 'BBB.NS', 'CCC.NS']
+
+@pytest.fixture(scope='module')
+def frames():
+    # Different lengths so the panel has leading gaps to mask
+    return {symbol: synthetic_ohlcv(symbol, periods=400 - 60 * i) for i, symbol in enumerate(SYMBOLS)}
+
+def assert_close(expected, actual, tolerance=1e-8):
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        a, b = expected[column].to_numpy(dtype=float), actual[column].to_numpy(dtype=float)
+        assert np.array_equal(np.isnan(a), np.isnan(b)), column
+        mask = ~np.isnan(a)
+        np.testing.assert_allclose(b[mask], a[mask], rtol=tolerance, atol=tolerance, err_msg=column)
+
+@pytest.mark.parametrize('columns, dtype', [(FULL_COLUMNS, None), (LEAN_COLUMNS, np.float32)])
+def test_panel_matches_pipeline(frames, columns, dtype):
+    panel = OHLCVPanel.from_frames(frames)
+    indicators = calculate_panel_indicators(panel, columns, dtype)
+    assert list(indicators) == columns
+    assert {values.dtype for values in indicators.values()} == {np.dtype(dtype or np.float64)}
+    result = panel.to_frames(indicators)
+    pipeline = FeaturePipeline(columns, dtype)
+    for symbol, df in frames.items():
+        expected = pipeline.frame(df)
+        assert_close(expected, result[symbol], tolerance=1e-5 if dtype else 1e-8)
+
+def pandas_indicators(df):
+    """The original per-symbol pandas implementation, as an independent reference"""
+    df = df.copy()
+    close = df['Close']
+    for window in (5, 10, 20, 50, 200):
+        df[f'SMA_{window}'] = close.rolling(window=window).mean()
+    df['EMA_12'] = close.ewm(span=12).mean()
+    df['EMA_26'] = close.ewm(span=26).mean()
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    df['RSI'] = 100 - (100 / (1 + gain / loss))
+    df['MACD'] = df['EMA_12'] - df['EMA_26']
+    df['MACD_Signal'] = df['MACD'].ewm(span=9).mean()
+    df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
+    df['BB_Middle'] = close.rolling(window=20).mean()
+    bb_std = close.rolling(window=20).std()
+    df['BB_Upper'] = df['BB_Middle'] + bb_std * 2
+    df['BB_Lower'] = df['BB_Middle'] - bb_std * 2
+    low_min = df['Low'].rolling(window=14).min()
+    high_max = df['High'].rolling(window=14).max()
+    df['Stoch_K'] = 100 * ((close - low_min) / (high_max - low_min))
+    df['Stoch_D'] = df['Stoch_K'].rolling(window=3).mean()
+    true_range = pd.concat([df['High'] - df['Low'], (df['High'] - close.shift()).abs(),
+                            (df['Low'] - close.shift()).abs()], axis=1).max(axis=1)
+    df['ATR'] = true_range.rolling(window=14).mean()
+    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
+    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+    return df
+
+def test_panel_matches_per_symbol_pandas_with_different_start_and_end_dates():
+    # Listed at different times, one delisted early, one too short for SMA_200
+    frames = {
+        'OLD.NS': synthetic_ohlcv('OLD.NS', periods=500),
+        'NEW.NS': synthetic_ohlcv('NEW.NS', periods=260),
+        'GONE.NS': synthetic_ohlcv('GONE.NS', periods=300, end='2024-06-28'),
+        'IPO.NS': synthetic_ohlcv('IPO.NS', periods=120),
+    }
+    panel = OHLCVPanel.from_frames(frames)
+    result = panel.to_frames(calculate_panel_indicators(panel))
+    for symbol, df in frames.items():
+        expected = pandas_indicators(df)
+        pd.testing.assert_index_equal(result[symbol].index, df.index)
+        assert_close(expected[FULL_COLUMNS], result[symbol][FULL_COLUMNS])
+    assert result['IPO.NS']['SMA_200'].isna().all()
+
+def test_streaming_matches_pipeline(frames):
+    df = frames['AAA.NS']
+    expected = pd.DataFrame(FeaturePipeline(FULL_COLUMNS).compute(df))
+    assert_close(expected, StreamingIndicatorEngine().update_frame(df))
+
+def test_streaming_output_subset(frames):
+    df = frames['AAA.NS']
+    expected = pd.DataFrame(FeaturePipeline(LEAN_COLUMNS).compute(df))
+    assert_close(expected, StreamingIndicatorEngine(LEAN_COLUMNS).update_frame(df))
+
+def test_streaming_snapshot_round_trip(frames):
+    df = frames['AAA.NS']
+    half = len(df) // 2
+    engine = StreamingIndicatorEngine()
+    first = engine.update_frame(df.iloc[:half])
+    engine = StreamingIndicatorEngine.restore(json.loads(json.dumps(engine.snapshot())))
+    assert engine.last_date == str(df.index[half - 1])
+    actual = pd.concat([first, engine.update_frame(df.iloc[half:])])
+    assert_close(pd.DataFrame(FeaturePipeline(FULL_COLUMNS).compute(df)), actual)
+
+def test_resolve_orders_dependencies_first():
+    order = resolve(['MACD_Histogram', 'BB_Lower'])
+    for name in order:
+        assert all(dependency in BASE_COLUMNS or order.index(dependency) < order.index(name)
+                   for dependency in INDICATORS[name].inputs)
+    assert set(order) == {'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal', 'MACD_Histogram', 'SMA_20', 'BB_Middle',
+                          'BB_Width', 'BB_Lower'}
+    with pytest.raises(ValueError, match='Unknown indicator'):
+        resolve(['SMA_7'])
+
+def test_pipeline_computes_each_indicator_once(frames):
+    calls = []
+    def counting(op):
+        def run(*args, **kwargs):
+            calls.append(op)
+            return PANDAS_OPS[op](*args, **kwargs)
+        return run
+    pipeline = FeaturePipeline(['MACD', 'MACD_Signal', 'MACD_Histogram', 'BB_Upper', 'BB_Lower', 'SMA_20'])
+    outputs = pipeline.evaluate(frames['AAA.NS'], {op: counting(op) for op in PANDAS_OPS})
+    # Two EMAs for MACD and one for its signal; SMA_20 shared by the bands
+    assert calls.count('ema') == 3
+    assert calls.count('sma') == 1
+    assert len(calls) == len(pipeline.order)
+    # Intermediates are released, only the outputs come back
+    assert list(outputs) == pipeline.outputs
+
+def test_pipeline_matches_the_pandas_reference(frames):
+    df = frames['BBB.NS']
+    assert_close(pandas_indicators(df)[FULL_COLUMNS], FeaturePipeline(FULL_COLUMNS).frame(df)[FULL_COLUMNS])
+
+def test_dtype_casts_only_the_outputs(frames):
+    df = frames['AAA.NS']
+    full = FeaturePipeline(LEAN_COLUMNS).frame(df)
+    lean = FeaturePipeline(LEAN_COLUMNS, dtype=np.float32).frame(df)
+    assert list(lean.columns) == BASE_COLUMNS + LEAN_COLUMNS
+    assert (lean[BASE_COLUMNS].dtypes == df[BASE_COLUMNS].dtypes).all()
+    assert (lean[LEAN_COLUMNS].dtypes == np.float32).all()
+    pd.testing.assert_frame_equal(lean[LEAN_COLUMNS], full[LEAN_COLUMNS].astype(np.float32))
+
+def test_assign_adds_outputs_in_place(frames):
+    df = frames['AAA.NS'].copy()
+    df['Dividends'] = 0.0
+    assert FeaturePipeline(['RSI']).assign(df) is df
+    assert list(df.columns) == BASE_COLUMNS + ['Dividends', 'RSI']
+
+def test_legacy_band_names_are_recognised():
+    legacy = pd.DataFrame({'Bollinger_Upper': [1.0], 'Bollinger_Lower': [0.5], 'Close': [0.8]})
+    assert source_columns(legacy.columns, ['Close', 'BB_Upper', 'BB_Lower']) == \
+        ['Close', 'Bollinger_Upper', 'Bollinger_Lower']
+    assert list(canonical_frame(legacy).columns) == ['BB_Upper', 'BB_Lower', 'Close']
+    current = pd.DataFrame({'BB_Upper': [1.0]})
+    assert canonical_frame(current) is current
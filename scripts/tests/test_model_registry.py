@@ -0,0 +1,51 @@
+import contextlib
+import io
+import numpy as np
+import pytest
+from benchmark_database import make_dataset
+from model_registry import ModelRegistry, member_view
+from prediction_service import latest_input
+from stock_storage import open_store
+from train_model import train_pooled_model
+
+@pytest.fixture(scope='module')
+def pooled(tmp_path_factory):
+    pytest.importorskip('sklearn')
+    workdir = tmp_path_factory.mktemp('pooled')
+    stock_data = make_dataset(3, 300)
+    store = open_store(str(workdir / 'store'))
+    store.save(stock_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor, pool, _ = train_pooled_model(store, model_type='random_forest')
+    registry = ModelRegistry(str(workdir / 'models'))
+    registry.save('pooled', predictor, symbol_scalers=pool.symbol_scalers())
+    return registry, pool, store
+
+def test_pooled_entry_needs_a_member(pooled):
+    registry, pool, _ = pooled
+    assert registry.metadata('pooled', 'random_forest')['members'] == sorted(pool.symbols)
+    with pytest.raises(ValueError):
+        registry.open('pooled', 'random_forest')
+    with pytest.raises(ValueError):
+        registry.open('pooled', 'random_forest', member='MISSING.NS')
+
+def test_pooled_member_predicts_with_its_training_scalers(pooled):
+    registry, pool, store = pooled
+    for index, symbol in enumerate(pool.symbols):
+        predictor = registry.open('pooled', 'random_forest', member=symbol)
+        assert predictor.symbol_id == pool.symbol_ids[index]
+        np.testing.assert_array_equal(predictor.feature_scaler.data_max_, pool.predictors[index].feature_scaler.data_max_)
+
+        x, current_price = latest_input(predictor, store.load(symbol)['historical_data'])
+        # The same row PooledWindows trained on: scaled features plus the symbol ID column
+        np.testing.assert_allclose(x, pool.samples[index][0][-1])
+        assert np.isfinite(predictor.predict(x[np.newaxis])).all()
+
+def test_pooled_members_share_the_opened_model(pooled):
+    registry, pool, _ = pooled
+    predictor, symbol_scalers = registry.open_pooled('pooled', 'random_forest', lazy=False)
+    assert sorted(symbol_scalers) == sorted(pool.symbols)
+    views = [member_view(predictor, symbol_scalers, symbol) for symbol in pool.symbols]
+    assert all(view.model is predictor.model for view in views)
+    assert [view.symbol_id for view in views] == list(pool.symbol_ids)
+    assert predictor.symbol_id is None
@@ -0,0 +1,88 @@
+import threading
+import types
+import numpy as np
+import pytest
+from prediction_service import ModelCache, MicroBatcher
+
+class FlakyRegistry:
+    """Fails the first `failures` opens of every model, then returns a stand-in predictor"""
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.opened = []
+
+    def open(self, symbol, model_type, lazy=True, member=None):
+        self.opened.append((symbol, model_type, member))
+        if self.opened.count((symbol, model_type, member)) <= self.failures:
+            raise FileNotFoundError(f"no {model_type} model for {symbol}")
+        return object()
+
+    def open_pooled(self, symbol, model_type, lazy=True):
+        self.opened.append((symbol, model_type, None))
+        symbol_scalers = {member: {'scaler': member, 'feature_scaler': member, 'symbol_id': index}
+                          for index, member in enumerate(['A.NS', 'B.NS'])}
+        return types.SimpleNamespace(model=object(), scaler=None, feature_scaler=None, symbol_id=None), symbol_scalers
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ModelCache(str(tmp_path), capacity=2)
+    cache.registry = FlakyRegistry()
+    return cache
+
+def test_failed_load_releases_its_key_lock(cache):
+    with pytest.raises(FileNotFoundError):
+        cache.get('A.NS', 'xgboost')
+    assert cache.loading == {}
+    predictor = cache.get('A.NS', 'xgboost')
+    assert cache.get('A.NS', 'xgboost') is predictor
+    assert cache.loading == {}
+    assert cache.stats() == {'loaded': 1, 'capacity': 2, 'hits': 1, 'misses': 2}
+
+def test_concurrent_first_requests_load_once(cache):
+    cache.registry = FlakyRegistry(failures=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('A.NS', 'xgboost'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, results))) == 1
+    assert cache.registry.opened == [('A.NS', 'xgboost', None)]
+    assert cache.loading == {}
+
+def test_least_recently_used_model_is_evicted(cache):
+    cache.registry = FlakyRegistry(failures=0)
+    for symbol in ['A.NS', 'B.NS', 'A.NS', 'C.NS']:
+        cache.get(symbol, 'xgboost')
+    assert list(cache.models) == [('A.NS', 'xgboost'), ('C.NS', 'xgboost')]
+
+def test_pooled_members_share_one_cached_model(cache):
+    cache.registry = FlakyRegistry(failures=0)
+    a, b = cache.get('pooled', 'xgboost', 'A.NS'), cache.get('pooled', 'xgboost', 'B.NS')
+    assert a.model is b.model
+    assert (a.scaler, a.symbol_id, b.scaler, b.symbol_id) == ('A.NS', 0, 'B.NS', 1)
+    assert cache.get('pooled', 'xgboost', 'A.NS').model is a.model
+    assert cache.registry.opened == [('pooled', 'xgboost', None)]
+    assert list(cache.models) == [('pooled', 'xgboost')]
+    with pytest.raises(ValueError):
+        cache.get('pooled', 'xgboost', 'MISSING.NS')
+
+class Scaler:
+    """Target scaler stand-in mapping model output m to m * factor"""
+    def __init__(self, factor):
+        self.factor = factor
+
+    def inverse_transform(self, values):
+        return values * self.factor
+
+def test_pooled_members_batch_together_with_their_own_scalers():
+    model_calls = []
+    def predict_scaled(X):
+        model_calls.append(len(X))
+        return X.sum(axis=1)
+    members = [types.SimpleNamespace(predict_scaled=predict_scaled, scaler=Scaler(factor)) for factor in (1, 10, 100)]
+    batcher = MicroBatcher(max_batch=6, max_wait=0.5)
+    futures = [batcher.submit(('pooled', 'xgboost'), members[i % 3], np.array([i, 1.0])) for i in range(6)]
+    results = [future.result(timeout=5) for future in futures]
+    assert model_calls == [6]
+    assert results == [(i + 1.0) * (1, 10, 100)[i % 3] for i in range(6)]
+    assert batcher.stats()['batches'] == 1
@@ -0,0 +1,117 @@
+import threading
+import pandas as pd
+import pytest
+from fake_yfinance import make_ticker_factory, synthetic_ohlcv
+from response_cache import ResponseCache, caching_ticker_factory
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'response_cache.sqlite'))
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def calls():
+    return []
+
+@pytest.fixture
+def ticker(cache, calls):
+    fake = make_ticker_factory()
+
+    def counting_factory(symbol):
+        ticker = fake(symbol)
+        history = ticker.history
+
+        def history_call(*args, **kwargs):
+            calls.append(kwargs)
+            return history(*args, **kwargs)
+        ticker.history = history_call
+        return ticker
+    return caching_ticker_factory(cache, counting_factory)('CHECK.NS')
+
+def test_repeat_history_is_served_from_cache(ticker, calls, cache):
+    first = ticker.history(period="5y")
+    second = ticker.history(period="5y")
+    assert len(calls) == 1
+    assert first.equals(second)
+    assert cache.counts['hits'] == 1
+
+def test_start_inside_cached_range_is_served_from_cache(ticker, calls):
+    first = ticker.history(period="5y")
+    tail = ticker.history(start=str(first.index[-10].date()))
+    assert len(calls) == 1
+    assert tail.equals(first.iloc[-10:])
+
+def test_repeat_info_is_served_from_cache(ticker, cache):
+    assert ticker.info == ticker.info
+    assert cache.counts['misses'] == 1
+    assert cache.counts['hits'] == 1
+
+def test_expired_history_revalidates_only_its_tail(ticker, calls, cache):
+    first = ticker.history(period="5y")
+    cache.ttls['history'] = 0
+    again = ticker.history(period="5y")
+    assert len(calls) == 2
+    assert 'start' in calls[-1]
+    assert again.equals(first)
+    assert cache.counts['revalidated'] == 1
+
+def test_new_bars_are_appended_keeping_the_window_length(cache):
+    old = synthetic_ohlcv('TAIL.NS', periods=300, end='2024-12-20')
+    new = synthetic_ohlcv('TAIL.NS', periods=300, end='2024-12-31')
+    cache.history('TAIL.NS', lambda period, start=None: old)
+    cache.ttls['history'] = 0
+
+    requested = []
+    def fetch(period=None, start=None):
+        requested.append(start)
+        return new[new.index >= pd.Timestamp(start)]
+    updated = cache.history('TAIL.NS', fetch)
+
+    assert requested == ['2024-12-20']
+    assert cache.counts['updated'] == 1
+    assert len(updated) == len(old)
+    assert updated.index[-1] == new.index[-1]
+
+def test_provider_errors_fall_back_to_the_stale_entry(ticker, cache):
+    first = ticker.history(period="5y")
+    cache.ttls['history'] = 0
+    failing = make_ticker_factory(fail_symbols={'CHECK.NS'})
+    stale = caching_ticker_factory(cache, failing)('CHECK.NS').history(period="5y")
+    assert stale.equals(first)
+    assert cache.counts['stale'] == 1
+
+def test_errors_propagate_without_stale_if_error(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'strict.sqlite'), stale_if_error=False)
+    factory = caching_ticker_factory(cache, make_ticker_factory())
+    factory('CHECK.NS').history(period="5y")
+    cache.ttls['history'] = 0
+    failing = caching_ticker_factory(cache, make_ticker_factory(fail_symbols={'CHECK.NS'}))
+    with pytest.raises(ConnectionError):
+        failing('CHECK.NS').history(period="5y")
+    cache.close()
+
+def test_entries_persist_across_instances_and_purge(tmp_path):
+    path = str(tmp_path / 'response_cache.sqlite')
+    cache = ResponseCache(path)
+    caching_ticker_factory(cache, make_ticker_factory())('CHECK.NS').history(period="5y")
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert [entry['symbol'] for entry in reopened.entries()] == ['CHECK.NS']
+    assert reopened.purge('CHECK.NS') == 1
+    assert reopened.entries() == []
+    reopened.close()
+
+def test_counts_are_exact_across_threads(cache):
+    cache.info('CHECK.NS', lambda: {'longName': 'Check'})
+    def read():
+        for _ in range(200):
+            cache.info('CHECK.NS', lambda: pytest.fail("served from cache"))
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.counts['misses'] == 1
+    assert cache.counts['hits'] == 8 * 200
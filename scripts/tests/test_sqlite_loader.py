@@ -0,0 +1,73 @@
+import contextlib
+import io
+import sqlite3
+import numpy as np
+import pytest
+from benchmark_database import make_dataset
+from create_database import create_database, bulk_load
+from sqlite_loader import SQLiteWindows
+from train_model import PooledWindows
+
+PARTS = ['train', 'validation', 'test']
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    stock_data = make_dataset(3, 300)
+    path = str(tmp_path_factory.mktemp('sqlite_loader') / 'stock_data.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(path)
+        conn = sqlite3.connect(path)
+        bulk_load(conn, ((symbol, lambda data=data: data) for symbol, data in stock_data.items()))
+        conn.close()
+
+    symbols = sorted(stock_data)
+    pool = PooledWindows(model_type='lstm')
+    for index, symbol in enumerate(symbols):
+        assert pool.add(symbol, stock_data[symbol], index / (len(symbols) - 1))
+    return path, pool
+
+@pytest.fixture(params=[7, 25, 10000], ids=lambda rows: f'chunk_rows={rows}')
+def windows(request, dataset):
+    path, pool = dataset
+    # Pages shorter than a window, so windows span several page boundaries
+    windows = SQLiteWindows(path, batch_size=16, chunk_rows=request.param, shuffle_buffer=16)
+    with contextlib.redirect_stdout(io.StringIO()):
+        windows.prepare()
+    return windows
+
+def pooled_part(pool, part, symbol=None):
+    pairs = dict(zip(PARTS, pool.split()))[part]
+    if symbol is not None:
+        pairs = pairs[pairs[:, 0] == pool.symbols.index(symbol)]
+    return pool.gather(pairs)
+
+def test_symbol_arrays_match_pooled_windows(dataset, windows):
+    _, pool = dataset
+    assert list(windows.plans) == pool.symbols
+    for symbol in pool.symbols:
+        for part in PARTS:
+            X, y = windows.symbol_arrays(symbol, part)
+            expected_X, expected_y = pooled_part(pool, part, symbol)
+            assert X.shape == expected_X.shape
+            np.testing.assert_allclose(X, expected_X, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(y, expected_y, rtol=1e-9, atol=1e-12)
+
+def test_unshuffled_batches_match_pooled_windows(dataset, windows):
+    _, pool = dataset
+    for part in PARTS:
+        batches = list(windows.batches(part, shuffle=False, passes=1))
+        assert len(batches) == windows.steps(part)
+        X = np.concatenate([X for X, _ in batches])
+        y = np.concatenate([y for _, y in batches])
+        expected_X, expected_y = pooled_part(pool, part)
+        np.testing.assert_allclose(X, expected_X, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(y, expected_y, rtol=1e-9, atol=1e-12)
+
+def test_shuffled_batches_hold_every_window_once(dataset, windows):
+    _, pool = dataset
+    batches = list(windows.batches('train', shuffle=True, passes=1))
+    X = np.concatenate([X for X, _ in batches])
+    expected_X, _ = pooled_part(pool, 'train')
+    # Rows of each window flattened and sorted, so the order does not matter
+    flatten = lambda windows: windows.reshape(len(windows), -1)
+    np.testing.assert_allclose(np.sort(flatten(X), axis=0), np.sort(flatten(expected_X), axis=0), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from benchmark_database import make_dataset
+from stock_storage import (JsonStockStore, NumpyStockStore, open_store, historical_records, historical_columns,
+                           column_values)
+
+@pytest.fixture(scope='module')
+def stock_data():
+    stock_data = make_dataset(2, 120)
+    # A missing indicator value, as the fetcher writes it
+    next(iter(stock_data.values()))['historical_data'][3]['RSI'] = None
+    return stock_data
+
+@pytest.fixture
+def stores(tmp_path, stock_data):
+    json_store, numpy_store = open_store(str(tmp_path / 'data.json')), open_store(str(tmp_path / 'store'))
+    json_store.save(stock_data)
+    numpy_store.save(stock_data)
+    return json_store, numpy_store
+
+def assert_same_records(expected, actual):
+    assert len(actual) == len(expected)
+    for expected_row, row in zip(expected, actual):
+        assert list(row) == list(expected_row)
+        for key, value in expected_row.items():
+            if isinstance(value, float):
+                # Indicators and prices are stored as float32
+                assert row[key] == pytest.approx(value, rel=1e-6)
+            else:
+                assert row[key] == value
+
+def test_open_store_picks_the_backend(tmp_path):
+    assert isinstance(open_store(str(tmp_path / 'data.json')), JsonStockStore)
+    store = open_store(str(tmp_path / 'store'))
+    assert isinstance(store, NumpyStockStore)
+    assert not store.exists()
+
+def test_columns_are_typed_and_memory_mapped(stores, stock_data):
+    _, store = stores
+    assert store.exists()
+    assert store.symbols() == list(stock_data)
+    columns = store.load(store.symbols()[0])['historical_data']
+    assert all(isinstance(values, np.memmap) for values in columns.values())
+    assert columns['Date'].dtype == np.dtype('datetime64[D]')
+    assert columns['Volume'].dtype == np.int64
+    assert columns['Close'].dtype == columns['RSI'].dtype == np.float32
+    assert np.isnan(columns['RSI'][3])
+
+def test_round_trip_matches_the_json_store(stores, stock_data):
+    json_store, store = stores
+    for symbol, data in stock_data.items():
+        loaded = store.load(symbol)
+        assert {key: value for key, value in loaded.items() if key != 'historical_data'} == \
+            {key: value for key, value in data.items() if key != 'historical_data'}
+        assert_same_records(json_store.load(symbol)['historical_data'], historical_records(loaded['historical_data']))
+    assert historical_records(store.load(next(iter(stock_data)))['historical_data'])[3]['RSI'] is None
+
+@pytest.mark.parametrize('start, end', [('2024-10-01', '2024-11-15'), ('2024-12-02', None), (None, '2024-09-30'),
+                                        ('2030-01-01', None)])
+def test_date_ranges_match_the_json_store(stores, start, end):
+    json_store, store = stores
+    for symbol in store.symbols():
+        expected = json_store.load(symbol, start=start, end=end)['historical_data']
+        assert_same_records(expected, historical_records(store.load(symbol, start=start, end=end)['historical_data']))
+
+def test_column_layout_and_arrays_are_saved_as_is(tmp_path, stock_data):
+    symbol, data = next(iter(stock_data.items()))
+    columns = historical_columns(data['historical_data'])
+    columns['Close'] = np.asarray(columns['Close'])
+    store = NumpyStockStore(str(tmp_path / 'store'))
+    store.save({symbol: dict(data, historical_data=columns)})
+    loaded = store.load(symbol)['historical_data']
+    assert list(loaded) == list(columns)
+    np.testing.assert_allclose(loaded['Close'], columns['Close'], rtol=1e-6)
+    assert column_values(loaded['Date']) == columns['Date']
@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from comprehensive_stock_fetcher import ComprehensiveStockFetcher
+from fake_yfinance import synthetic_ohlcv, make_ticker_factory
+from streaming_indicators import (RollingWindow, RollingExtreme, ExponentialMean, StreamingIndicatorEngine,
+                                  save_engine_states, load_engine_states)
+
+TOLERANCE = 1e-8
+
+@pytest.fixture(scope='module')
+def series():
+    values = synthetic_ohlcv('CHECK.NS', periods=300)['Close'].to_numpy(copy=True)
+    values[[5, 120, 121, 250]] = np.nan
+    return pd.Series(values)
+
+def stream(accumulator, values, read):
+    out = []
+    for value in values:
+        accumulator.update(float(value))
+        out.append(read(accumulator))
+    return np.array(out)
+
+def assert_matches(expected, actual):
+    expected = np.asarray(expected, dtype=float)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    mask = ~np.isnan(expected)
+    np.testing.assert_allclose(actual[mask], expected[mask], rtol=TOLERANCE, atol=TOLERANCE)
+
+@pytest.mark.parametrize('window', [1, 5, 20])
+def test_rolling_window_matches_pandas(series, window):
+    assert_matches(series.rolling(window).mean(), stream(RollingWindow(window), series, RollingWindow.mean))
+    assert_matches(series.rolling(window).std(), stream(RollingWindow(window), series, RollingWindow.std))
+
+@pytest.mark.parametrize('mode', ['min', 'max'])
+def test_rolling_extreme_matches_pandas(series, mode):
+    expected = getattr(series.rolling(14), mode)()
+    assert_matches(expected, stream(RollingExtreme(14, mode), series, RollingExtreme.value))
+
+def test_exponential_mean_matches_pandas(series):
+    assert_matches(series.ewm(span=12).mean(), stream(ExponentialMean(12), series, ExponentialMean.value))
+
+@pytest.mark.parametrize('make, read', [(lambda: RollingWindow(20), RollingWindow.mean),
+                                        (lambda: RollingExtreme(14, 'max'), RollingExtreme.value),
+                                        (lambda: ExponentialMean(26), ExponentialMean.value)])
+def test_accumulator_snapshot_round_trip(series, make, read):
+    expected = stream(make(), series, read)
+    accumulator = make()
+    first = stream(accumulator, series[:150], read)
+    restored = type(accumulator).restore(json.loads(json.dumps(accumulator.snapshot())))
+    assert_matches(expected, np.concatenate([first, stream(restored, series[150:], read)]))
+
+def test_engine_matches_fetcher_indicators():
+    df = synthetic_ohlcv('CHECK.NS')
+    expected = ComprehensiveStockFetcher(make_ticker_factory(), rate_limit=None).calculate_technical_indicators(df.copy())
+    half = len(df) // 2
+    engine = StreamingIndicatorEngine()
+    first = engine.update_frame(df.iloc[:half])
+    engine = StreamingIndicatorEngine.restore(json.loads(json.dumps(engine.snapshot())))
+    actual = pd.concat([first, engine.update_frame(df.iloc[half:])])
+    for column in actual.columns:
+        assert_matches(expected[column], actual[column].to_numpy())
+
+def test_engine_states_round_trip_through_a_file(tmp_path):
+    path = str(tmp_path / 'indicator_state.json')
+    df = synthetic_ohlcv('CHECK.NS', periods=300)
+    engines = {'CHECK.NS': StreamingIndicatorEngine()}
+    engines['CHECK.NS'].update_frame(df.iloc[:200])
+    save_engine_states(engines, path)
+
+    restored = load_engine_states(path)
+    assert list(restored) == ['CHECK.NS']
+    assert restored['CHECK.NS'].last_date == str(df.index[199])
+    pd.testing.assert_frame_equal(restored['CHECK.NS'].update_frame(df.iloc[200:]),
+                                  engines['CHECK.NS'].update_frame(df.iloc[200:]), rtol=TOLERANCE)
+
+def test_missing_state_file_loads_no_engines(tmp_path):
+    assert load_engine_states(str(tmp_path / 'missing.json')) == {}
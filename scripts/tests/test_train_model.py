@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from train_model import StockPredictor
+
+@pytest.fixture
+def predictor():
+    predictor = StockPredictor(model_type='lstm', batch_size=8)
+    predictor.sequence_length = 5
+    return predictor
+
+def looped_sequences(X, y, length):
+    """The original per-window loop, as the reference for create_sequences"""
+    X_seq, y_seq = [], []
+    for i in range(length, len(X)):
+        X_seq.append(X[i - length:i])
+        y_seq.append(y[i])
+    return np.array(X_seq), np.array(y_seq)
+
+@pytest.mark.parametrize('rows', [6, 7, 40])
+def test_sequences_match_the_loop(predictor, rows):
+    X = np.arange(rows * 3, dtype=float).reshape(rows, 3)
+    y = np.arange(rows, dtype=float) * 10
+    X_seq, y_seq = predictor.create_sequences(X, y)
+    expected_X, expected_y = looped_sequences(X, y, 5)
+    assert X_seq.shape == (rows - 5, 5, 3)
+    np.testing.assert_array_equal(X_seq, expected_X)
+    np.testing.assert_array_equal(y_seq, expected_y)
+
+def test_sequences_are_a_read_only_view(predictor):
+    X = np.random.default_rng(0).normal(size=(30, 4))
+    X_seq, _ = predictor.create_sequences(X, np.zeros(30))
+    assert np.shares_memory(X_seq, X)
+    assert not X_seq.flags.writeable
+
+@pytest.mark.parametrize('rows', [0, 3, 5])
+def test_too_short_history_gives_no_sequences(predictor, rows):
+    X_seq, y_seq = predictor.create_sequences(np.zeros((rows, 3)), np.zeros(rows))
+    assert X_seq.shape == (0, 5, 3)
+    assert y_seq.shape == (0,)
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_batches_cover_every_sample_once_per_pass(predictor, shuffle):
+    X, y = predictor.create_sequences(np.arange(100, dtype=float).reshape(50, 2), np.arange(50, dtype=float))
+    batches = predictor.batch_generator(X, y, shuffle=shuffle)
+    steps = int(np.ceil(len(X) / predictor.batch_size))
+    seen = []
+    for _ in range(steps):
+        X_batch, y_batch = next(batches)
+        assert len(X_batch) <= predictor.batch_size
+        # Each batch is a copy of its windows, paired with their targets
+        assert X_batch.flags.writeable
+        np.testing.assert_array_equal(X_batch[:, -1, 0], (y_batch - 1) * 2)
+        seen.extend(y_batch.tolist())
+    assert sorted(seen) == y.tolist()
+    if not shuffle:
+        assert seen == y.tolist()
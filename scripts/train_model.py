@@ -1,33 +1,60 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, accuracy_score
-from sklearn.ensemble import RandomForestRegressor
-import xgboost as xgb
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, GRU, Dense, Dropout, Attention, MultiHeadAttention, LayerNormalization
-from tensorflow.keras.optimizers import Adam
+from numpy.lib.stride_tricks import sliding_window_view
 import json
-import pickle
+import argparse
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
 from datetime import datetime
+from stock_storage import open_store
+from feature_cache import FeatureCache
+from feature_pipeline import canonical_frame
+from model_registry import (ModelRegistry, LazyModel, save_native, save_scalers, load_scalers,
+                            model_filename)
+from create_database import save_predictions
 import warnings
 warnings.filterwarnings('ignore')
 
+# sklearn, xgboost and TensorFlow are imported only where a model type needs
+# them; TensorFlow's import alone dominates short-lived scoring jobs
+
+# Technical indicators (already calculated in fetch script) plus engineered columns
+FEATURES = ['Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'SMA_50',
+            'RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower',
+            'Price_Change', 'Volume_Change', 'High_Low_Ratio', 'Price_Volume_Trend']
+
+NEURAL_MODELS = ['lstm', 'gru', 'transformer']
+
+# A signal needs a predicted move beyond SIGNAL_THRESHOLD percent at more than SIGNAL_MIN_CONFIDENCE
+SIGNAL_THRESHOLD = 2
+SIGNAL_MIN_CONFIDENCE = 75
+# Stop-loss as a fraction of the current price, as in lib/prediction-service.ts
+STOP_LOSS_FACTORS = {'BUY': 0.95, 'SELL': 1.05, 'HOLD': 0.98}
+
 class StockPredictor:
-    def __init__(self, model_type='lstm'):
+    def __init__(self, model_type='lstm', batch_size=32, stream_batches=True, n_jobs=None, feature_cache=None):
+        from sklearn.preprocessing import MinMaxScaler
+        
         self.model_type = model_type
         self.model = None
         self.scaler = MinMaxScaler()
         self.feature_scaler = MinMaxScaler()
         self.sequence_length = 60
-        
-    def prepare_data(self, stock_data, target_column='Close'):
-        """Prepare data for training"""
-        print(f"Preparing data for {self.model_type} model...")
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(stock_data['historical_data'])
+        # Set when opened from a pooled model: the ID column appended to the scaled features
+        self.symbol_id = None
+        self.batch_size = batch_size
+        # Feed neural models batch by batch instead of materializing every window
+        self.stream_batches = stream_batches
+        # Threads for sklearn/xgboost fitting (None keeps each library's default)
+        self.n_jobs = n_jobs
+        self.feature_cache = feature_cache
+        
+    def feature_frame(self, stock_data):
+        """Historical data with the engineered feature columns added"""
+        # Convert to DataFrame, reading schema 1 datasets under the current names
+        df = canonical_frame(pd.DataFrame(stock_data['historical_data']))
         df['Date'] = pd.to_datetime(df.index)
         
         # Feature engineering
@@ -35,24 +62,49 @@ class StockPredictor:
         df['Volume_Change'] = df['Volume'].pct_change()
         df['High_Low_Ratio'] = df['High'] / df['Low']
         df['Price_Volume_Trend'] = df['Close'] * df['Volume']
-        
-        # Technical indicators (already calculated in fetch script)
-        features = ['Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'SMA_50', 
-                   'RSI', 'MACD', 'MACD_Signal', 'Bollinger_Upper', 'Bollinger_Lower',
-                   'Price_Change', 'Volume_Change', 'High_Low_Ratio', 'Price_Volume_Trend']
+        return df
+    
+    def build_features(self, stock_data, target_column='Close'):
+        """Engineer the unscaled feature matrix and target for one stock"""
+        df = self.feature_frame(stock_data)
         
         # Remove NaN values
         df = df.dropna()
         
         # Prepare features and target
-        X = df[features].values
-        y = df[target_column].values
+        return df[FEATURES].values, df[target_column].values
+    
+    def scale_features(self, stock_data, target_column='Close'):
+        """Build and scale the feature matrix, fitting both scalers
+        
+        Served from the feature cache when one is set and the stock's data,
+        features and sequence length are unchanged since it was stored.
+        """
+        if self.feature_cache is not None:
+            key = self.feature_cache.key(stock_data.get('symbol'), stock_data['historical_data'],
+                                         FEATURES, target_column, self.sequence_length)
+            cached = self.feature_cache.get(key)
+            if cached is not None:
+                X_scaled, y_scaled, self.scaler, self.feature_scaler = cached
+                return X_scaled, y_scaled
+        
+        X, y = self.build_features(stock_data, target_column)
         
         # Scale features
         X_scaled = self.feature_scaler.fit_transform(X)
         y_scaled = self.scaler.fit_transform(y.reshape(-1, 1)).flatten()
         
-        if self.model_type in ['lstm', 'gru', 'transformer']:
+        if self.feature_cache is not None:
+            self.feature_cache.put(key, X_scaled, y_scaled, self.scaler, self.feature_scaler)
+        return X_scaled, y_scaled
+    
+    def prepare_data(self, stock_data, target_column='Close'):
+        """Prepare data for training"""
+        print(f"Preparing data for {self.model_type} model...")
+        
+        X_scaled, y_scaled = self.scale_features(stock_data, target_column)
+        
+        if self.model_type in NEURAL_MODELS:
             # Create sequences for neural networks
             X_seq, y_seq = self.create_sequences(X_scaled, y_scaled)
             return X_seq, y_seq
@@ -61,15 +113,56 @@ class StockPredictor:
             return X_scaled, y_scaled
     
     def create_sequences(self, X, y):
-        """Create sequences for time series models"""
-        X_seq, y_seq = [], []
-        for i in range(self.sequence_length, len(X)):
-            X_seq.append(X[i-self.sequence_length:i])
-            y_seq.append(y[i])
-        return np.array(X_seq), np.array(y_seq)
+        """Create sequences for time series models
+
+        X_seq[j] is X[j:j + sequence_length] and y_seq[j] is the value that
+        follows it. X_seq is a read-only strided view over X, so no
+        (samples, sequence_length, features) copy is made here.
+        """
+        length = self.sequence_length
+        if len(X) <= length:
+            return np.empty((0, length, X.shape[1]), dtype=X.dtype), np.empty(0, dtype=y.dtype)
+        windows = sliding_window_view(X, length, axis=0)[:len(X) - length]
+        return windows.transpose(0, 2, 1), y[length:]
+    
+    def batch_generator(self, X, y, shuffle=True, seed=42):
+        """Endlessly yield contiguous (X, y) batches, copying one batch at a time"""
+        if len(X) == 0:
+            return
+        rng = np.random.default_rng(seed)
+        indices = np.arange(len(X))
+        while True:
+            if shuffle:
+                rng.shuffle(indices)
+            for start in range(0, len(X), self.batch_size):
+                batch = np.sort(indices[start:start + self.batch_size])
+                yield X[batch], y[batch]
+    
+    def fit_sequences(self, X_train, y_train, epochs=50, validation_split=0.2):
+        """Fit a neural model on windowed data, streaming batches when enabled"""
+        if not self.stream_batches:
+            return self.model.fit(np.ascontiguousarray(X_train), y_train, epochs=epochs,
+                                  batch_size=self.batch_size, validation_split=validation_split, verbose=1)
+        
+        # Same split as Keras' validation_split: the last fraction, unshuffled
+        split_idx = int(np.ceil(len(X_train) * (1 - validation_split)))
+        X_fit, X_val = X_train[:split_idx], X_train[split_idx:]
+        y_fit, y_val = y_train[:split_idx], y_train[split_idx:]
+        steps = lambda n: max(1, int(np.ceil(n / self.batch_size)))
+        
+        validation = {}
+        if len(X_val):
+            validation = {'validation_data': self.batch_generator(X_val, y_val, shuffle=False),
+                          'validation_steps': steps(len(X_val))}
+        return self.model.fit(self.batch_generator(X_fit, y_fit), steps_per_epoch=steps(len(X_fit)),
+                              epochs=epochs, verbose=1, **validation)
     
     def build_lstm_model(self, input_shape):
         """Build LSTM model"""
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+        from tensorflow.keras.optimizers import Adam
+        
         model = Sequential([
             LSTM(128, return_sequences=True, input_shape=input_shape),
             Dropout(0.2),
@@ -85,6 +178,10 @@ class StockPredictor:
     
     def build_gru_model(self, input_shape):
         """Build GRU model"""
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import GRU, Dense, Dropout
+        from tensorflow.keras.optimizers import Adam
+        
         model = Sequential([
             GRU(128, return_sequences=True, input_shape=input_shape),
             Dropout(0.2),
@@ -100,6 +197,10 @@ class StockPredictor:
     
     def build_transformer_model(self, input_shape):
         """Build Transformer model"""
+        import tensorflow as tf
+        from tensorflow.keras.layers import Dense, Dropout, MultiHeadAttention, LayerNormalization
+        from tensorflow.keras.optimizers import Adam
+        
         inputs = tf.keras.Input(shape=input_shape)
         
         # Multi-head attention
@@ -121,6 +222,22 @@ class StockPredictor:
         model.compile(optimizer=Adam(learning_rate=0.0001), loss='mse', metrics=['mae'])
         return model
     
+    def build_model(self, input_shape):
+        """Build an untrained model of this predictor's type"""
+        if self.model_type == 'lstm':
+            return self.build_lstm_model(input_shape)
+        elif self.model_type == 'gru':
+            return self.build_gru_model(input_shape)
+        elif self.model_type == 'transformer':
+            return self.build_transformer_model(input_shape)
+        elif self.model_type == 'random_forest':
+            from sklearn.ensemble import RandomForestRegressor
+            return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
+        elif self.model_type == 'xgboost':
+            import xgboost as xgb
+            return xgb.XGBRegressor(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
+        raise ValueError(f"Unknown model type: {self.model_type}")
+    
     def train(self, X, y):
         """Train the model"""
         print(f"Training {self.model_type} model...")
@@ -132,36 +249,12 @@ class StockPredictor:
         
         start_time = datetime.now()
         
-        if self.model_type == 'lstm':
-            self.model = self.build_lstm_model((X.shape[1], X.shape[2]))
-            history = self.model.fit(X_train, y_train, epochs=50, batch_size=32, 
-                                   validation_split=0.2, verbose=1)
-            
-        elif self.model_type == 'gru':
-            self.model = self.build_gru_model((X.shape[1], X.shape[2]))
-            history = self.model.fit(X_train, y_train, epochs=50, batch_size=32, 
-                                   validation_split=0.2, verbose=1)
-            
-        elif self.model_type == 'transformer':
-            self.model = self.build_transformer_model((X.shape[1], X.shape[2]))
-            history = self.model.fit(X_train, y_train, epochs=50, batch_size=32, 
-                                   validation_split=0.2, verbose=1)
-            
-        elif self.model_type == 'random_forest':
-            # Reshape for traditional ML
-            X_train_2d = X_train.reshape(X_train.shape[0], -1)
-            X_test_2d = X_test.reshape(X_test.shape[0], -1)
-            
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train_2d, y_train)
-            
-        elif self.model_type == 'xgboost':
+        self.model = self.build_model(X.shape[1:])
+        if self.model_type in NEURAL_MODELS:
+            history = self.fit_sequences(X_train, y_train)
+        else:
             # Reshape for traditional ML
-            X_train_2d = X_train.reshape(X_train.shape[0], -1)
-            X_test_2d = X_test.reshape(X_test.shape[0], -1)
-            
-            self.model = xgb.XGBRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train_2d, y_train)
+            self.model.fit(X_train.reshape(X_train.shape[0], -1), y_train)
         
         training_time = datetime.now() - start_time
         
@@ -173,6 +266,8 @@ class StockPredictor:
     
     def evaluate(self, X_test, y_test):
         """Evaluate model performance"""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error
+        
         if self.model_type in ['random_forest', 'xgboost']:
             X_test = X_test.reshape(X_test.shape[0], -1)
         
@@ -196,119 +291,526 @@ class StockPredictor:
     
     def predict(self, X):
         """Make predictions"""
+        # Inverse transform to get actual prices
+        return self.scaler.inverse_transform(self.predict_scaled(X).reshape(-1, 1)).flatten()
+    
+    def predict_scaled(self, X):
+        """Model output before the target scaler is inverted"""
         if self.model_type in ['random_forest', 'xgboost']:
             X = X.reshape(X.shape[0], -1)
         
-        predictions = self.model.predict(X)
-        # Inverse transform to get actual prices
-        return self.scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+        return np.asarray(self.model.predict(X)).reshape(-1)
     
     def generate_trading_signal(self, current_price, predicted_price, confidence):
         """Generate trading signal based on prediction"""
         price_change_percent = (predicted_price - current_price) / current_price * 100
         
-        if price_change_percent > 2 and confidence > 75:
+        if price_change_percent > SIGNAL_THRESHOLD and confidence > SIGNAL_MIN_CONFIDENCE:
             return "BUY"
-        elif price_change_percent < -2 and confidence > 75:
+        elif price_change_percent < -SIGNAL_THRESHOLD and confidence > SIGNAL_MIN_CONFIDENCE:
             return "SELL"
         else:
             return "HOLD"
     
     def save_model(self, filename):
-        """Save trained model"""
-        if self.model_type in ['lstm', 'gru', 'transformer']:
-            self.model.save(f"{filename}_{self.model_type}.h5")
-        else:
-            with open(f"{filename}_{self.model_type}.pkl", 'wb') as f:
-                pickle.dump(self.model, f)
+        """Save trained model in its native format (.keras, .ubj or memory-mappable .joblib)"""
+        save_native(self.model, self.model_type, f"{filename}_{self.model_type}")
         
         # Save scalers
-        with open(f"{filename}_{self.model_type}_scalers.pkl", 'wb') as f:
-            pickle.dump({'scaler': self.scaler, 'feature_scaler': self.feature_scaler}, f)
+        save_scalers(self, f"{filename}_{self.model_type}_scalers.pkl")
+    
+    @classmethod
+    def load_model(cls, filename, model_type, lazy=False):
+        """Load a model and its scalers written by save_model(filename)"""
+        predictor = cls(model_type=model_type)
+        predictor.model = LazyModel(model_type, model_filename(f"{filename}_{model_type}", model_type))
+        if not lazy:
+            predictor.model = predictor.model.load()
+        load_scalers(predictor, f"{filename}_{model_type}_scalers.pkl")
+        return predictor
 
-def train_all_models(stock_data):
-    """Train all model types and compare performance"""
-    models = ['lstm', 'gru', 'transformer', 'random_forest', 'xgboost']
-    results = {}
+def generate_trading_signals(current_prices, predicted_prices, confidences,
+                             threshold=SIGNAL_THRESHOLD, min_confidence=SIGNAL_MIN_CONFIDENCE):
+    """Vectorized generate_trading_signal for a whole universe at once
     
-    for model_type in models:
-        print(f"\n{'='*50}")
-        print(f"Training {model_type.upper()} model")
-        print(f"{'='*50}")
-        
+    Takes same-shaped arrays and returns (signals, target_prices,
+    stop_losses); the target is the predicted price and the stop-loss is
+    STOP_LOSS_FACTORS[signal] times the current price.
+    """
+    current = np.asarray(current_prices, dtype=np.float64)
+    predicted = np.asarray(predicted_prices, dtype=np.float64)
+    confident = np.asarray(confidences, dtype=np.float64) > min_confidence
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (predicted - current) / current * 100
+    buy = (change > threshold) & confident
+    sell = (change < -threshold) & confident
+    
+    signals = np.where(buy, 'BUY', np.where(sell, 'SELL', 'HOLD'))
+    stop_losses = current * np.where(buy, STOP_LOSS_FACTORS['BUY'],
+                                     np.where(sell, STOP_LOSS_FACTORS['SELL'], STOP_LOSS_FACTORS['HOLD']))
+    return signals, predicted.copy(), stop_losses
+
+def record_trading_signals(conn, model_type, symbols, current_prices, predicted_prices, confidences,
+                           prediction_date=None):
+    """Score a universe in one array pass and bulk-insert it into the predictions table"""
+    signals, target_prices, stop_losses = generate_trading_signals(current_prices, predicted_prices, confidences)
+    prediction_date = prediction_date or datetime.now().strftime('%Y-%m-%d')
+    save_predictions(conn, model_type, prediction_date, symbols, predicted_prices, signals,
+                     confidences, target_prices, stop_losses)
+    return signals, target_prices, stop_losses
+
+MODEL_TYPES = ['lstm', 'gru', 'transformer', 'random_forest', 'xgboost']
+
+class SharedArray:
+    """A numpy array copied into a named shared-memory block for worker processes"""
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)[...] = array
+        self.spec = (self.shm.name, array.shape, array.dtype.str)
+    
+    @staticmethod
+    def attach(spec):
+        """Open a block from its spec; returns (shm, array view)"""
+        name, shape, dtype = spec
+        shm = shared_memory.SharedMemory(name=name)
+        return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def configure_threads(threads, model_type):
+    """Cap a training job at `threads` CPU threads"""
+    if threads and model_type in NEURAL_MODELS:
+        import tensorflow as tf
         try:
-            predictor = StockPredictor(model_type=model_type)
-            
-            # Prepare data
-            X, y = predictor.prepare_data(stock_data)
-            
-            # Train model
-            metrics = predictor.train(X, y)
-            
-            # Save model
-            predictor.save_model(f"models/stock_predictor")
-            
-            results[model_type] = {
-                'metrics': metrics,
-                'model_type': model_type,
-                'trained_at': datetime.now().isoformat()
-            }
-            
-            print(f"✓ {model_type.upper()} training completed")
-            print(f"  Accuracy: {metrics['accuracy']:.2f}%")
-            print(f"  MSE: {metrics['mse']:.6f}")
-            print(f"  MAE: {metrics['mae']:.6f}")
-            print(f"  Training time: {metrics['training_time']}")
-            
-        except Exception as e:
-            print(f"✗ Error training {model_type}: {str(e)}")
-            results[model_type] = {'error': str(e)}
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+        except RuntimeError:
+            pass  # TF is already initialized in this process; keep its settings
+
+def run_training_job(job, X=None, y=None):
+    """Train and save one (symbol, model type) job on a prepared feature matrix
+    
+    Runs in a worker process, attaching to the shared-memory feature matrix,
+    or inline when X and y are given. Returns (symbol, model_type, result).
+    """
+    blocks = []
+    if X is None:
+        shm_X, X = SharedArray.attach(job['X'])
+        shm_y, y = SharedArray.attach(job['y'])
+        blocks = [shm_X, shm_y]
+    
+    configure_threads(job['threads'], job['model_type'])
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        predictor = StockPredictor(model_type=job['model_type'], n_jobs=job['threads'])
+        predictor.scaler, predictor.feature_scaler = job['scalers']
+        if predictor.model_type in NEURAL_MODELS:
+            X, y = predictor.create_sequences(X, y)
+        metrics = predictor.train(X, y)
+        ModelRegistry(job['model_dir']).save(job['symbol'], predictor, metrics)
+        result = {
+            'metrics': metrics,
+            'model_type': predictor.model_type,
+            'trained_at': datetime.now().isoformat()
+        }
+    except Exception as e:
+        result = {'error': str(e)}
+    result['wall_time'] = time.perf_counter() - wall_start
+    result['cpu_time'] = time.process_time() - cpu_start
+    result['threads'] = job['threads']
+    
+    # Views into the shared blocks must be gone before they can be closed
+    predictor = X = y = None
+    for shm in blocks:
+        shm.close()
+    return job['symbol'], job['model_type'], result
+
+def train_model_zoo(stocks, model_types=MODEL_TYPES, max_workers=1, threads_per_job=None, model_dir='models',
+                    feature_cache=None):
+    """Train every model type for every stock, in parallel worker processes
+    
+    Each stock's scaled feature matrix is built once and shared with the
+    workers through shared memory. Every job is capped at threads_per_job
+    threads (TF intra-op threads, sklearn/xgboost n_jobs); by default the
+    machine's cores are divided between the workers.
+    Returns {symbol: {model_type: result}} with per-job wall and CPU time.
+    """
+    if threads_per_job is None and max_workers > 1:
+        threads_per_job = max(1, (os.cpu_count() or 1) // max_workers)
+    
+    jobs, arrays, blocks = [], {}, []
+    for symbol, stock_data in stocks.items():
+        predictor = StockPredictor(feature_cache=feature_cache)
+        X_scaled, y_scaled = predictor.scale_features(stock_data)
+        
+        if max_workers > 1:
+            shared_X, shared_y = SharedArray(X_scaled), SharedArray(y_scaled)
+            blocks += [shared_X, shared_y]
+            matrix = {'X': shared_X.spec, 'y': shared_y.spec}
+        else:
+            arrays[symbol] = (X_scaled, y_scaled)
+            matrix = {}
+        
+        for model_type in model_types:
+            jobs.append(dict(matrix, symbol=symbol, model_type=model_type, threads=threads_per_job,
+                             scalers=(predictor.scaler, predictor.feature_scaler),
+                             model_dir=model_dir))
+    
+    results = {symbol: {} for symbol in stocks}
+    start_time = time.perf_counter()
+    try:
+        if max_workers > 1:
+            # spawn keeps TF's runtime out of the forked state of the parent
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn')) as executor:
+                futures = [executor.submit(run_training_job, job) for job in jobs]
+                for future in as_completed(futures):
+                    symbol, model_type, result = future.result()
+                    results[symbol][model_type] = result
+                    print_job_result(symbol, model_type, result)
+        else:
+            for job in jobs:
+                print(f"\n{'='*50}")
+                print(f"Training {job['model_type'].upper()} model for {job['symbol']}")
+                print(f"{'='*50}")
+                symbol, model_type, result = run_training_job(job, *arrays[job['symbol']])
+                results[symbol][model_type] = result
+                print_job_result(symbol, model_type, result)
+    finally:
+        for block in blocks:
+            block.release()
     
+    print_zoo_summary(results, time.perf_counter() - start_time, max_workers, threads_per_job)
     return results
 
+def print_job_result(symbol, model_type, result):
+    if 'error' in result:
+        print(f"✗ Error training {model_type} for {symbol}: {result['error']}")
+        return
+    metrics = result['metrics']
+    print(f"✓ {model_type.upper()} training completed for {symbol}")
+    print(f"  Accuracy: {metrics['accuracy']:.2f}%")
+    print(f"  MSE: {metrics['mse']:.6f}")
+    print(f"  MAE: {metrics['mae']:.6f}")
+    print(f"  Training time: {metrics['training_time']}")
+
+def print_zoo_summary(results, wall_time, max_workers, threads_per_job):
+    """Per-job wall time and CPU utilization against each job's thread budget"""
+    print(f"\n{'symbol':<16} {'model':<14} {'wall (s)':>9} {'cpu (s)':>9} {'utilization':>12}")
+    total_cpu = 0.0
+    for symbol, models in results.items():
+        for model_type, result in models.items():
+            budget = result['threads'] or os.cpu_count() or 1
+            total_cpu += result['cpu_time']
+            utilization = result['cpu_time'] / (result['wall_time'] * budget) if result['wall_time'] else 0.0
+            print(f"{symbol:<16} {model_type:<14} {result['wall_time']:>9.2f} {result['cpu_time']:>9.2f} "
+                  f"{utilization:>11.0%}")
+    cores = max_workers * threads_per_job if threads_per_job else os.cpu_count() or 1
+    print(f"Total wall time {wall_time:.2f}s, {total_cpu:.2f} CPU-seconds "
+          f"({total_cpu / (wall_time * cores) if wall_time else 0.0:.0%} of {cores} cores)")
+
+def train_all_models(stock_data, max_workers=1, threads_per_job=None, feature_cache=None):
+    """Train all model types and compare performance"""
+    symbol = stock_data.get('symbol', 'stock')
+    return train_model_zoo({symbol: stock_data}, max_workers=max_workers, threads_per_job=threads_per_job,
+                           feature_cache=feature_cache)[symbol]
+
+class PooledWindows:
+    """Samples from many symbols, addressed as (symbol, row) index pairs
+
+    Every symbol is scaled by its own StockPredictor and gets a symbol-ID
+    column appended to its features, so one model can be trained on the
+    whole universe. Windows stay strided views until a batch is gathered.
+    """
+    def __init__(self, model_type='lstm', batch_size=32, feature_cache=None):
+        self.model_type = model_type
+        self.batch_size = batch_size
+        self.feature_cache = feature_cache
+        self.symbols = []
+        self.symbol_ids = []
+        self.predictors = []
+        self.samples = []
+    
+    def add(self, symbol, stock_data, symbol_id):
+        """Scale and window one symbol's history; False if it is too short"""
+        predictor = StockPredictor(model_type=self.model_type, batch_size=self.batch_size,
+                                   feature_cache=self.feature_cache)
+        X_scaled, y_scaled = predictor.scale_features(dict(stock_data, symbol=symbol))
+        if len(X_scaled) <= predictor.sequence_length:
+            return False
+        
+        X_scaled = np.hstack([X_scaled, np.full((len(X_scaled), 1), symbol_id)])
+        if self.model_type in NEURAL_MODELS:
+            X_scaled, y_scaled = predictor.create_sequences(X_scaled, y_scaled)
+        
+        self.symbols.append(symbol)
+        self.symbol_ids.append(symbol_id)
+        self.predictors.append(predictor)
+        self.samples.append((X_scaled, y_scaled))
+        return True
+    
+    @property
+    def sample_shape(self):
+        return self.samples[0][0].shape[1:]
+    
+    def split(self, test_fraction=0.2, validation_fraction=0.2):
+        """Chronological per-symbol split into train, validation and test pairs"""
+        splits = ([], [], [])
+        for index, (X, _) in enumerate(self.samples):
+            test_idx = int((1 - test_fraction) * len(X))
+            val_idx = int(np.ceil(test_idx * (1 - validation_fraction)))
+            for pairs, rows in zip(splits, (np.arange(val_idx), np.arange(val_idx, test_idx),
+                                            np.arange(test_idx, len(X)))):
+                pairs.append(np.column_stack([np.full(len(rows), index), rows]))
+        return tuple(np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=int) for pairs in splits)
+    
+    def gather(self, pairs):
+        """Materialize the samples for `pairs`, one fancy-index copy per symbol"""
+        X = np.empty((len(pairs),) + self.sample_shape)
+        y = np.empty(len(pairs))
+        for index in np.unique(pairs[:, 0]):
+            selected = pairs[:, 0] == index
+            rows = pairs[selected, 1]
+            X[selected] = self.samples[index][0][rows]
+            y[selected] = self.samples[index][1][rows]
+        return X, y
+    
+    def batches(self, pairs, shuffle=True, seed=42):
+        """Endlessly yield (X, y) batches drawn across all symbols"""
+        if len(pairs) == 0:
+            return
+        rng = np.random.default_rng(seed)
+        order = np.arange(len(pairs))
+        while True:
+            if shuffle:
+                rng.shuffle(order)
+            for start in range(0, len(pairs), self.batch_size):
+                yield self.gather(pairs[order[start:start + self.batch_size]])
+    
+    def symbol_scalers(self):
+        """Each symbol's fitted scalers and ID, as ModelRegistry.save stores them for a pooled model"""
+        return {symbol: {'scaler': p.scaler, 'feature_scaler': p.feature_scaler, 'symbol_id': symbol_id}
+                for symbol, symbol_id, p in zip(self.symbols, self.symbol_ids, self.predictors)}
+
+def train_pooled_model(store, symbols=None, model_type='lstm', epochs=50, batch_size=32, feature_cache=None):
+    """Train one model on samples pooled from every symbol in the store
+    
+    Returns the predictor, the pool (with each symbol's scalers) and a
+    results dict with per-symbol test metrics and training throughput.
+    """
+    symbols = list(symbols or store.symbols())
+    pool = PooledWindows(model_type=model_type, batch_size=batch_size, feature_cache=feature_cache)
+    for index, symbol in enumerate(symbols):
+        if not pool.add(symbol, store.load(symbol), index / max(1, len(symbols) - 1)):
+            print(f"✗ Skipping {symbol}: not enough history")
+    if not pool.symbols:
+        raise ValueError("No symbol has enough history to train on")
+    
+    train_pairs, val_pairs, test_pairs = pool.split()
+    print(f"Training pooled {model_type} model on {len(pool.symbols)} symbols, "
+          f"{len(train_pairs):,} training samples")
+    
+    predictor = StockPredictor(model_type=model_type, batch_size=batch_size)
+    predictor.model = predictor.build_model(pool.sample_shape)
+    
+    start_time = time.perf_counter()
+    if model_type in NEURAL_MODELS:
+        steps = lambda n: max(1, int(np.ceil(n / batch_size)))
+        validation = {}
+        if len(val_pairs):
+            validation = {'validation_data': pool.batches(val_pairs, shuffle=False),
+                          'validation_steps': steps(len(val_pairs))}
+        predictor.model.fit(pool.batches(train_pairs), steps_per_epoch=steps(len(train_pairs)),
+                            epochs=epochs, verbose=1, **validation)
+        samples_seen = len(train_pairs) * epochs
+    else:
+        # Tree models have no use for a validation set, so they fit on both
+        X_train, y_train = pool.gather(np.concatenate([train_pairs, val_pairs]))
+        predictor.model.fit(X_train.reshape(X_train.shape[0], -1), y_train)
+        samples_seen = len(X_train)
+    training_time = time.perf_counter() - start_time
+    
+    per_symbol = {}
+    for index, symbol in enumerate(pool.symbols):
+        X_test, y_test = pool.gather(test_pairs[test_pairs[:, 0] == index])
+        if len(X_test):
+            per_symbol[symbol] = predictor.evaluate(X_test, y_test)
+    
+    results = {
+        'model_type': model_type,
+        'symbols': per_symbol,
+        'train_samples': int(len(train_pairs)),
+        'training_time': training_time,
+        'samples_per_sec': samples_seen / training_time if training_time > 0 else None,
+        'trained_at': datetime.now().isoformat(),
+    }
+    return predictor, pool, results
+
+def print_pooled_summary(title, results):
+    print(f"\n{'='*50}")
+    print(f"{title} SUMMARY")
+    print(f"{'='*50}")
+    for symbol, metrics in results['symbols'].items():
+        print(f"{symbol}: {metrics['accuracy']:.2f}% accuracy, MAE {metrics['mae']:.6f}")
+    print(f"\nTrained on {results['train_samples']:,} samples from {len(results['symbols'])} symbols "
+          f"in {results['training_time']:.1f}s ({results['samples_per_sec']:,.0f} samples/sec)")
+
+def run_pooled_training(store, model_type, epochs, feature_cache=None):
+    """Train, save and summarize a pooled model for the whole store"""
+    os.makedirs('models', exist_ok=True)
+    predictor, pool, results = train_pooled_model(store, model_type=model_type, epochs=epochs,
+                                                  feature_cache=feature_cache)
+    registry = ModelRegistry('models')
+    registry.save('pooled', predictor, {'symbols': results['symbols'], 'samples_per_sec': results['samples_per_sec']},
+                  symbol_scalers=pool.symbol_scalers())
+    
+    with open('pooled_training_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print_pooled_summary(f"POOLED {model_type.upper()}", results)
+
+def train_streamed_model(db_path, symbols=None, model_type='lstm', epochs=50, batch_size=32, chunk_rows=5000,
+                         prefetch=4):
+    """Train one neural model on every symbol in a stock_prices database, out of core
+    
+    The counterpart of train_pooled_model for data that does not fit in
+    memory: SQLiteWindows streams the same windows, split and scalers out
+    of the database chunk by chunk, so memory stays flat however many
+    symbols and years it holds. Returns the same (predictor, windows,
+    results) triple.
+    """
+    from sqlite_loader import SQLiteWindows
+    
+    if model_type not in NEURAL_MODELS:
+        raise ValueError(f"{model_type} fits on in-memory arrays; train it with --pooled instead of --db")
+    windows = SQLiteWindows(db_path, symbols, batch_size=batch_size, chunk_rows=chunk_rows,
+                            prefetch=prefetch).prepare()
+    if not windows.plans:
+        raise ValueError("No symbol has enough history to train on")
+    print(f"Training streamed {model_type} model on {len(windows.plans)} symbols, "
+          f"{windows.count('train'):,} training samples")
+    
+    predictor = StockPredictor(model_type=model_type, batch_size=batch_size)
+    predictor.model = predictor.build_model(windows.sample_shape)
+    
+    validation = {}
+    if windows.count('validation'):
+        validation = {'validation_data': windows.batches('validation', shuffle=False),
+                      'validation_steps': windows.steps('validation')}
+    start_time = time.perf_counter()
+    predictor.model.fit(windows.batches('train'), steps_per_epoch=windows.steps('train'),
+                        epochs=epochs, verbose=1, **validation)
+    training_time = time.perf_counter() - start_time
+    
+    per_symbol = {}
+    for symbol in windows.plans:
+        X_test, y_test = windows.symbol_arrays(symbol, 'test')
+        if len(X_test):
+            per_symbol[symbol] = predictor.evaluate(X_test, y_test)
+    
+    samples_seen = windows.count('train') * epochs
+    results = {
+        'model_type': model_type,
+        'symbols': per_symbol,
+        'train_samples': windows.count('train'),
+        'training_time': training_time,
+        'samples_per_sec': samples_seen / training_time if training_time > 0 else None,
+        'trained_at': datetime.now().isoformat(),
+    }
+    return predictor, windows, results
+
+def run_streamed_training(db_path, symbols, model_type, epochs, chunk_rows=5000, prefetch=4):
+    """Train, save and summarize a pooled model streamed from the database"""
+    os.makedirs('models', exist_ok=True)
+    predictor, windows, results = train_streamed_model(db_path, symbols, model_type=model_type, epochs=epochs,
+                                                       chunk_rows=chunk_rows, prefetch=prefetch)
+    registry = ModelRegistry('models')
+    registry.save('pooled', predictor, {'symbols': results['symbols'], 'samples_per_sec': results['samples_per_sec'],
+                                        'source': db_path},
+                  symbol_scalers=windows.symbol_scalers())
+    
+    with open('streamed_training_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print_pooled_summary(f"STREAMED {model_type.upper()}", results)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train stock prediction models")
+    parser.add_argument('--data', default='stock_data.json', help="dataset path: a .json file or a columnar store directory")
+    parser.add_argument('--symbol', nargs='+', help="symbols to train on (default: first in the dataset)")
+    parser.add_argument('--pooled', action='store_true',
+                        help="train one model on every symbol instead of one model per type on a single symbol")
+    parser.add_argument('--db', help="train one neural model on every symbol in this SQLite database, "
+                                     "streaming windows from stock_prices instead of loading --data")
+    parser.add_argument('--chunk-rows', type=int, default=5000, help="bars read per query with --db")
+    parser.add_argument('--prefetch', type=int, default=4, help="chunks read ahead of training with --db")
+    parser.add_argument('--model-type', default='lstm', help="model type for --pooled and --db training")
+    parser.add_argument('--epochs', type=int, default=50, help="epochs for --pooled and --db neural models")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes training models in parallel")
+    parser.add_argument('--threads-per-job', type=int,
+                        help="CPU threads per training job (default: cores divided between workers)")
+    parser.add_argument('--feature-cache', default='feature_cache',
+                        help="directory caching scaled feature matrices between runs ('' disables it)")
+    parser.add_argument('--feature-cache-mb', type=int, default=512, help="feature cache size limit")
+    args = parser.parse_args()
+    
     # Load stock data
     try:
-        with open('stock_data.json', 'r') as f:
-            all_stock_data = json.load(f)
-        
-        # Train models on first stock as example
-        first_stock = list(all_stock_data.keys())[0]
-        stock_data = all_stock_data[first_stock]
-        
-        print(f"Training models on {stock_data['name']} ({first_stock})")
-        
-        # Create models directory
-        import os
-        os.makedirs('models', exist_ok=True)
-        
-        # Train all models
-        results = train_all_models(stock_data)
-        
-        # Save results
-        with open('training_results.json', 'w') as f:
-            json.dump(results, f, indent=2)
-        
-        print(f"\n{'='*50}")
-        print("TRAINING SUMMARY")
-        print(f"{'='*50}")
-        
-        for model_type, result in results.items():
-            if 'metrics' in result:
-                print(f"{model_type.upper()}: {result['metrics']['accuracy']:.2f}% accuracy")
-            else:
-                print(f"{model_type.upper()}: Training failed")
-        
-        # Find best model
-        best_model = max(
-            [(k, v) for k, v in results.items() if 'metrics' in v],
-            key=lambda x: x[1]['metrics']['accuracy']
-        )
-        
-        print(f"\nBest performing model: {best_model[0].upper()}")
-        print(f"Accuracy: {best_model[1]['metrics']['accuracy']:.2f}%")
+        store = open_store(args.data)
+        if not (os.path.exists(args.db) if args.db else store.exists()):
+            raise FileNotFoundError(args.db or args.data)
+        
+        feature_cache = None
+        if args.feature_cache:
+            feature_cache = FeatureCache(args.feature_cache, max_bytes=args.feature_cache_mb * 1024 * 1024)
+        
+        if args.db:
+            run_streamed_training(args.db, args.symbol, args.model_type, args.epochs, args.chunk_rows, args.prefetch)
+        elif args.pooled:
+            run_pooled_training(store, args.model_type, args.epochs, feature_cache)
+        else:
+            # Train models on the requested stocks, or the first one as example
+            symbols = args.symbol or store.symbols()[:1]
+            stocks = {symbol: store.load(symbol) for symbol in symbols}
+            for symbol, stock_data in stocks.items():
+                print(f"Training models on {stock_data['name']} ({symbol})")
+            
+            # Create models directory
+            os.makedirs('models', exist_ok=True)
+            
+            # Train all models
+            all_results = train_model_zoo(stocks, max_workers=args.workers, threads_per_job=args.threads_per_job,
+                                          feature_cache=feature_cache)
+            
+            # Save results
+            with open('training_results.json', 'w') as f:
+                json.dump(all_results[symbols[0]] if len(symbols) == 1 else all_results, f, indent=2)
+            
+            for symbol, results in all_results.items():
+                print(f"\n{'='*50}")
+                print(f"TRAINING SUMMARY: {symbol}")
+                print(f"{'='*50}")
+                
+                for model_type, result in results.items():
+                    if 'metrics' in result:
+                        print(f"{model_type.upper()}: {result['metrics']['accuracy']:.2f}% accuracy")
+                    else:
+                        print(f"{model_type.upper()}: Training failed")
+                
+                # Find best model
+                best_model = max(
+                    [(k, v) for k, v in results.items() if 'metrics' in v],
+                    key=lambda x: x[1]['metrics']['accuracy']
+                )
+                
+                print(f"\nBest performing model: {best_model[0].upper()}")
+                print(f"Accuracy: {best_model[1]['metrics']['accuracy']:.2f}%")
+        
+        if feature_cache is not None:
+            feature_cache.report()
         
     except FileNotFoundError:
-        print("Error: stock_data.json not found. Please run fetch_stock_data.py first.")
+        print(f"Error: {args.db or args.data} not found. Please run fetch_stock_data.py first.")
     except Exception as e:
         print(f"Error: {str(e)}")